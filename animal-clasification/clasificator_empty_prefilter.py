@@ -0,0 +1,157 @@
+import os
+import json
+import shutil
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from tensorflow.keras import layers, models
+import matplotlib.pyplot as plt
+
+# Trains the "empty vs. not empty" pre-filter used by the detector (detector_animales_diego.py).
+# The labels come from our own MegaDetector runs: every image of a results.json with detections
+# is 'not_empty', every image without detections is 'empty'.
+
+# results.json files written by the detector (relative paths are resolved against their input folder)
+results_files = [
+    "C:/yamaneko-kenkyu/p_data/results.json",
+]
+
+# Directory where the labelled images are copied for training
+base_dir = "C:/lila/lila_downloads_by_dataset/training/training_empty_prefilter"
+
+# Must match PREFILTER_INPUT_SIZE in the detector
+input_size = 150
+
+# Copy the images of the detector results into one folder per class
+for results_file in results_files:
+    with open(results_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    input_folder = data.get('input_folder') or os.path.dirname(results_file)
+    for result in data['results']:
+        if result['type'] != 'image' or result['output_file'] is None:
+            continue
+        if result['status'] in ('detected', 'sequence_detected'):
+            label = 'not_empty'
+        elif result['status'] == 'no_detections':
+            label = 'empty'
+        else:
+            continue
+        image_path = os.path.join(input_folder, result['output_file'])
+        if not os.path.exists(image_path):
+            continue
+        label_dir = os.path.join(base_dir, label)
+        os.makedirs(label_dir, exist_ok=True)
+        target_name = os.path.relpath(image_path, input_folder).replace(os.sep, '_').replace('/', '_')
+        shutil.copy2(image_path, os.path.join(label_dir, target_name))
+
+class_counts = {}
+for label in ['empty', 'not_empty']:
+    label_dir = os.path.join(base_dir, label)
+    class_counts[label] = len(os.listdir(label_dir)) if os.path.isdir(label_dir) else 0
+    print(f"{label}: {class_counts[label]} images")
+
+# Runs with "delete images without detections" enabled leave no empty images behind, and a
+# model trained without one class learns nothing useful
+min_images_per_class = 50
+max_class_ratio = 10
+if min(class_counts.values()) < min_images_per_class:
+    raise SystemExit(
+        f"Not enough training images ({class_counts}): each class needs at least {min_images_per_class}. "
+        f"Use results.json files of runs that did not delete the images without detections."
+    )
+if max(class_counts.values()) > max_class_ratio * min(class_counts.values()):
+    print(
+        f"Warning: classes are heavily unbalanced ({class_counts}), "
+        f"check the recall report below before choosing a threshold"
+    )
+
+# Data generators for training and validation
+datagen = ImageDataGenerator(
+    rescale=1.0/255,  # Rescale pixel values to [0, 1]
+    validation_split=0.2  # 80% training, 20% validation split
+)
+
+# Classes are sorted by name, so 'empty' is 0 and 'not_empty' is 1
+train_generator = datagen.flow_from_directory(
+    base_dir,
+    target_size=(input_size, input_size),
+    batch_size=32,
+    class_mode='binary',
+    subset='training',
+    shuffle=True
+)
+
+validation_generator = datagen.flow_from_directory(
+    base_dir,
+    target_size=(input_size, input_size),
+    batch_size=32,
+    class_mode='binary',
+    subset='validation',
+    shuffle=False  # Keeps the order of validation_generator.classes for the threshold report
+)
+
+# Same small CNN as clasificator_binary.py, it runs far faster than MegaDetector on CPU
+model = models.Sequential([
+    layers.Conv2D(32, (3, 3), activation='relu', input_shape=(input_size, input_size, 3)),
+    layers.MaxPooling2D((2, 2)),
+    layers.Conv2D(64, (3, 3), activation='relu'),
+    layers.MaxPooling2D((2, 2)),
+    layers.Conv2D(128, (3, 3), activation='relu'),
+    layers.MaxPooling2D((2, 2)),
+    layers.Conv2D(128, (3, 3), activation='relu'),
+    layers.MaxPooling2D((2, 2)),
+    layers.Flatten(),
+    layers.Dense(512, activation='relu'),
+    layers.Dropout(0.6),
+    layers.Dense(1, activation='sigmoid')  # Probability that the frame is not empty
+])
+
+# Recall matters more than precision here: a missed animal is lost, an empty frame only costs
+# one MegaDetector call
+model.compile(
+    loss='binary_crossentropy',
+    optimizer='adam',
+    metrics=['accuracy', tf.keras.metrics.Recall(name='recall')]
+)
+
+history = model.fit(
+    train_generator,
+    steps_per_epoch=train_generator.samples // train_generator.batch_size,
+    epochs=10,  # Adjust as needed
+    validation_data=validation_generator,
+    validation_steps=validation_generator.samples // validation_generator.batch_size
+)
+
+# Copy this file next to the detector (PREFILTER_MODEL_FILE)
+model.save('empty_prefilter_model.h5')
+
+# Recall of the not empty class at several thresholds, to choose the pre-filter threshold
+validation_generator.reset()
+scores = model.predict(validation_generator).ravel()
+labels = validation_generator.classes[:len(scores)]
+positives = max(1, int(labels.sum()))
+for threshold in [0.02, 0.05, 0.1, 0.2, 0.3, 0.5]:
+    kept = scores >= threshold
+    recall = (kept & (labels == 1)).sum() / positives
+    print(f"Threshold {threshold:.2f}: recall {recall:.3f}, frames sent to MegaDetector {kept.mean():.1%}")
+
+# Plot the training and validation recall/loss over epochs
+recall = history.history['recall']
+val_recall = history.history['val_recall']
+loss = history.history['loss']
+val_loss = history.history['val_loss']
+
+epochs_range = range(len(recall))
+
+plt.figure(figsize=(8, 8))
+plt.subplot(1, 2, 1)
+plt.plot(epochs_range, recall, label='Training Recall')
+plt.plot(epochs_range, val_recall, label='Validation Recall')
+plt.legend(loc='lower right')
+plt.title('Training and Validation Recall')
+
+plt.subplot(1, 2, 2)
+plt.plot(epochs_range, loss, label='Training Loss')
+plt.plot(epochs_range, val_loss, label='Validation Loss')
+plt.legend(loc='upper right')
+plt.title('Training and Validation Loss')
+plt.show()
@@ -0,0 +1,22 @@
+"""
+Entry point of the isolated decoder process started by IsolatedDecoder in
+detector_animales_diego.py. Run as its own script, the process only imports
+video_decoding (cv2, numpy, PyAV) and never the GUI module with PyQt5, torch and
+MegaDetector. Jobs arrive pickled on stdin and results leave pickled on stdout.
+"""
+import os
+import sys
+
+from video_decoding import decode_worker_main
+
+
+def main():
+    # Results use the original stdout; anything native libraries print goes to stderr instead
+    result_stream = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    with result_stream:
+        decode_worker_main(sys.stdin.buffer, result_stream)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,225 @@
 import sys
 import os
 import cv2
+import re
 import json
+import pickle
+import math
+import heapq
+import random
+import time
+import uuid
+import socket
+import argparse
+import ctypes
+import threading
 import shutil
-import tempfile
+import queue
+import struct
 import subprocess
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QLabel, QLineEdit,
     QPushButton, QVBoxLayout, QHBoxLayout, QProgressBar, QWidget,
     QTextEdit, QCheckBox, QSpinBox, QDoubleSpinBox, QMessageBox, QSizePolicy, QScrollArea, QDesktopWidget,
+    QComboBox, QListWidget, QListWidgetItem,
 )
 from PyQt5.QtCore import QThread, pyqtSignal, Qt, QSize
 from PyQt5.QtGui import QIcon, QFont, QPalette, QColor,QIcon
 from megadetector.detection.run_detector_batch import load_detector
 
 from megadetector.detection import video_utils
-from megadetector.detection.run_detector_batch import load_detector, process_images
-from torch import Size
+from megadetector.detection.run_detector_batch import load_detector
 from PyQt5 import QtGui
 from PyQt5.QtGui import QIcon, QPixmap, QPainter, QColor
 from PyQt5.QtWidgets import QGraphicsOpacityEffect, QLabel
+from PIL import Image
+from work_queue import (
+    RESULTS_FILE_NAME, WORK_UNIT_FILES, WORK_LEASE_SECONDS, WORK_POLL_SECONDS, WorkQueue, write_json_atomic,
+    locked_file,
+)
+from video_decoding import (
+    DETECTOR_INFERENCE_SIZE, REDUCED_DECODE_FLAGS, get_reduced_decode_factor, iter_sampled_frames,
+    probe_video_metadata,
+)
+
+try:
+    import psutil  # Optional, used to watch the memory of the decoder process
+except ImportError:
+    psutil = None
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+try:
+    # Optional, watches folders through inotify (or the native API on Windows/macOS)
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
 
 
 
 processed_videos = 0
 
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv']
+
+# Inference size of the fast first pass when the resolution cascade is enabled
+CASCADE_INFERENCE_SIZE = 640
+
+# Per-deployment region of interest and exclusion areas, looked up from the file's folder upwards
+ROI_MASK_FILE_NAME = "roi_mask.json"
+
+# Bytes read from the start of a JPEG to find its EXIF thumbnail (the EXIF segment is at most 64 KB)
+EXIF_HEADER_READ_BYTES = 128 * 1024
+
+# Frame statistics gate, computed on a copy downscaled to FRAME_STATS_SIZE pixels (long
+# side). A frame is blank when nearly all pixels are black or clipped white, or when it
+# is almost uniform (fog, covered lens)
+FRAME_STATS_SIZE = 64
+FRAME_DARK_LEVEL = 8
+FRAME_BRIGHT_LEVEL = 248
+FRAME_MAX_CLIPPED_SHARE = 0.98
+FRAME_MIN_STD = 3.0
+
+# Lighting condition of a frame: IR when the colour channels barely differ, night when
+# the mean brightness is low, day otherwise
+IR_MAX_COLORFULNESS = 6.0
+NIGHT_MAX_MEAN = 60
+
+# Perceptual hash deduplication: difference hash of a DEDUP_HASH_SIZE x DEDUP_HASH_SIZE
+# grayscale thumbnail (256 bits), the Hamming distance under which two inputs count as
+# the same, and the number of recent inputs remembered per camera
+DEDUP_HASH_SIZE = 16
+DEDUP_MAX_HAMMING_DISTANCE = 6
+DEDUP_CACHE_SIZE = 64
+
+# Cost of decoding one video frame, relative to one detector call
+DECODE_COST_PER_FRAME = 0.02
+
+# The progress and ETA are written to the log every so many files or seconds, the
+# progress bar shows them after every file
+PROGRESS_LOG_EVERY_FILES = 100
+PROGRESS_LOG_EVERY_SECONDS = 30
+
+# Name of the video metadata cache kept in the input folder between runs
+METADATA_CACHE_FILE_NAME = ".video_metadata_cache.json"
+
+# Name of the list of detection clips kept in each folder clips are exported to
+SEGMENT_MANIFEST_FILE_NAME = ".detection_clips.json"
+
+# Folder (inside the input folder) where videos that cannot be decoded are moved
+QUARANTINE_DIR_NAME = "quarantine"
+
+# Resident memory limit of the isolated decoder process
+DECODE_MEMORY_LIMIT_MB = 4096
+
+# Seconds without any frame from the isolated decoder before it is considered stalled
+DECODE_STALL_SECONDS = 60
+
+# Seconds the isolated decoder may spend reading the metadata of one video
+PROBE_TIMEOUT_SECONDS = 30
+
+# Command line argument that makes the frozen executable run the isolated decoder
+DECODE_WORKER_ARGUMENT = "--decode-worker"
+
+# Folder (inside the user config dir) and file where the job queue is kept between runs
+APP_CONFIG_DIR_NAME = "WildCatcher"
+JOB_QUEUE_FILE_NAME = "job_queue.json"
+
+# Settings used by the command line modes, matching the defaults of the settings panel
+DEFAULT_PROCESSING_SETTINGS = {
+    'every_n_frames': 16,
+    'confidence_threshold': 0.4,
+    'create_detection_data': False,
+    'delete_no_detection': False,
+    'processing_duration_seconds': 5,
+    'save_all_checkbox': False,
+    'rename_files_checkbox': False,
+    'hito_prefix': "persona_",
+    'animal_prefix': "animal_",
+}
+
+# Background mode limits: inference threads, pre-scan workers, and the CPU use of other
+# programs above which processing slows down
+BACKGROUND_TORCH_THREADS = 2
+BACKGROUND_NICE = 10
+BACKGROUND_PRESCAN_WORKERS = 2
+BACKGROUND_MAX_OTHER_CPU_PERCENT = 50
+
+# Background mode pauses between files, as a multiple of the time spent on the last
+# file, for each reason to slow down, and the longest single pause
+BACKGROUND_USER_ACTIVE_FACTOR = 2.0
+BACKGROUND_BUSY_SYSTEM_FACTOR = 1.0
+BACKGROUND_ON_BATTERY_FACTOR = 1.0
+BACKGROUND_MAX_PAUSE_SECONDS = 60
+
+# Seconds without keyboard or mouse input after which the user counts as away
+USER_IDLE_SECONDS = 120
+
+# Estimate mode: categories estimated, z value of the 95% intervals, files between progress
+# reports, seed of the sample order, and the frame sampling used for videos
+ESTIMATE_CATEGORIES = ['animal', 'person', 'empty']
+ESTIMATE_Z = 1.96
+ESTIMATE_REPORT_EVERY_FILES = 20
+ESTIMATE_SEED = 0
+ESTIMATE_SAMPLE_EVERY_SECONDS = 1.0
+ESTIMATE_FILE_NAME = "estimate.json"
+
+# Orders in which the files of a run can be processed
+SCHEDULE_POLICIES = ['images_first', 'shortest_first', 'newest_first', 'interleave']
+
+# History of detection boxes per camera, kept in the input folder to learn static false positives
+STATIC_DETECTIONS_FILE_NAME = ".static_detections.json"
+
+# A box is static once it was seen at the same place (IoU over the threshold) without
+# motion in at least STATIC_MIN_FILES files and in STATIC_MIN_FILE_SHARE of the files of
+# its camera, and moved in at most STATIC_MAX_MOVING_SHARE of the files it was seen in.
+# In a video the box moved unless it is in STATIC_MIN_FRAME_SHARE of the sampled frames
+# with its centre spread (standard deviation, as a share of the frame) under
+# STATIC_MAX_BOX_SPREAD
+STATIC_IOU_THRESHOLD = 0.8
+STATIC_MIN_FILES = 5
+STATIC_MIN_FILE_SHARE = 0.3
+STATIC_MAX_MOVING_SHARE = 0.1
+STATIC_MIN_FRAME_SHARE = 0.8
+STATIC_MAX_BOX_SPREAD = 0.01
+STATIC_MAX_BOXES_PER_CAMERA = 200
+
+# Still images of one camera taken at most SEQUENCE_MAX_GAP_SECONDS apart form a sequence
+# (burst) of at most SEQUENCE_MAX_IMAGES images spanning at most SEQUENCE_MAX_SPAN_SECONDS.
+# Sequences whose first images are empty but within SEQUENCE_BORDERLINE_MARGIN of the
+# confidence threshold are still inferred in full, SEQUENCE_DECODE_BATCH images at a time
+SEQUENCE_MAX_GAP_SECONDS = 5
+SEQUENCE_MAX_IMAGES = 20
+SEQUENCE_MAX_SPAN_SECONDS = 60
+SEQUENCE_BORDERLINE_MARGIN = 0.1
+SEQUENCE_DECODE_BATCH = 4
+
+# Ledger of the files processed in watch mode, kept in the input folder
+PROCESSED_LEDGER_FILE_NAME = ".processed_files.json"
+
+# Seconds a new file's size must stay unchanged before it is processed in watch mode
+WATCH_SETTLE_SECONDS = 10
+
+# Seconds between checks of the watched folder
+WATCH_POLL_SECONDS = 2
+
+# Number of sampled frames decoded and inferred together when streaming a video
+STREAM_CHUNK_SIZE = 32
+
+# Minimum time between two of the top-K frames kept for a video
+TOP_K_MIN_GAP_SECONDS = 1.0
+
+# Laplacian variance at which a crop counts as half-way sharp
+SHARPNESS_SCALE = 100.0
+
 
 # Function to draw detections on an image
 def draw_detections_on_image(image, detections, confidence_threshold, output_path):
@@ -73,388 +268,3896 @@ def crop_image_with_bbox_image(image, bbox):
     return cropped_image
 
 
-def process_image_file(
-    image_file, detector, confidence_threshold, output_base, log,
-    rename_images=False, delete_no_detections=False, hito_prefix="persona_", animal_prefix="animal_"
-):
+# Function to load an image at the smallest resolution the detector needs
+def load_image_for_inference(image_path, inference_size=DETECTOR_INFERENCE_SIZE):
     """
-    Process a single image file.
+    Decodes an image for the detector. When the source is much larger than the
+    inference size, OpenCV decodes it at reduced scale straight from the DCT.
+    Returns (image, reduce_factor).
     """
-    image_path = image_file
-    image_file_name = os.path.basename(image_file)
-    log(f"Processing image: {image_path}")
+    reduce_factor = 1
+    try:
+        # Only the header is read here, the pixels are not decoded
+        with Image.open(image_path) as header:
+            width, height = header.size
+        reduce_factor = get_reduced_decode_factor(width, height, inference_size)
+    except Exception:
+        pass
+
+    image = cv2.imread(image_path, REDUCED_DECODE_FLAGS[reduce_factor])
+    if image is None and reduce_factor != 1:
+        reduce_factor = 1
+        image = cv2.imread(image_path)
+    return image, reduce_factor
+
+
+# Function to run the detector on an in-memory image
+def run_detector_on_image(detector, image, image_size=None):
+    """
+    Runs the detector on a BGR image and returns all of its detections.
+    """
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    result = detector.generate_detections_one_image(
+        Image.fromarray(rgb_image),
+        image_id='frame',
+        detection_threshold=0.0,
+        image_size=image_size
+    )
+    return result.get('detections', [])
 
-    image = cv2.imread(image_path)
-    if image is None:
-        log(f"Could not read {image_path}")
-        return
 
-    results = process_images(
-        im_files=[image_path],
-        detector=detector,
-        confidence_threshold=0.0,
-        use_image_queue=False,
-        quiet=True
+# Function to scale an inference size to a cropped frame, keeping the detector's stride
+def get_scaled_inference_size(inference_size, scale):
+    return max(64, int(round(inference_size * scale / 32)) * 32)
+
+
+class RegionMask:
+    """
+    Region of interest and exclusion areas of one camera, in normalized coordinates.
+    Loaded from a roi_mask.json file such as:
+    {"roi": [x, y, w, h], "exclude": [[x, y, w, h], [[x1, y1], [x2, y2], [x3, y3]]]}
+    where each exclusion is a rectangle or a polygon. Frames are cropped to the ROI
+    rectangle and excluded areas are blacked out before inference.
+    """
+
+    def __init__(self, roi=None, exclude=None):
+        self.roi = roi or [0.0, 0.0, 1.0, 1.0]
+        self.exclude = exclude or []
+        self.pixel_masks = {}  # (width, height) -> (crop_rect, mask), built once per frame size
+
+    @classmethod
+    def load(cls, mask_path):
+        with open(mask_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('roi'), data.get('exclude'))
+
+    def get_pixel_mask(self, width, height):
+        """
+        Returns the (x, y, w, h) crop rectangle in pixels and the uint8 mask of the kept
+        pixels inside it (None when nothing is excluded) for a frame size.
+        """
+        if (width, height) not in self.pixel_masks:
+            x, y, w, h = self.roi
+            x0 = min(max(int(round(x * width)), 0), width - 1)
+            y0 = min(max(int(round(y * height)), 0), height - 1)
+            x1 = min(max(int(round((x + w) * width)), x0 + 1), width)
+            y1 = min(max(int(round((y + h) * height)), y0 + 1), height)
+
+            mask = None
+            if self.exclude:
+                mask = np.full((y1 - y0, x1 - x0), 255, dtype=np.uint8)
+                for area in self.exclude:
+                    if isinstance(area[0], (list, tuple)):  # Polygon of [x, y] points
+                        points = np.array(
+                            [[px * width - x0, py * height - y0] for px, py in area], dtype=np.int32
+                        )
+                        cv2.fillPoly(mask, [points], 0)
+                    else:  # Rectangle [x, y, w, h]
+                        ax, ay, aw, ah = area
+                        cv2.rectangle(
+                            mask,
+                            (int(ax * width) - x0, int(ay * height) - y0),
+                            (int((ax + aw) * width) - x0, int((ay + ah) * height) - y0),
+                            0, thickness=-1
+                        )
+            self.pixel_masks[(width, height)] = ((x0, y0, x1 - x0, y1 - y0), mask)
+        return self.pixel_masks[(width, height)]
+
+    def apply(self, frame):
+        """
+        Returns the frame cropped to the ROI with the excluded areas blacked out, and
+        the crop rectangle in pixels.
+        """
+        height, width = frame.shape[:2]
+        (x0, y0, w, h), mask = self.get_pixel_mask(width, height)
+        crop = frame[y0:y0 + h, x0:x0 + w]
+        if mask is not None:
+            crop = cv2.bitwise_and(crop, crop, mask=mask)
+        return crop, (x0, y0, w, h)
+
+    @staticmethod
+    def map_to_frame(detections, crop_rect, frame_width, frame_height):
+        """
+        Maps detection boxes from the cropped frame back to full frame coordinates.
+        """
+        x0, y0, w, h = crop_rect
+        mapped = []
+        for detection in detections:
+            bx, by, bw, bh = detection['bbox']
+            mapped.append(dict(detection, bbox=[
+                (x0 + bx * w) / frame_width, (y0 + by * h) / frame_height,
+                bw * w / frame_width, bh * h / frame_height
+            ]))
+        return mapped
+
+
+# Function to assess the lighting of a frame and whether it can show an animal
+def assess_frame(image):
+    """
+    Returns {'condition': 'day' | 'night' | 'ir', 'blank': None or the reason the frame
+    cannot contain a visible animal ('dark', 'washed out', 'uniform'), 'mean', 'std'},
+    from the statistics of a downscaled copy of a BGR image.
+    """
+    height, width = image.shape[:2]
+    scale = FRAME_STATS_SIZE / max(height, width)
+    if scale < 1:
+        image = cv2.resize(
+            image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA
+        )
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    mean = float(gray.mean())
+    std = float(gray.std())
+
+    histogram = np.bincount(gray.ravel(), minlength=256) / gray.size
+    blank = None
+    if histogram[:FRAME_DARK_LEVEL].sum() > FRAME_MAX_CLIPPED_SHARE:
+        blank = 'dark'
+    elif histogram[FRAME_BRIGHT_LEVEL:].sum() > FRAME_MAX_CLIPPED_SHARE:
+        blank = 'washed out'
+    elif std < FRAME_MIN_STD:
+        blank = 'uniform'
+
+    channels = image.reshape(-1, 3).astype(np.int16)
+    colorfulness = float(
+        np.abs(channels[:, 0] - channels[:, 1]).mean() + np.abs(channels[:, 1] - channels[:, 2]).mean()
     )
+    if colorfulness < IR_MAX_COLORFULNESS:
+        condition = 'ir'
+    elif mean < NIGHT_MAX_MEAN:
+        condition = 'night'
+    else:
+        condition = 'day'
+    return {'condition': condition, 'blank': blank, 'mean': mean, 'std': std}
 
-    detections = results[0].get('detections', [])
-    valid_detections = [d for d in detections if d['conf'] > confidence_threshold]
 
-    if not valid_detections:
-        log(f"No valid detections in {image_path}")
-        if delete_no_detections:
-            try:
-                os.remove(image_path)
-                log(f"Deleted image: {image_path}")
-            except Exception as e:
-                log(f"Failed to delete {image_path}: {str(e)}")
-        return  # Do not proceed further
+# Empty frame pre-filter: Keras model trained by animal-clasification/clasificator_empty_prefilter.py,
+# its input size, the default "not empty" score under which a frame skips MegaDetector, and how
+# often a rejected frame is still sent to MegaDetector to measure the recall the pre-filter costs
+PREFILTER_MODEL_FILE = "empty_prefilter_model.h5"
+PREFILTER_INPUT_SIZE = 150
+PREFILTER_THRESHOLD = 0.1
+PREFILTER_AUDIT_EVERY = 20
 
-    # Determine prefix based on detection type
-    prefix = ""
 
-    for detection in valid_detections:
-        if detection['category'] == '1':
-            prefix = animal_prefix
+# Function to import Keras when a Keras model is first needed
+def import_keras():
+    """
+    Returns tensorflow.keras, or None if TensorFlow is not installed. Imported on
+    demand so runs without the pre-filter or species classifier never load TensorFlow.
+    """
+    try:
+        from tensorflow import keras
+    except ImportError:
+        return None
+    return keras
+
+
+# Class for the tiny CNN that scores whether a frame is worth running MegaDetector on
+class EmptyFramePrefilter:
+    """
+    Frames scoring under threshold are treated as empty without running MegaDetector.
+    A lower threshold keeps more recall and avoids fewer detector calls.
+    """
+
+    def __init__(self, model_path=PREFILTER_MODEL_FILE, threshold=PREFILTER_THRESHOLD):
+        self.model = import_keras().models.load_model(model_path, compile=False)
+        self.threshold = threshold
+
+    def score(self, image):
+        """
+        Returns the probability that a BGR frame is not empty.
+        """
+        return self.score_batch([image])[0]
+
+    def score_batch(self, images):
+        """
+        Returns the scores of several BGR frames with one call of the model, which
+        costs little more than scoring one frame.
+        """
+        batch = np.stack([
+            cv2.cvtColor(
+                cv2.resize(image, (PREFILTER_INPUT_SIZE, PREFILTER_INPUT_SIZE), interpolation=cv2.INTER_AREA),
+                cv2.COLOR_BGR2RGB
+            )
+            for image in images
+        ]).astype(np.float32) / 255.0
+        return [float(score) for score in np.asarray(self.model(batch, training=False))[:, 0]]
+
+
+# Species classifier: Keras model trained in animal-clasification (see test_multiclass_model.py),
+# its class names in output order, and how many animal crops are classified per batch
+SPECIES_MODEL_FILE = "multiclass_classifier_model.keras"
+SPECIES_CLASS_NAMES = ["birds", "deer", "others", "boar"]
+SPECIES_BATCH_SIZE = 32
+
+
+# Class for the second stage that classifies the species of the animal crops
+class SpeciesClassifier:
+    """
+    Crops are queued with the result record of their file and classified in batches
+    across files. When a batch is classified, each record gets 'species' and
+    'species_conf' from its most confident crop, and with rename_files the file's
+    prefix is extended with the species (animal_IMG.jpg -> animal_deer_IMG.jpg).
+    """
+
+    def __init__(
+        self, log, model_path=SPECIES_MODEL_FILE, class_names=SPECIES_CLASS_NAMES,
+        batch_size=SPECIES_BATCH_SIZE, rename_files=False
+    ):
+        self.log = log
+        self.model = import_keras().models.load_model(model_path, compile=False)
+        _, self.input_height, self.input_width, self.input_channels = self.model.input_shape
+        self.class_names = class_names
+        self.batch_size = batch_size
+        self.rename_files = rename_files
+        self.pending = []  # (result, crop inputs) waiting for a batch
+        self.pending_crops = 0
+        self.stats = {'files': 0, 'crops': 0, 'batches': 0, 'species': {}}
+
+    def prepare(self, crop):
+        """
+        Returns a BGR crop resized to the model input, grayscale for single channel models.
+        """
+        crop = cv2.resize(crop, (self.input_width, self.input_height), interpolation=cv2.INTER_AREA)
+        if self.input_channels == 1:
+            return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)[..., np.newaxis]
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+
+    def add(self, result, crops):
+        """
+        Queue the animal crops of a file, classifying the queue once a batch is full.
+        """
+        crops = [self.prepare(crop) for crop in crops if crop.size]
+        if not crops:
+            return
+        self.pending.append((result, crops))
+        self.pending_crops += len(crops)
+        if self.pending_crops >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Classify all queued crops and apply the species to their files.
+        """
+        if not self.pending:
+            return
+        inputs = np.stack([crop for _, crops in self.pending for crop in crops]).astype(np.float32) / 255.0
+        probabilities = np.concatenate([
+            np.asarray(self.model(inputs[start:start + self.batch_size], training=False))
+            for start in range(0, len(inputs), self.batch_size)
+        ])
+        self.stats['batches'] += -(-len(inputs) // self.batch_size)
+        self.stats['crops'] += len(inputs)
+
+        start = 0
+        for result, crops in self.pending:
+            file_probabilities = probabilities[start:start + len(crops)]
+            start += len(crops)
+            crop_index, class_index = np.unravel_index(np.argmax(file_probabilities), file_probabilities.shape)
+            species = self.class_names[class_index]
+            result['species'] = species
+            result['species_conf'] = round(float(file_probabilities[crop_index, class_index]), 3)
+            self.stats['files'] += 1
+            self.stats['species'][species] = self.stats['species'].get(species, 0) + 1
+            self.log(f"Species of {result['file']}: {species} ({result['species_conf']:.2f})")
+            if self.rename_files:
+                self.rename_with_species(result, species)
+        self.pending = []
+        self.pending_crops = 0
+
+    def rename_with_species(self, result, species):
+        file_path = result['output_file']
+        prefix = result['prefix']
+        if file_path is None or not prefix or not os.path.basename(file_path).startswith(prefix):
+            return
+        species_prefix = f"{prefix}{species}_"
+        new_file_path = os.path.join(
+            os.path.dirname(file_path), species_prefix + os.path.basename(file_path)[len(prefix):]
+        )
+        if os.path.exists(new_file_path):
+            self.log(f"Cannot rename {file_path}: File {os.path.basename(new_file_path)} already exists")
+            return
+        try:
+            os.rename(file_path, new_file_path)
+        except OSError as e:
+            self.log(f"Failed to rename {file_path}: {str(e)}")
+            return
+        self.log(f"Renamed {file_path} -> {new_file_path}")
+        result['output_file'] = new_file_path
+        result['prefix'] = species_prefix
+
+
+# Function to compute the difference hash of an image
+def compute_dhash(image, hash_size=DEDUP_HASH_SIZE):
+    """
+    Returns the dHash of a BGR or grayscale image as packed bits: whether each pixel
+    of a downscaled grayscale thumbnail is brighter than its left neighbour.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    thumbnail = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1])
+
+
+class DetectionCache:
+    """
+    Detections of the most recently inferred inputs of each camera, looked up by
+    perceptual hash so near-identical inputs reuse them instead of being inferred.
+    """
+
+    def __init__(self, max_distance=DEDUP_MAX_HAMMING_DISTANCE, max_entries=DEDUP_CACHE_SIZE):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.cameras = {}  # camera_key -> (array of hashes, list of detections)
+
+    def lookup(self, camera_key, image_hash):
+        if camera_key not in self.cameras:
+            return None
+        hashes, detections = self.cameras[camera_key]
+        distances = np.unpackbits(np.bitwise_xor(hashes, image_hash), axis=1).sum(axis=1)
+        best = int(np.argmin(distances))
+        return detections[best] if distances[best] <= self.max_distance else None
+
+    def add(self, camera_key, image_hash, detections):
+        hashes, detections_list = self.cameras.get(camera_key, (np.empty((0, image_hash.size), np.uint8), []))
+        hashes = np.vstack([hashes, image_hash])[-self.max_entries:]
+        detections_list = (detections_list + [detections])[-self.max_entries:]
+        self.cameras[camera_key] = (hashes, detections_list)
+
+
+class FrameDetector:
+    """
+    Wraps the detector model with the per-run inference settings and counters.
+    With the cascade enabled, every frame is run at a small inference size first and
+    only frames whose best confidence falls within the uncertainty band around the
+    confidence threshold are re-run at full resolution.
+    With a region mask, only the ROI is inferred, at an inference size scaled down by
+    the share of the frame it covers.
+    With deduplication, inputs whose perceptual hash is close to a recent input of the
+    same camera reuse its detections.
+    With the frame gate, blank frames are skipped without inference, and every frame is
+    tagged day, night or IR so condition_thresholds ({condition: threshold}) can apply.
+    With a prefilter (EmptyFramePrefilter), frames it scores as empty skip MegaDetector,
+    except one in PREFILTER_AUDIT_EVERY which is inferred to measure the recall lost.
+    comparison_models ({name: loaded detector}) share the decode and every step of the
+    main detector: frames skipped by the gate or pre-filter are skipped for them too,
+    they see the same ROI crop and cascade, and reuse the cache on duplicates. Their
+    detections are kept in last_comparison and do not affect the outcome of the file.
+    """
+
+    def __init__(
+        self, detector, confidence_threshold, cascade_enabled=False,
+        uncertainty_band=0.1, cascade_inference_size=CASCADE_INFERENCE_SIZE, dedup_enabled=False,
+        frame_gate=False, condition_thresholds=None, prefilter=None, comparison_models=None
+    ):
+        self.detector = detector
+        self.confidence_threshold = confidence_threshold
+        self.cascade_enabled = cascade_enabled
+        self.uncertainty_band = uncertainty_band
+        self.cascade_inference_size = cascade_inference_size
+        self.detection_cache = DetectionCache() if dedup_enabled else None
+        self.frame_gate = frame_gate
+        self.condition_thresholds = condition_thresholds or {}
+        self.last_condition = None  # Lighting condition of the last frame, with the frame gate
+        self.prefilter = prefilter
+        self.prefilter_scores = {}  # Scores of the frames passed to prescore, by id of the frame
+        self.comparison_models = comparison_models or {}
+        self.last_comparison = {}  # Detections of each comparison model on the last frame
+        self.stats = {
+            'frames': 0, 'escalated': 0, 'pixels': 0, 'inferred_pixels': 0, 'dedup_hits': 0,
+            'blank_frames': 0, 'conditions': {},
+            'prefilter_rejected': 0, 'prefilter_audited': 0, 'prefilter_missed': 0, 'prefilter_passed_positive': 0
+        }
+
+    def get_threshold(self, confidence_threshold):
+        """
+        Returns the confidence threshold for the last frame: the threshold of its
+        lighting condition if one is set, confidence_threshold otherwise.
+        """
+        return self.condition_thresholds.get(self.last_condition) or confidence_threshold
+
+    def prescore(self, images):
+        """
+        Score the frames of a video chunk or burst with the pre-filter in one batch,
+        before they are passed to detect one by one.
+        """
+        self.prefilter_scores = {}
+        if self.prefilter is None or not images:
+            return
+        scores = self.prefilter.score_batch(images)
+        self.prefilter_scores = {id(image): score for image, score in zip(images, scores)}
+
+    def detect(self, image, region_mask=None, camera_key=None):
+        """
+        Returns the detections of the authoritative pass for the image, in full
+        frame coordinates.
+        """
+        self.stats['frames'] += 1
+        # Taken out first, so frames that return early leave no score behind for a later frame with the same id
+        prefilter_score = self.prefilter_scores.pop(id(image), None)
+        self.last_comparison = {name: [] for name in self.comparison_models}
+        if not self.frame_gate and self.prefilter is None:
+            return self.detect_cached(image, region_mask, camera_key)
+
+        condition_stats = None
+        if self.frame_gate:
+            assessment = assess_frame(image)
+            self.last_condition = assessment['condition']
+            condition_stats = self.stats['conditions'].setdefault(
+                self.last_condition, {'frames': 0, 'blank': 0, 'positive': 0}
+            )
+            condition_stats['frames'] += 1
+            if assessment['blank'] is not None:
+                self.stats['blank_frames'] += 1
+                condition_stats['blank'] += 1
+                return []
+
+        audited = False
+        if self.prefilter is not None:
+            if prefilter_score is None:
+                prefilter_score = self.prefilter.score(image)
+            if prefilter_score < self.prefilter.threshold:
+                self.stats['prefilter_rejected'] += 1
+                if self.stats['prefilter_rejected'] % PREFILTER_AUDIT_EVERY:
+                    return []
+                audited = True
+
+        detections = self.detect_cached(image, region_mask, camera_key)
+        threshold = self.get_threshold(self.confidence_threshold)
+        positive = any(d['conf'] > threshold for d in detections)
+        if positive and condition_stats is not None:
+            condition_stats['positive'] += 1
+        if audited:
+            self.stats['prefilter_audited'] += 1
+            self.stats['prefilter_missed'] += int(positive)
+        elif positive and self.prefilter is not None:
+            self.stats['prefilter_passed_positive'] += 1
+        return detections
+
+    def detect_cached(self, image, region_mask=None, camera_key=None):
+        if self.detection_cache is None or camera_key is None:
+            return self.detect_in_frame(image, region_mask)
+
+        image_hash = compute_dhash(image)
+        cached = self.detection_cache.lookup(camera_key, image_hash)
+        if cached is not None:
+            self.stats['dedup_hits'] += 1
+            detections, self.last_comparison = cached
+            return list(detections)
+        detections = self.detect_in_frame(image, region_mask)
+        self.detection_cache.add(camera_key, image_hash, (detections, self.last_comparison))
+        return detections
+
+    def detect_in_frame(self, image, region_mask=None):
+        frame_height, frame_width = image.shape[:2]
+        self.stats['pixels'] += frame_width * frame_height
+        if region_mask is None:
+            self.stats['inferred_pixels'] += frame_width * frame_height
+            self.last_comparison = {
+                name: self.detect_in_image(image, model=model) for name, model in self.comparison_models.items()
+            }
+            return self.detect_in_image(image)
+
+        crop, crop_rect = region_mask.apply(image)
+        self.stats['inferred_pixels'] += crop.shape[0] * crop.shape[1]
+        scale = max(crop.shape[:2]) / max(frame_width, frame_height)
+        self.last_comparison = {
+            name: RegionMask.map_to_frame(
+                self.detect_in_image(crop, scale, model), crop_rect, frame_width, frame_height
+            )
+            for name, model in self.comparison_models.items()
+        }
+        detections = self.detect_in_image(crop, scale)
+        return RegionMask.map_to_frame(detections, crop_rect, frame_width, frame_height)
+
+    def detect_in_image(self, image, scale=1.0, model=None):
+        """
+        Runs model (the main detector by default) on the image, through the
+        resolution cascade when enabled.
+        """
+        model = model or self.detector
+        full_size = get_scaled_inference_size(DETECTOR_INFERENCE_SIZE, scale) if scale < 1 else None
+        if not self.cascade_enabled:
+            return run_detector_on_image(model, image, image_size=full_size)
+
+        cascade_size = get_scaled_inference_size(self.cascade_inference_size, scale)
+        detections = run_detector_on_image(model, image, image_size=cascade_size)
+        max_confidence = max((d['conf'] for d in detections), default=0.0)
+        # The band is centred on the threshold of the frame's lighting condition, set by detect
+        if abs(max_confidence - self.get_threshold(self.confidence_threshold)) <= self.uncertainty_band:
+            # Borderline frame, the full resolution pass decides
+            if model is self.detector:
+                self.stats['escalated'] += 1
+            detections = run_detector_on_image(model, image, image_size=full_size)
+        return detections
+
+
+class DecodeFailure(Exception):
+    """
+    Raised when a video could not be decoded by the isolated decoder process.
+    """
+
+
+class IsolatedDecoder:
+    """
+    Decodes and probes videos in a separate worker process (decode_worker.py) so a
+    truncated or corrupt file cannot hang the processing thread. The worker is reused
+    between files and is only restarted after it times out, stalls, exceeds its
+    memory limit or crashes. The memory limit is checked against the worker's
+    resident memory, read through psutil or /proc.
+    """
+
+    def __init__(
+        self, timeout_seconds=300, memory_limit_mb=DECODE_MEMORY_LIMIT_MB,
+        stall_seconds=DECODE_STALL_SECONDS, max_queued_frames=STREAM_CHUNK_SIZE,
+        probe_timeout_seconds=PROBE_TIMEOUT_SECONDS
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.stall_seconds = stall_seconds
+        self.max_queued_frames = max_queued_frames
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.process = None
+        self.reader = None
+        self.job_id = 0
+        self.memory_warning_logged = False
+
+    def start(self):
+        # Bounded, so the worker cannot decode far ahead of the detector
+        self.results = queue.Queue(maxsize=self.max_queued_frames)
+        self.process = subprocess.Popen(
+            get_decode_worker_command(),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        self.reader = threading.Thread(
+            target=read_worker_results, args=(self.process.stdout, self.results), daemon=True
+        )
+        self.reader.start()
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()  # The worker exits at the end of its jobs
+            self.process.wait(5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        # The reader may be blocked on the full queue, empty it until it sees the end of the stream
+        while self.reader.is_alive():
+            try:
+                self.results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.process.stdout.close()
+        self.process = None
+
+    def restart(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self.close()
+        self.start()
+
+    def worker_memory_mb(self):
+        """
+        Returns the resident memory of the worker in MB, or None when it cannot be read.
+        """
+        if psutil is not None:
+            try:
+                return psutil.Process(self.process.pid).memory_info().rss / (1024 * 1024)
+            except psutil.Error:
+                return None
+        try:
+            with open(f"/proc/{self.process.pid}/status", 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def check_worker(self, decode_seconds, waiting_seconds, timeout_seconds):
+        """
+        Raise DecodeFailure if the current job has run over its limits. Only the time
+        spent waiting for the worker is counted, not the time spent running the
+        detector on the frames it sent.
+        """
+        memory_mb = self.worker_memory_mb() if self.memory_limit_mb else None
+        if self.process.poll() is not None:
+            reason = f"decoder process crashed (exit code {self.process.returncode})"
+        elif decode_seconds > timeout_seconds:
+            reason = f"timed out after {timeout_seconds} seconds"
+        elif waiting_seconds > self.stall_seconds:
+            reason = f"no frame decoded for {self.stall_seconds} seconds"
+        elif memory_mb is not None and memory_mb > self.memory_limit_mb:
+            reason = f"decoder exceeded {self.memory_limit_mb} MB of memory"
         else:
-            prefix = hito_prefix
+            return
+        raise DecodeFailure(reason)
 
+    def run_job(self, kind, video_path, kwargs, log, timeout_seconds):
+        """
+        Yields the ('frame', frame) or ('metadata', metadata) results of one job of the
+        worker process, logging its messages. Raises DecodeFailure if the job failed.
+        """
+        if self.process is None:
+            self.start()
+        elif self.process.poll() is not None:
+            self.restart()
+        if self.memory_limit_mb and not self.memory_warning_logged and self.worker_memory_mb() is None:
+            log(f"Decoder memory limit ({self.memory_limit_mb} MB) not enforced: install psutil to measure it")
+            self.memory_warning_logged = True
+
+        self.job_id += 1
+        try:
+            pickle.dump((self.job_id, kind, video_path, kwargs), self.process.stdin)
+            self.process.stdin.flush()
+        except OSError as e:
+            self.restart()
+            raise DecodeFailure(f"could not send the job to the decoder process: {str(e)}")
+
+        decode_seconds = 0.0
+        waiting_seconds = 0.0
+        finished = False
+        try:
+            while True:
+                wait_start = time.time()
+                try:
+                    job_id, result_kind, payload = self.results.get(timeout=0.5)
+                except queue.Empty:
+                    decode_seconds += time.time() - wait_start
+                    waiting_seconds += time.time() - wait_start
+                    self.check_worker(decode_seconds, waiting_seconds, timeout_seconds)
+                    continue
+                decode_seconds += time.time() - wait_start
+                waiting_seconds = 0.0
+
+                if job_id != self.job_id:
+                    continue  # Leftover message from an earlier job
+                if result_kind == 'frame':
+                    yield result_kind, payload
+                elif result_kind == 'metadata':
+                    finished = True
+                    yield result_kind, payload
+                    return
+                elif result_kind == 'log':
+                    log(payload)
+                elif result_kind == 'done':
+                    finished = True
+                    return
+                else:
+                    finished = True
+                    raise DecodeFailure(payload)
+                self.check_worker(decode_seconds, 0.0, timeout_seconds)
+        finally:
+            if not finished:
+                # The job failed or was abandoned halfway, start over with a fresh worker
+                self.restart()
 
-    # Rename image file if enabled
-    if rename_images:
-        image_dir = os.path.dirname(image_path)
-        new_image_name = prefix + image_file_name
-        new_image_path = os.path.join(image_dir, new_image_name)
+    def iter_frames(self, video_path, log, **source_kwargs):
+        """
+        Yields (frame_number, timestamp, frame) like iter_sampled_frames, decoded in
+        the worker process. Raises DecodeFailure if the file could not be decoded.
+        """
+        for _, sampled_frame in self.run_job('decode', video_path, source_kwargs, log, self.timeout_seconds):
+            yield sampled_frame
 
-        if os.path.exists(new_image_path):
-            log(f"Cannot rename {image_path}: File {new_image_name} already exists")
+    def probe(self, video_path, log):
+        """
+        Returns probe_video_metadata(video_path), read in the worker process. Raises
+        DecodeFailure if the file hangs, crashes or exhausts the worker.
+        """
+        for _, metadata in self.run_job('probe', video_path, {}, log, self.probe_timeout_seconds):
+            return metadata
+        return None
+
+
+# Function to build the command line of the isolated decoder process
+def get_decode_worker_command():
+    """
+    Runs decode_worker.py with the current interpreter. The frozen build has no
+    interpreter, so its own executable is started with DECODE_WORKER_ARGUMENT.
+    """
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, DECODE_WORKER_ARGUMENT]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'decode_worker.py')]
+
+
+# Function run by the thread that reads the results of the isolated decoder process
+def read_worker_results(stream, results):
+    """
+    Puts every pickled message of the worker's stdout on the results queue until the
+    stream ends.
+    """
+    try:
+        while True:
+            results.put(pickle.load(stream))
+    except (EOFError, OSError, pickle.UnpicklingError, ValueError):
+        pass
+
+
+# Function to read the metadata of many videos in parallel
+def prescan_videos(video_files, cache_path, log, max_workers=8, probe=probe_video_metadata):
+    """
+    Reads the metadata of all videos in parallel with probe(video_path) and returns
+    ({video_path: metadata}, {video_path: reason}) of the videos read and of those
+    whose probe raised DecodeFailure. Results are cached in cache_path, keyed by file
+    size and modification time, so reruns over the same folder skip unchanged files.
+    """
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except Exception as e:
+            log(f"Could not read metadata cache {cache_path}: {str(e)}")
+
+    metadata = {}
+    to_probe = []
+    for video_path in video_files:
+        try:
+            stat = os.stat(video_path)
+        except OSError:
+            continue
+        entry = cache.get(video_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            metadata[video_path] = entry['metadata']
         else:
-            os.rename(image_path, new_image_path)
-            log(f"Renamed image: {image_path} -> {new_image_path}")
-            image_file_name = new_image_name  # Update for consistency
+            to_probe.append((video_path, stat))
 
-    # Save detections only if output_base is not None
-    if output_base is not None:
-        output_folder_name = f"{os.path.splitext(image_file_name)[0]}"
-        output_dir = os.path.join(output_base, output_folder_name)
-        os.makedirs(output_dir, exist_ok=True)
+    def probe_or_fail(video_path):
+        try:
+            return probe(video_path), None
+        except DecodeFailure as e:
+            return None, str(e)
+
+    failures = {}
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            probed = executor.map(lambda item: probe_or_fail(item[0]), to_probe)
+            for (video_path, stat), (video_metadata, failure) in zip(to_probe, probed):
+                if failure is not None:
+                    failures[video_path] = failure
+                    continue
+                metadata[video_path] = video_metadata
+                cache[video_path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'metadata': video_metadata}
+
+        if cache_path:
+            try:
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f)
+            except Exception as e:
+                log(f"Could not write metadata cache {cache_path}: {str(e)}")
 
-        output_image_path = os.path.join(output_dir, 'detections.jpg')
-        draw_detections_on_image(image.copy(), valid_detections, confidence_threshold, output_image_path)
-        log(f"Saved detection image to {output_image_path}")
+    log(f"Pre-scanned {len(metadata)} videos ({len(metadata) + len(failures) - len(to_probe)} from cache)")
+    return metadata, failures
 
-        for i, detection in enumerate(valid_detections):
-            cropped_image = crop_image_with_bbox_image(image, detection['bbox'])
-            cropped_image_path = os.path.join(output_dir, f'cropped_image_{i}.jpg')
-            cv2.imwrite(cropped_image_path, cropped_image)
-            log(f"Saved cropped image to {cropped_image_path}")
 
-        log("Image processing complete")
+# Function to estimate the processing cost of a video
+def estimate_video_cost(
+    metadata, every_n_frames, max_duration_seconds,
+    decoder_backend='opencv', sample_every_seconds=0, keyframes_only=False
+):
+    """
+    Estimates the cost of a video in detector calls, plus the cost of the frames
+    that have to be decoded to reach them, under the current sampling settings.
+    """
+    if not metadata or not metadata.get('fps'):
+        metadata = {'duration': max_duration_seconds, 'fps': 30.0, 'mjpeg': False}
+
+    duration = min(metadata['duration'], max_duration_seconds)
+    decoded_frames = duration * metadata['fps']
+    if decoder_backend == 'pyav' and sample_every_seconds > 0:
+        sampled_frames = duration / sample_every_seconds
     else:
-        log("Detection data saving is disabled.")
+        sampled_frames = decoded_frames / every_n_frames
+    if decoder_backend == 'pyav' and keyframes_only:
+        decoded_frames = sampled_frames
+    elif decoder_backend != 'pyav' and metadata.get('mjpeg'):
+        # The MJPEG fast path only decodes the sampled frames
+        decoded_frames = sampled_frames
+    return max(sampled_frames, 1.0) + decoded_frames * DECODE_COST_PER_FRAME
 
-    log("Image processing complete")
 
+# Function to save one frame with its detections and crops
+def save_frame_with_detections(frame, detections, confidence_threshold, output_dir, idx, log):
+    """
+    Saves the frame with its detection boxes drawn, plus one crop per detection.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_image_path = os.path.join(output_dir, f"frame_{idx}_with_detections.jpg")
+    draw_detections_on_image(frame.copy(), detections, confidence_threshold, output_image_path)
+    log(f"Saved frame with detections to {output_image_path}")
 
-def process_video_file(
-    video_file, detector, confidence_threshold, output_base, log, 
-    every_n_frames=16, max_duration_seconds=10, save_all_detections=False,
-    rename_videos=False, delete_no_detections=False, hito_prefix="persona_", animal_prefix="animal_"
-):
+    # Save cropped images for each detection
+    for j, detection in enumerate(detections):
+        cropped_image = crop_image_with_bbox_image(frame, detection['bbox'])
+        cropped_image_path = os.path.join(output_dir, f"frame_{idx}_cropped_{j}.jpg")
+        cv2.imwrite(cropped_image_path, cropped_image)
+        log(f"Saved cropped image to {cropped_image_path}")
+
+
+# Function to measure how sharp the detected region of a frame is
+def measure_sharpness(frame, bbox):
     """
-    Process a single video file.
+    Returns the variance of the Laplacian of the detected region, computed on a
+    small grayscale copy so it stays cheap for large frames.
     """
-    video_path = video_file
-    video_file_name = os.path.basename(video_file)
-    log(f"Processing video: {video_path}")
+    crop = crop_image_with_bbox_image(frame, bbox)
+    if crop.size == 0:
+        return 0.0
+    scale = 128 / max(crop.shape[:2])
+    if scale < 1:
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
 
-    # Load the video
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        log(f"Could not open video {video_path}")
-        return
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    max_frames = int(max_duration_seconds * fps)
+class TopKFrameSelector:
+    """
+    Keeps the K best frames of a video, scored by detection confidence plus the
+    sharpness and size of the detected box. Kept frames are at least min_gap_seconds
+    apart, and only K frames are ever held in memory.
+    """
 
-    log(f"Video FPS: {fps}, Total Frames: {total_frames}, Max Frames to Process: {max_frames}")
+    def __init__(self, k, min_gap_seconds=TOP_K_MIN_GAP_SECONDS, sharpness_weight=0.2, size_weight=0.1):
+        self.k = k
+        self.min_gap_seconds = min_gap_seconds
+        self.sharpness_weight = sharpness_weight
+        self.size_weight = size_weight
+        self.candidates = []
+
+    def score(self, frame, detection):
+        sharpness = measure_sharpness(frame, detection['bbox'])
+        _, _, bbox_width, bbox_height = detection['bbox']
+        size = min(1.0, (bbox_width * bbox_height) ** 0.5)
+        return (
+            detection['conf']
+            + self.sharpness_weight * sharpness / (sharpness + SHARPNESS_SCALE)
+            + self.size_weight * size
+        )
 
-    frame_count = 0
-    temp_dir = tempfile.mkdtemp()
-    frame_files = []
-    frame_indices = []
+    def offer(self, frame, timestamp, detections):
+        """
+        Consider a frame with valid detections for the top K.
+        """
+        detection = max(detections, key=lambda d: d['conf'])
+        candidate = {
+            'score': self.score(frame, detection),
+            'timestamp': timestamp,
+            'frame': frame,
+            'detection': detection,
+        }
 
-    # Variables to track the highest confidence detection
-    best_detection = None
-    best_frame = None
-    max_confidence = -1  # Initialize with a value lower than any confidence score
+        # Frames too close in time compete with each other, the best one stays
+        neighbours = [c for c in self.candidates if abs(c['timestamp'] - timestamp) < self.min_gap_seconds]
+        if neighbours:
+            if any(c['score'] >= candidate['score'] for c in neighbours):
+                return
+            self.candidates = [c for c in self.candidates if c not in neighbours]
+        elif len(self.candidates) >= self.k:
+            worst = min(self.candidates, key=lambda c: c['score'])
+            if worst['score'] >= candidate['score']:
+                return
+            self.candidates.remove(worst)
+        self.candidates.append(candidate)
+
+    def best(self):
+        """
+        Returns the kept candidates, best first.
+        """
+        return sorted(self.candidates, key=lambda c: c['score'], reverse=True)
+
+
+# Function to compute the overlap of two bounding boxes
+def bbox_iou(bbox_a, bbox_b):
+    """
+    Returns the intersection over union of two [x_min, y_min, width, height] boxes.
+    """
+    ax, ay, aw, ah = bbox_a
+    bx, by, bw, bh = bbox_b
+    inter_width = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_height = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = inter_width * inter_height
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+# Function to compute the distance between the centres of two bounding boxes
+def bbox_centroid_distance(bbox_a, bbox_b):
+    """
+    Returns the distance between the centres of two boxes, in normalized units.
+    """
+    ax, ay, aw, ah = bbox_a
+    bx, by, bw, bh = bbox_b
+    return ((ax + aw / 2 - bx - bw / 2) ** 2 + (ay + ah / 2 - by - bh / 2) ** 2) ** 0.5
+
+
+class BoxTracker:
+    """
+    Groups the detections of consecutive sampled frames into tracks, matching boxes
+    greedily by IoU with a centroid distance fallback for small or fast animals.
+    Each track keeps only the crop of its most confident detection.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.1, max_gap_frames=3):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_gap_frames = max_gap_frames
+        self.tracks = []
+        self.step = 0  # Number of sampled frames seen so far
+
+    def update(self, frame, frame_number, timestamp, detections):
+        """
+        Add the valid detections of one sampled frame. Call this for every sampled
+        frame, including those without detections, so track gaps are measured.
+        """
+        self.step += 1
+        active_tracks = [t for t in self.tracks if self.step - t['last_step'] <= self.max_gap_frames]
+
+        pairs = []
+        for track in active_tracks:
+            for index, detection in enumerate(detections):
+                if detection['category'] != track['category']:
+                    continue
+                iou = bbox_iou(track['bbox'], detection['bbox'])
+                distance = bbox_centroid_distance(track['bbox'], detection['bbox'])
+                if iou >= self.iou_threshold or distance <= self.max_centroid_distance:
+                    pairs.append((iou, -distance, id(track), track, index))
+        pairs.sort(key=lambda pair: pair[:3], reverse=True)
+
+        matched_tracks = set()
+        matched_detections = set()
+        for _, _, track_key, track, index in pairs:
+            if track_key in matched_tracks or index in matched_detections:
+                continue
+            matched_tracks.add(track_key)
+            matched_detections.add(index)
+            self.extend_track(track, frame, frame_number, timestamp, detections[index])
+
+        for index, detection in enumerate(detections):
+            if index not in matched_detections:
+                track = {
+                    'id': len(self.tracks),
+                    'category': detection['category'],
+                    'first_frame': frame_number,
+                    'first_timestamp': timestamp,
+                    'max_conf': -1.0,
+                    'detections': 0,
+                }
+                self.tracks.append(track)
+                self.extend_track(track, frame, frame_number, timestamp, detection)
+
+    def extend_track(self, track, frame, frame_number, timestamp, detection):
+        track['bbox'] = detection['bbox']
+        track['last_frame'] = frame_number
+        track['last_timestamp'] = timestamp
+        track['last_step'] = self.step
+        track['detections'] += 1
+        if detection['conf'] > track['max_conf']:
+            track['max_conf'] = detection['conf']
+            track['best_bbox'] = detection['bbox']
+            track['best_frame'] = frame_number
+            # Copy, so the track does not keep the whole frame alive
+            track['crop'] = crop_image_with_bbox_image(frame, detection['bbox']).copy()
+
+
+# Function to save one representative crop per track
+def save_tracks(tracks, output_dir, log):
+    """
+    Saves the best crop of every track and a tracks.json file with their metadata.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    track_metadata = []
+    for track in tracks:
+        cropped_image_path = os.path.join(output_dir, f"track_{track['id']}_cropped.jpg")
+        cv2.imwrite(cropped_image_path, track['crop'])
+        track_metadata.append({
+            'id': track['id'],
+            'category': track['category'],
+            'first_frame': track['first_frame'],
+            'last_frame': track['last_frame'],
+            'first_timestamp': track['first_timestamp'],
+            'last_timestamp': track['last_timestamp'],
+            'max_conf': track['max_conf'],
+            'best_frame': track['best_frame'],
+            'best_bbox': track['best_bbox'],
+            'detections': track['detections'],
+            'crop': os.path.basename(cropped_image_path),
+        })
+
+    tracks_path = os.path.join(output_dir, 'tracks.json')
+    with open(tracks_path, 'w', encoding='utf-8') as f:
+        json.dump(track_metadata, f, indent=2)
+    log(f"Saved {len(tracks)} track crops and {tracks_path}")
+
+
+# Function to get the camera a file belongs to
+def get_camera_key(file_path, input_folder):
+    """
+    Returns the folder of the file relative to the input folder, without the '<date>'
+    folders, so the files of one camera from different dates share a key.
+    """
+    relative_dirs = os.path.relpath(os.path.dirname(file_path), input_folder).split(os.sep)
+    return '/'.join(d for d in relative_dirs if d != '.' and not re.fullmatch(r'\d{8}', d)) or '.'
+
+
+# Function to measure how much a box moves across frames
+def get_bbox_spread(bboxes):
+    """
+    Returns the larger standard deviation of the x and y centres of the boxes,
+    as a share of the frame.
+    """
+    spread = 0.0
+    for axis in (0, 1):
+        centres = [bbox[axis] + bbox[axis + 2] / 2 for bbox in bboxes]
+        mean = sum(centres) / len(centres)
+        spread = max(spread, math.sqrt(sum((c - mean) ** 2 for c in centres) / len(centres)))
+    return spread
+
+
+class CameraDetectionHistory:
+    """
+    Boxes detected by one camera across files. A box found at the same place without
+    motion in many files is a static object (a cord, a rock) rather than an animal,
+    and detections matching it are suppressed. An animal returning to the same spot
+    (a den entrance, a feeding station) moves within the videos it is seen in, which
+    keeps its box from becoming static.
+    """
+
+    def __init__(self, files=0, boxes=None):
+        self.files = files  # Files observed for this camera
+        # {'bbox', 'category', 'files', 'moving_files', 'max_conf', 'suppressed', 'last_file'}
+        self.boxes = boxes or []
+
+    def match(self, detection):
+        best_box = None
+        best_iou = STATIC_IOU_THRESHOLD
+        for box in self.boxes:
+            if box['category'] != detection['category']:
+                continue
+            iou = bbox_iou(box['bbox'], detection['bbox'])
+            if iou >= best_iou:
+                best_box = box
+                best_iou = iou
+        return best_box
+
+    def is_static(self, box):
+        moving_files = box.get('moving_files', 0)
+        still_files = box['files'] - moving_files
+        return (
+            still_files >= STATIC_MIN_FILES and still_files >= STATIC_MIN_FILE_SHARE * self.files
+            and moving_files <= STATIC_MAX_MOVING_SHARE * box['files']
+        )
+
+    def filter(self, detections, count=True):
+        """
+        Returns (kept, suppressed) detections, where suppressed detections match a
+        static box. With count False the suppressions are not added to the boxes.
+        """
+        kept = []
+        suppressed = []
+        for detection in detections:
+            box = self.match(detection)
+            if box is not None and self.is_static(box):
+                box['suppressed'] += int(count)
+                suppressed.append(detection)
+            else:
+                kept.append(detection)
+        return kept, suppressed
+
+    def observe(self, frames):
+        """
+        Add the detections of one file, given as one list of detections per sampled
+        frame (a single list for an image). Each box counts once per file however many
+        frames it was found in. In a video, the file counts as a moving sighting of a
+        box that is missing from many sampled frames or whose position spreads.
+        """
+        file_boxes = []  # [box, bboxes in this file, frames it was found in]
+        for frame_index, detections in enumerate(frames):
+            for detection in detections:
+                box = self.match(detection)
+                if box is None:
+                    box = {
+                        'bbox': list(detection['bbox']), 'category': detection['category'],
+                        'files': 0, 'moving_files': 0, 'max_conf': 0.0, 'suppressed': 0, 'last_file': 0
+                    }
+                    self.boxes.append(box)
+                entry = next((entry for entry in file_boxes if entry[0] is box), None)
+                if entry is None:
+                    entry = [box, [], set()]
+                    file_boxes.append(entry)
+                entry[1].append(detection['bbox'])
+                entry[2].add(frame_index)
+                box['max_conf'] = max(box['max_conf'], detection['conf'])
+
+        for box, bboxes, frame_indices in file_boxes:
+            box['files'] += 1
+            # Running mean of the position over the files it was seen in
+            file_bbox = [sum(values) / len(values) for values in zip(*bboxes)]
+            box['bbox'] = [
+                (old * (box['files'] - 1) + new) / box['files']
+                for old, new in zip(box['bbox'], file_bbox)
+            ]
+            if len(frames) > 1 and (
+                len(frame_indices) < STATIC_MIN_FRAME_SHARE * len(frames)
+                or get_bbox_spread(bboxes) > STATIC_MAX_BOX_SPREAD
+            ):
+                box['moving_files'] = box.get('moving_files', 0) + 1
+            box['last_file'] = self.files
+        self.files += 1
+
+        if len(self.boxes) > STATIC_MAX_BOXES_PER_CAMERA:
+            # Keep the boxes seen most often, and the most recent among equals
+            self.boxes.sort(key=lambda b: (b['files'], b['last_file']), reverse=True)
+            del self.boxes[STATIC_MAX_BOXES_PER_CAMERA:]
+
+    def static_boxes(self):
+        return [box for box in self.boxes if self.is_static(box)]
+
+
+class StaticDetectionIndex:
+    """
+    Detection histories of all cameras of an input folder, saved between runs.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.cameras = {}
+
+    def load(self, log):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.cameras = {
+                camera_key: CameraDetectionHistory(history['files'], history['boxes'])
+                for camera_key, history in data.items()
+            }
+        except Exception as e:
+            log(f"Could not read static detections {self.index_path}: {str(e)}")
+
+    def save(self, log):
+        try:
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    camera_key: {'files': history.files, 'boxes': history.boxes}
+                    for camera_key, history in self.cameras.items()
+                }, f)
+        except Exception as e:
+            log(f"Could not write static detections {self.index_path}: {str(e)}")
+
+    def save_cameras(self, camera_keys, log):
+        """
+        Save only the histories of camera_keys, keeping the other cameras as they are
+        in the file. Used by distributed workers, which each own whole cameras.
+        """
+        try:
+            with locked_file(self.index_path):
+                stored = {}
+                if os.path.exists(self.index_path):
+                    with open(self.index_path, 'r', encoding='utf-8') as f:
+                        stored = json.load(f)
+                for camera_key in camera_keys:
+                    if camera_key in self.cameras:
+                        history = self.cameras[camera_key]
+                        stored[camera_key] = {'files': history.files, 'boxes': history.boxes}
+                write_json_atomic(self.index_path, stored)
+        except Exception as e:
+            log(f"Could not write static detections {self.index_path}: {str(e)}")
+
+    def camera(self, camera_key):
+        if camera_key not in self.cameras:
+            self.cameras[camera_key] = CameraDetectionHistory()
+        return self.cameras[camera_key]
+
+    def report(self):
+        """
+        Returns one entry per static box that suppressed detections.
+        """
+        entries = []
+        for camera_key, history in sorted(self.cameras.items()):
+            for box in history.static_boxes():
+                if box['suppressed'] == 0:
+                    continue
+                entries.append({
+                    'camera': camera_key,
+                    'bbox': box['bbox'],
+                    'category': box['category'],
+                    'suppressed': box['suppressed'],
+                    'reason': (
+                        f"seen at the same place without motion in {box['files'] - box.get('moving_files', 0)} "
+                        f"of {history.files} files"
+                    ),
+                })
+        return entries
+
+
+# Function to turn detection timestamps into time ranges
+def build_detection_segments(timestamps, padding_seconds):
+    """
+    Returns the sorted, merged (start, end) ranges covering every detection
+    timestamp with padding_seconds on both sides.
+    """
+    segments = []
+    for timestamp in sorted(timestamps):
+        start = max(0.0, timestamp - padding_seconds)
+        end = timestamp + padding_seconds
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], max(segments[-1][1], end))
+        else:
+            segments.append((start, end))
+    return segments
+
+
+# Function to tell whether a video is a detection clip written by export_video_segments
+def is_segment_clip(file_path):
+    """
+    Clips are named <video>_segment_<n><ext> and can be written next to their source
+    video, so file discovery skips them instead of processing them again. Only files
+    listed in the SEGMENT_MANIFEST_FILE_NAME of their folder count, so user videos
+    that happen to be named like a clip are still processed.
+    """
+    file_name = os.path.basename(file_path)
+    if re.search(r'_segment_\d+$', os.path.splitext(file_name)[0]) is None:
+        return False
+    manifest_path = os.path.join(os.path.dirname(file_path), SEGMENT_MANIFEST_FILE_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return file_name in json.load(f).get('clips', [])
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+# Function to record the clips written to a folder
+def add_to_segment_manifest(output_dir, clip_paths):
+    """
+    Adds the names of the clips to the SEGMENT_MANIFEST_FILE_NAME of their folder,
+    which is what is_segment_clip looks them up in.
+    """
+    manifest_path = os.path.join(output_dir, SEGMENT_MANIFEST_FILE_NAME)
+    with locked_file(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                clips = json.load(f).get('clips', [])
+        except (OSError, ValueError, AttributeError):
+            clips = []
+        clips.extend(os.path.basename(clip_path) for clip_path in clip_paths if os.path.basename(clip_path) not in clips)
+        write_json_atomic(manifest_path, {'clips': clips})
+
+
+# Function to cut detection segments out of a video without re-encoding
+def export_video_segments(video_path, segments, output_dir, log):
+    """
+    Cuts each (start, end) range out of the video with FFmpeg stream copy and
+    returns the paths of the clips written. An end of None runs to the end of the
+    video. Cuts snap to the nearest keyframe before the start, since nothing is
+    re-encoded. The clips are recorded in the folder's segment manifest.
+    """
+    ffmpeg_path = shutil.which('ffmpeg')
+    if ffmpeg_path is None:
+        log("FFmpeg was not found on the PATH, detection clips cannot be exported")
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem, ext = os.path.splitext(os.path.basename(video_path))
+    clip_paths = []
+    for i, (start, end) in enumerate(segments):
+        clip_path = os.path.join(output_dir, f"{stem}_segment_{i}{ext}")
+        duration_args = ['-t', f"{end - start:.3f}"] if end is not None else []
+        range_text = f"{start:.1f}-{end:.1f} s" if end is not None else f"{start:.1f} s to the end"
+        command = [
+            ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+            '-ss', f"{start:.3f}", '-i', video_path, *duration_args,
+            '-map', '0', '-c', 'copy', '-avoid_negative_ts', 'make_zero', clip_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0 or not os.path.exists(clip_path) or os.path.getsize(clip_path) == 0:
+            log(f"Failed to export {range_text} of {video_path}: {result.stderr.strip()}")
+            continue
+        clip_paths.append(clip_path)
+        log(f"Exported {range_text} to {clip_path}")
+    if clip_paths:
+        try:
+            add_to_segment_manifest(output_dir, clip_paths)
+        except Exception as e:
+            log(f"Could not update the clip list of {output_dir}: {str(e)}")
+    return clip_paths
+
+
+# Function to split an iterator into chunks
+def iter_chunks(iterable, chunk_size):
+    """
+    Yields lists of up to chunk_size consecutive items.
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Function to read the peak memory use of the process
+def get_peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB, or None when it
+    cannot be measured on this platform.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and in kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, 'peak_wset', memory_info.rss) / (1024 * 1024)
+    return None
+
+
+# Function to read the EXIF thumbnail of a JPEG without decoding the image
+def read_exif_thumbnail(image_path):
+    """
+    Returns the thumbnail embedded in the EXIF data (IFD1) of a JPEG as a BGR image,
+    or None if there is none. Only the first few KB of the file are read.
+    """
+    with open(image_path, 'rb') as f:
+        data = f.read(EXIF_HEADER_READ_BYTES)
+    if data[:2] != b'\xff\xd8':
+        return None
+
+    # Walk the JPEG segments up to the APP1 segment holding the EXIF data
+    pos = 2
+    tiff = None
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+            tiff = data[pos + 10:pos + 2 + length]
+            break
+        if marker == 0xDA:  # Start of scan, no EXIF segment
+            return None
+        pos += 2 + length
+    if tiff is None or len(tiff) < 8:
+        return None
+
+    # IFD1 follows IFD0 and holds the offset and length of the thumbnail JPEG
+    byte_order = '<' if tiff[:2] == b'II' else '>'
+    try:
+        ifd0_offset = struct.unpack(byte_order + 'I', tiff[4:8])[0]
+        ifd0_entries = struct.unpack(byte_order + 'H', tiff[ifd0_offset:ifd0_offset + 2])[0]
+        next_offset = ifd0_offset + 2 + 12 * ifd0_entries
+        ifd1_offset = struct.unpack(byte_order + 'I', tiff[next_offset:next_offset + 4])[0]
+        if ifd1_offset == 0:
+            return None
+        ifd1_entries = struct.unpack(byte_order + 'H', tiff[ifd1_offset:ifd1_offset + 2])[0]
+        thumbnail_offset = thumbnail_length = None
+        for i in range(ifd1_entries):
+            entry = tiff[ifd1_offset + 2 + 12 * i:ifd1_offset + 14 + 12 * i]
+            tag = struct.unpack(byte_order + 'H', entry[:2])[0]
+            if tag == 0x0201:  # JPEGInterchangeFormat
+                thumbnail_offset = struct.unpack(byte_order + 'I', entry[8:12])[0]
+            elif tag == 0x0202:  # JPEGInterchangeFormatLength
+                thumbnail_length = struct.unpack(byte_order + 'I', entry[8:12])[0]
+    except struct.error:
+        return None
+    if not thumbnail_offset or not thumbnail_length:
+        return None
+
+    thumbnail_data = tiff[thumbnail_offset:thumbnail_offset + thumbnail_length]
+    if len(thumbnail_data) < thumbnail_length:
+        return None
+    return cv2.imdecode(np.frombuffer(thumbnail_data, np.uint8), cv2.IMREAD_COLOR)
+
+
+# Function to find the end of the main image of a JPEG
+def find_jpeg_image_end(data):
+    """
+    Returns the offset of the end of image marker that closes the scan data of the
+    main image, or None when the data is truncated before it. Markers inside the EXIF
+    segment (the thumbnail) and trailers appended after the image are not mistaken
+    for it.
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker == 0xDA:
+            # Inside the scan data 0xFF bytes are stuffed, so the first marker found is the real end
+            end = data.find(b'\xff\xd9', pos + 2 + length)
+            return end if end >= 0 else None
+        pos += 2 + length
+    return None
+
+
+# Function to cheaply reject still images before decoding them
+def triage_image_file(image_path):
+    """
+    Returns 'corrupt' for a truncated JPEG, 'blank' when the frame gate finds its EXIF
+    thumbnail blank (black, washed out or fogged), and None when the image has to be
+    inferred, including images without a thumbnail.
+    """
+    if os.path.splitext(image_path)[1].lower() not in ('.jpg', '.jpeg'):
+        return None
+    try:
+        with open(image_path, 'rb') as f:
+            f.seek(max(os.fstat(f.fileno()).st_size - 1024, 0))
+            if b'\xff\xd9' not in f.read():  # End of image marker, usually at the very end
+                # Some cameras append MPF or maker data longer than the tail after the image
+                f.seek(0)
+                if find_jpeg_image_end(f.read()) is None:
+                    return 'corrupt'
+        thumbnail = read_exif_thumbnail(image_path)
+    except OSError:
+        return 'corrupt'
+    if thumbnail is None:
+        return None
+    if assess_frame(thumbnail)['blank'] is not None:
+        return 'blank'
+    return None
+
+
+# Function to read the capture time of a still image
+def get_capture_time(image_path, fallback_to_mtime=True):
+    """
+    Returns the EXIF DateTimeOriginal of the image as a timestamp, falling back to the
+    EXIF DateTime and then to the file modification time (or None without
+    fallback_to_mtime).
+    """
+    try:
+        with Image.open(image_path) as image:
+            exif = image.getexif()
+            capture_time = exif.get_ifd(0x8769).get(36867) or exif.get(306)  # DateTimeOriginal, DateTime
+        if capture_time:
+            return datetime.strptime(str(capture_time).strip('\x00 '), '%Y:%m:%d %H:%M:%S').timestamp()
+    except Exception:
+        pass
+    if not fallback_to_mtime:
+        return None
+    try:
+        return os.path.getmtime(image_path)
+    except OSError:
+        return 0.0
+
+
+# Function to group still images into the sequences (bursts) of each camera trigger
+def group_image_sequences(
+    image_files, max_gap_seconds=SEQUENCE_MAX_GAP_SECONDS, max_images=SEQUENCE_MAX_IMAGES,
+    max_span_seconds=SEQUENCE_MAX_SPAN_SECONDS, get_time=None
+):
+    """
+    Returns lists of images from the same folder whose capture times are at most
+    max_gap_seconds apart, each sorted by capture time and cut after max_images
+    images or max_span_seconds. Images without an EXIF capture time form sequences
+    of their own, since modification times of copied files say nothing about bursts.
+    get_time(image_file) replaces the EXIF lookup, for tests.
+    """
+    get_time = get_time or (lambda image_file: get_capture_time(image_file, fallback_to_mtime=False))
+    images_by_folder = {}
+    sequences = []
+    for image_file in image_files:
+        capture_time = get_time(image_file)
+        if capture_time is None:
+            sequences.append([image_file])
+        else:
+            images_by_folder.setdefault(os.path.dirname(image_file), []).append((capture_time, image_file))
+
+    for folder_images in images_by_folder.values():
+        folder_images.sort()
+        sequence = []
+        first_time = last_time = None
+        for capture_time, image_file in folder_images:
+            if sequence and (
+                capture_time - last_time > max_gap_seconds
+                or capture_time - first_time > max_span_seconds
+                or len(sequence) >= max_images
+            ):
+                sequences.append(sequence)
+                sequence = []
+            if not sequence:
+                first_time = capture_time
+            sequence.append(image_file)
+            last_time = capture_time
+        if sequence:
+            sequences.append(sequence)
+    return sequences
+
+
+# Function to create the result record of a processed file
+def new_result_record(file_path, file_type):
+    """
+    Returns the record describing the outcome of a file. 'status' is one of
+    'unreadable', 'no_detections', 'detected', 'sequence_detected' (kept for the
+    detections of its burst) or 'quarantined', 'categories' maps each
+    detected category to its highest confidence, and 'output_file' is the path of the
+    file after renaming (None if it was deleted).
+    """
+    return {
+        'file': file_path,
+        'type': file_type,
+        'status': 'unreadable',
+        'categories': {},
+        'prefix': "",
+        'output_file': file_path,
+    }
+
+
+# Function to add detections to the per-category confidences of a result record
+def add_detections_to_record(record, detections):
+    for detection in detections:
+        category = detection['category']
+        record['categories'][category] = max(record['categories'].get(category, 0.0), detection['conf'])
+
+
+# Function to add the detections of the comparison models on one frame to a result record
+def add_comparison_to_record(record, comparison, confidence_threshold, static_history=None):
+    """
+    Keeps per model 'categories' (highest confidence per category) and
+    'detection_frames' under record['models'][model name]. Detections are thresholded
+    and, with static_history, filtered like those of the main detector.
+    """
+    for name, detections in comparison.items():
+        model_record = record.setdefault('models', {}).setdefault(name, {'categories': {}, 'detection_frames': 0})
+        valid_detections = [d for d in detections if d['conf'] > confidence_threshold]
+        if static_history is not None:
+            valid_detections, _ = static_history.filter(valid_detections, count=False)
+        if valid_detections:
+            model_record['detection_frames'] += 1
+            add_detections_to_record(model_record, valid_detections)
+
+
+# Function to run the detector on an image file
+def detect_image_file(
+    image_file, detector, confidence_threshold, log, result, region_mask=None, static_history=None,
+    camera_key=None, loaded=None
+):
+    """
+    Returns (image, reduce_factor, valid_detections, max_confidence) for an image file,
+    with image None if it could not be read. max_confidence is the best confidence of
+    any detection, also under the threshold. With static_history (the
+    CameraDetectionHistory of the image's camera), detections of known static objects
+    are dropped. loaded is the (image, reduce_factor) of an image already decoded.
+    """
+    log(f"Processing image: {image_file}")
+    image, reduce_factor = loaded if loaded is not None else load_image_for_inference(image_file)
+    if image is None:
+        log(f"Could not read {image_file}")
+        return None, 1, [], 0.0
+    if reduce_factor > 1:
+        log(f"Decoded {image_file} at 1/{reduce_factor} scale for detection")
+
+    detections = detector.detect(image, region_mask, camera_key)
+    threshold = detector.get_threshold(confidence_threshold)
+    valid_detections = [d for d in detections if d['conf'] > threshold]
+    if detector.last_condition is not None:
+        result['condition'] = detector.last_condition
+    add_comparison_to_record(result, detector.last_comparison, threshold, static_history)
+    if static_history is not None:
+        observed_detections = valid_detections
+        valid_detections, suppressed = static_history.filter(valid_detections)
+        static_history.observe([observed_detections])
+        if suppressed:
+            log(f"Suppressed {len(suppressed)} static detections in {image_file}")
+            result['suppressed'] = len(suppressed)
+    max_confidence = max((d['conf'] for d in detections), default=0.0)
+    return image, reduce_factor, valid_detections, max_confidence
+
+
+# Function to pick the file prefix from the detections
+def get_detection_prefix(detections, hito_prefix, animal_prefix):
+    # Determine prefix based on detection type
+    prefix = ""
+
+    for detection in detections:
+        if detection['category'] == '1':
+            prefix = animal_prefix
+        else:
+            prefix = hito_prefix
+    return prefix
+
+
+# Function to delete, or rename and save the detections of, an image file
+def finish_image_file(
+    image_file, result, image, reduce_factor, valid_detections, prefix, confidence_threshold,
+    output_base, log, rename_images=False, delete_no_detections=False, species_classifier=None
+):
+    """
+    Applies the outcome of an image: with prefix None it has no detections and is
+    deleted if enabled, unless its detections were suppressed as static, otherwise it is renamed with the prefix and its detections
+    are saved. With species_classifier, its animal crops are queued for classification.
+    Returns the result record.
+    """
+    image_path = image_file
+    image_file_name = os.path.basename(image_file)
+
+    if prefix is None:
+        log(f"No valid detections in {image_path}")
+        result['status'] = 'no_detections'
+        if delete_no_detections and result.get('suppressed'):
+            log(f"Kept {image_path} because its only detections were suppressed as static")
+        elif delete_no_detections:
+            try:
+                os.remove(image_path)
+                log(f"Deleted image: {image_path}")
+                result['output_file'] = None
+            except Exception as e:
+                log(f"Failed to delete {image_path}: {str(e)}")
+        return result  # Do not proceed further
+
+    # Images without detections of their own are kept when their sequence has some
+    result['status'] = 'detected' if valid_detections else 'sequence_detected'
+    add_detections_to_record(result, valid_detections)
+    result['prefix'] = prefix
+
+
+    # Rename image file if enabled
+    if rename_images:
+        image_dir = os.path.dirname(image_path)
+        new_image_name = prefix + image_file_name
+        new_image_path = os.path.join(image_dir, new_image_name)
+
+        if os.path.exists(new_image_path):
+            log(f"Cannot rename {image_path}: File {new_image_name} already exists")
+        else:
+            os.rename(image_path, new_image_path)
+            log(f"Renamed image: {image_path} -> {new_image_path}")
+            image_file_name = new_image_name  # Update for consistency
+            image_path = new_image_path       # Update image_path as well
+            result['output_file'] = image_path
+
+    if species_classifier is not None:
+        animal_crops = [
+            crop_image_with_bbox_image(image, detection['bbox'])
+            for detection in valid_detections if detection['category'] == '1'
+        ]
+        if animal_crops:
+            species_classifier.add(result, animal_crops)
+
+    # Save detections only if output_base is not None
+    if output_base is not None and valid_detections:
+        output_folder_name = f"{os.path.splitext(image_file_name)[0]}"
+        output_dir = os.path.join(output_base, output_folder_name)
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Crops are cut from the full-resolution image, decoded only now that a detection was found
+        if reduce_factor > 1:
+            full_image = cv2.imread(image_path)
+            if full_image is not None:
+                image = full_image
+            else:
+                log(f"Could not read full resolution {image_path}, saving reduced image instead")
+
+        output_image_path = os.path.join(output_dir, 'detections.jpg')
+        draw_detections_on_image(image.copy(), valid_detections, confidence_threshold, output_image_path)
+        log(f"Saved detection image to {output_image_path}")
+
+        for i, detection in enumerate(valid_detections):
+            cropped_image = crop_image_with_bbox_image(image, detection['bbox'])
+            cropped_image_path = os.path.join(output_dir, f'cropped_image_{i}.jpg')
+            cv2.imwrite(cropped_image_path, cropped_image)
+            log(f"Saved cropped image to {cropped_image_path}")
+
+        log("Image processing complete")
+    elif output_base is None:
+        log("Detection data saving is disabled.")
+
+    log("Image processing complete")
+    return result
+
+
+def process_image_file(
+    image_file, detector, confidence_threshold, output_base, log,
+    rename_images=False, delete_no_detections=False, hito_prefix="persona_", animal_prefix="animal_",
+    region_mask=None, static_history=None, camera_key=None, species_classifier=None
+):
+    """
+    Process a single image file. Returns its result record.
+    With static_history (the CameraDetectionHistory of the image's camera), detections
+    of known static objects are dropped before deciding to rename or delete.
+    """
+    result = new_result_record(image_file, 'image')
+    image, reduce_factor, valid_detections, _ = detect_image_file(
+        image_file, detector, confidence_threshold, log, result, region_mask, static_history, camera_key
+    )
+    if image is None:
+        return result
+
+    prefix = get_detection_prefix(valid_detections, hito_prefix, animal_prefix) if valid_detections else None
+    return finish_image_file(
+        image_file, result, image, reduce_factor, valid_detections, prefix, confidence_threshold,
+        output_base, log, rename_images=rename_images, delete_no_detections=delete_no_detections,
+        species_classifier=species_classifier
+    )
+
+
+# Function to decode some images of a sequence and pre-score them in one batch
+def iter_sequence_images(image_files, indices, detector, batch_size=SEQUENCE_DECODE_BATCH):
+    """
+    Yields (index, (image, reduce_factor)) for the images at indices, decoding them
+    batch_size at a time and passing each batch of readable images to the detector's
+    pre-filter, so only one batch is held in memory.
+    """
+    for batch in iter_chunks(indices, batch_size):
+        loaded = [(i, load_image_for_inference(image_files[i])) for i in batch]
+        detector.prescore([image for _, (image, _) in loaded if image is not None])
+        yield from loaded
+
+
+# Function to process a burst of still images as one sequence
+def process_image_sequence(
+    image_files, detector, confidence_threshold, output_base, log,
+    rename_images=False, delete_no_detections=False, hito_prefix="persona_", animal_prefix="animal_",
+    region_mask=None, static_history=None, camera_key=None, borderline_margin=SEQUENCE_BORDERLINE_MARGIN,
+    species_classifier=None
+):
+    """
+    Process the images of one camera trigger together. The first and middle images are
+    inferred first; the rest only if one of them has a detection or a confidence within
+    borderline_margin under the threshold. The sequence outcome applies to every image:
+    all are kept and renamed when any image has a detection, otherwise all count as
+    empty. Only images that were inferred are deleted, the others are never removed
+    on the strength of another image. Images are decoded lazily and only those with
+    detections are kept until the sequence outcome is known. Returns the result
+    records in the order of image_files.
+    """
+    log(f"Processing sequence of {len(image_files)} images starting with {image_files[0]}")
+    results = [new_result_record(image_file, 'image') for image_file in image_files]
+    for result in results:
+        result['sequence'] = image_files[0]
+
+    inferred = {}  # index -> (image if it has detections else None, reduce_factor, valid_detections)
+    unreadable = set()
+    borderline = False
+
+    def infer(indices):
+        nonlocal borderline
+        for i, loaded in iter_sequence_images(image_files, indices, detector):
+            image, reduce_factor, valid_detections, max_confidence = detect_image_file(
+                image_files[i], detector, confidence_threshold, log, results[i], region_mask, static_history,
+                camera_key, loaded
+            )
+            if image is None:
+                unreadable.add(i)
+            # Compared with the threshold of the image's own lighting condition
+            if max_confidence > detector.get_threshold(confidence_threshold) - borderline_margin:
+                borderline = True
+            inferred[i] = (image if valid_detections else None, reduce_factor, valid_detections)
+
+    infer(sorted({0, len(image_files) // 2}))
+    positive = any(valid_detections for _, _, valid_detections in inferred.values())
+
+    if positive or borderline:
+        infer([i for i in range(len(image_files)) if i not in inferred])
+        positive = any(valid_detections for _, _, valid_detections in inferred.values())
+    else:
+        log(f"Sequence empty after {len(inferred)} of {len(image_files)} images, skipping the rest")
+
+    prefix = None
+    if positive:
+        sequence_detections = [d for i in sorted(inferred) for d in inferred[i][2]]
+        prefix = get_detection_prefix(sequence_detections, hito_prefix, animal_prefix)
+
+    for i, image_file in enumerate(image_files):
+        if i in unreadable:
+            continue  # Unreadable images are left alone
+        results[i]['inferred'] = i in inferred
+        image, reduce_factor, valid_detections = inferred.pop(i, (None, 1, []))
+        finish_image_file(
+            image_file, results[i], image, reduce_factor, valid_detections, prefix, confidence_threshold,
+            output_base, log, rename_images=rename_images,
+            delete_no_detections=delete_no_detections and results[i]['inferred'],
+            species_classifier=species_classifier
+        )
+        del image  # Free the decoded image before finishing the next one
+    return results
+
+
+def process_video_file(
+    video_file, detector, confidence_threshold, output_base, log, 
+    every_n_frames=16, max_duration_seconds=10, save_all_detections=False,
+    rename_videos=False, delete_no_detections=False, hito_prefix="persona_", animal_prefix="animal_",
+    decoder_backend='opencv', sample_every_seconds=0, keyframes_only=False, frame_decoder=None,
+    chunk_size=STREAM_CHUNK_SIZE, top_k_frames=1, track_detections=False,
+    export_segments=False, segment_padding_seconds=2.0, replace_with_segments=False, region_mask=None,
+    static_history=None, camera_key=None, species_classifier=None, video_duration=None
+):
+    """
+    Process a single video file. Frames are decoded, inferred and saved in chunks of
+    chunk_size frames, so memory use does not grow with the length of the video.
+    With top_k_frames above 1, the best few well-spread frames are saved instead of
+    only the highest confidence one. With track_detections, boxes are grouped into
+    tracks across frames and one crop is saved per track. With export_segments, the
+    time ranges around the detections are cut out of the video as clips, which can
+    optionally replace the original video. Unless video_duration (in seconds) shows
+    the whole video was scanned, the last replacing clip runs to the end of the file,
+    so footage after max_duration_seconds is never lost.
+    When frame_decoder (an IsolatedDecoder) is given, frames are decoded in its
+    worker process and DecodeFailure is raised for files that cannot be decoded.
+    With static_history, detections of known static objects of the camera are dropped.
+    With species_classifier, the crop of the most confident animal detection is queued
+    for classification.
+    Returns the result record of the video.
+    """
+    video_path = video_file
+    video_file_name = os.path.basename(video_file)
+    log(f"Processing video: {video_path}")
+    result = new_result_record(video_file, 'video')
+
+    # Variables to track the highest confidence detection
+    best_detection = None
+    best_frame = None
+    max_confidence = -1  # Initialize with a value lower than any confidence score
+    top_k_selector = TopKFrameSelector(top_k_frames) if top_k_frames > 1 else None
+    tracker = BoxTracker() if track_detections and output_base is not None else None
+
+    # With save_all_detections, frames are saved as they are processed to a folder
+    # named after the original file, which is renamed along with the video at the end
+    streaming_output_dir = None
+    if save_all_detections and output_base is not None and tracker is None:
+        streaming_output_dir = os.path.join(output_base, os.path.splitext(video_file_name)[0])
+    saved_frames = 0
+
+    # Flag to indicate if any detections were found
+    detections_found = False
+    prefix = ""
+    detection_timestamps = []
+    observed_frames = []  # Detections of each sampled frame before static suppression, to learn from
+    suppressed_count = 0
+    best_animal_conf = -1
+    best_animal_crop = None  # Crop of the most confident animal detection, for species_classifier
+
+    source_kwargs = dict(
+        every_n_frames=every_n_frames,
+        max_duration_seconds=max_duration_seconds,
+        decoder_backend=decoder_backend,
+        sample_every_seconds=sample_every_seconds,
+        keyframes_only=keyframes_only
+    )
+    if frame_decoder is not None:
+        frame_source = frame_decoder.iter_frames(video_path, log, **source_kwargs)
+    else:
+        frame_source = iter_sampled_frames(video_path, log=log, **source_kwargs)
+
+    # Decode and process the sampled frames chunk by chunk
+    sampled_count = 0
+    chunk_count = 0
+    for chunk in iter_chunks(frame_source, chunk_size):
+        sampled_count += len(chunk)
+        chunk_count += 1
+        detector.prescore([frame for _, _, frame in chunk])
+        for frame_number, timestamp, frame in chunk:
+            detections = detector.detect(frame, region_mask, camera_key)
+            threshold = detector.get_threshold(confidence_threshold)
+            valid_detections = [d for d in detections if d['conf'] > threshold]
+            if detector.last_condition is not None:
+                conditions = result.setdefault('conditions', {})
+                conditions[detector.last_condition] = conditions.get(detector.last_condition, 0) + 1
+            add_comparison_to_record(result, detector.last_comparison, threshold, static_history)
+            if static_history is not None:
+                observed_frames.append(valid_detections)
+                valid_detections, suppressed = static_history.filter(valid_detections)
+                suppressed_count += len(suppressed)
+            if tracker is not None:
+                tracker.update(frame, frame_number, timestamp, valid_detections)
+            if not valid_detections:
+                continue
+
+            detections_found = True  # At least one detection over the threshold found
+            detection_timestamps.append(timestamp)
+            add_detections_to_record(result, valid_detections)
+            # Update detection types for renaming
+            for detection in valid_detections:
+                if detection['category'] == '1':
+                    prefix = animal_prefix
+                else:
+                    prefix = hito_prefix
+            if species_classifier is not None:
+                for detection in valid_detections:
+                    if detection['category'] == '1' and detection['conf'] > best_animal_conf:
+                        best_animal_conf = detection['conf']
+                        best_animal_crop = crop_image_with_bbox_image(frame, detection['bbox']).copy()
+
+            if tracker is not None:
+                pass  # Crops are kept per track
+            elif streaming_output_dir is not None:
+                save_frame_with_detections(
+                    frame, valid_detections, confidence_threshold, streaming_output_dir, saved_frames, log
+                )
+                saved_frames += 1
+            elif top_k_selector is not None:
+                top_k_selector.offer(frame, timestamp, valid_detections)
+            else:
+                # Update max confidence and best detection
+                for detection in valid_detections:
+                    if detection['conf'] > max_confidence:
+                        max_confidence = detection['conf']
+                        best_detection = detection
+                        best_frame = frame.copy()
+
+    if sampled_count == 0:
+        log(f"No frames extracted from {video_path}")
+        return result
+
+    if static_history is not None:
+        static_history.observe(observed_frames)
+        if suppressed_count:
+            log(f"Suppressed {suppressed_count} static detections in {video_path}")
+            result['suppressed'] = suppressed_count
+
+    result['sampled_frames'] = sampled_count
+    result['detection_frames'] = len(detection_timestamps)
+    if not detections_found:
+        log(f"No valid detections in {video_path}")
+        result['status'] = 'no_detections'
+        if delete_no_detections and suppressed_count:
+            log(f"Kept {video_path} because its only detections were suppressed as static")
+        elif delete_no_detections:
+            try:
+                os.remove(video_path)
+                log(f"Deleted video: {video_path}")
+                result['output_file'] = None
+            except Exception as e:
+                log(f"Failed to delete {video_path}: {str(e)}")
+        return result  # Do not proceed further
+
+    result['status'] = 'detected'
+    result['prefix'] = prefix
+
+    # Rename video file if enabled
+    if rename_videos:
+        video_dir = os.path.dirname(video_path)
+        new_video_name = prefix + video_file_name
+        new_video_path = os.path.join(video_dir, new_video_name)
+
+        if os.path.exists(new_video_path):
+            log(f"Cannot rename {video_path}: File {new_video_name} already exists")
+        else:
+            os.rename(video_path, new_video_path)
+            log(f"Renamed video: {video_path} -> {new_video_path}")
+            video_file_name = new_video_name  # Update for consistency
+            video_path = new_video_path       # Update video_path as well
+            result['output_file'] = video_path
+
+    if best_animal_crop is not None:
+        species_classifier.add(result, [best_animal_crop])
+
+    # Save detections only if output_base is not None
+    if output_base is not None:
+        output_folder_name = f"{os.path.splitext(video_file_name)[0]}"
+        output_dir = os.path.join(output_base, output_folder_name)
+
+        if tracker is not None:
+            save_tracks(tracker.tracks, output_dir, log)
+            log(f"Grouped {sum(t['detections'] for t in tracker.tracks)} detections into {len(tracker.tracks)} tracks")
+        elif streaming_output_dir is not None:
+            if streaming_output_dir != output_dir:
+                if os.path.exists(output_dir):
+                    log(f"Cannot rename {streaming_output_dir}: Folder {output_folder_name} already exists")
+                    output_dir = streaming_output_dir
+                else:
+                    os.rename(streaming_output_dir, output_dir)
+            log(f"Saved all detections for video {video_file_name} to {output_dir}")
+        elif top_k_selector is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            for rank, candidate in enumerate(top_k_selector.best()):
+                output_image_path = os.path.join(output_dir, f'best_frame_{rank}_with_detections.jpg')
+                draw_detections_on_image(
+                    candidate['frame'].copy(), [candidate['detection']], confidence_threshold, output_image_path
+                )
+
+                cropped_image = crop_image_with_bbox_image(candidate['frame'], candidate['detection']['bbox'])
+                cropped_image_path = os.path.join(output_dir, f'cropped_image_{rank}.jpg')
+                cv2.imwrite(cropped_image_path, cropped_image)
+                log(
+                    f"Saved frame at {candidate['timestamp']:.1f} s (score {candidate['score']:.2f}) "
+                    f"to {cropped_image_path}"
+                )
+        elif best_detection is not None and best_frame is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+            # Save best frame and cropped image
+            output_image_path = os.path.join(output_dir, 'best_frame_with_detections.jpg')
+            draw_detections_on_image(best_frame.copy(), [best_detection], confidence_threshold, output_image_path)
+
+            cropped_image = crop_image_with_bbox_image(best_frame, best_detection['bbox'])
+            cropped_image_path = os.path.join(output_dir, 'cropped_image.jpg')
+            cv2.imwrite(cropped_image_path, cropped_image)
+
+            log(f"Saved best frame with detection to {output_image_path}")
+            log(f"Saved cropped image to {cropped_image_path}")
+        else:
+            log("No frames to save.")
+    else:
+        log("Detection data saving is disabled.")
+
+    if export_segments or replace_with_segments:
+        segments = build_detection_segments(detection_timestamps, segment_padding_seconds)
+        if replace_with_segments and segments and (video_duration is None or video_duration > max_duration_seconds):
+            # Only the start of the video was scanned, keep everything after it
+            if segments[-1][1] >= max_duration_seconds:
+                segments[-1] = (segments[-1][0], None)
+            else:
+                segments.append((max_duration_seconds, None))
+        if replace_with_segments:
+            segments_dir = os.path.dirname(video_path)
+        elif output_base is not None:
+            segments_dir = os.path.join(output_base, os.path.splitext(video_file_name)[0])
+        else:
+            segments_dir = os.path.dirname(video_path)
+        clip_paths = export_video_segments(video_path, segments, segments_dir, log)
+        result['clips'] = clip_paths
+
+        if replace_with_segments and clip_paths and len(clip_paths) == len(segments):
+            try:
+                os.remove(video_path)
+                log(f"Replaced {video_path} with {len(clip_paths)} detection clips")
+                result['output_file'] = None
+            except Exception as e:
+                log(f"Failed to delete {video_path}: {str(e)}")
+        elif replace_with_segments:
+            log(f"Kept {video_path} because not all detection clips could be exported")
+
+    peak_rss_mb = get_peak_rss_mb()
+    peak_rss_text = f", peak RSS {peak_rss_mb:.0f} MB" if peak_rss_mb is not None else ""
+    log(f"Video processing complete ({sampled_count} frames in {chunk_count} chunks{peak_rss_text})")
+    return result
+
+
+# Function to compute the Wilson score interval of a proportion
+def wilson_interval(proportion, n, z=ESTIMATE_Z):
+    """
+    Returns (low, high) of the Wilson score interval for a proportion observed over n
+    samples, (0.0, 1.0) without samples.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    denominator = 1 + z * z / n
+    center = (proportion + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(proportion * (1 - proportion) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+# Function to pick the estimate mode category of a processed file
+def get_estimate_category(result):
+    """
+    Returns the ESTIMATE_CATEGORIES that apply to a result record, empty for files
+    that could not be processed.
+    """
+    if result['status'] not in ('detected', 'no_detections'):
+        return []
+    categories = []
+    if '1' in result['categories']:
+        categories.append('animal')
+    if any(category != '1' for category in result['categories']):
+        categories.append('person')
+    if not result['categories']:
+        categories.append('empty')
+    return categories
+
+
+class DeploymentEstimate:
+    """
+    Stratified random sample of the files of a deployment, one stratum per folder
+    (<date>/<lat-lon>). Files are drawn so every stratum is sampled in proportion to its
+    size, and the share of files with animals, people or nothing is estimated with
+    Wilson intervals that narrow as more files are processed, down to the exact
+    shares once every file is processed.
+    """
+
+    def __init__(self, files_by_stratum, seed=ESTIMATE_SEED):
+        rng = random.Random(seed)
+        self.strata = {}
+        for stratum, files in files_by_stratum.items():
+            files = sorted(files)
+            rng.shuffle(files)
+            self.strata[stratum] = {
+                'files': files, 'sampled': 0, 'processed': 0,
+                'counts': {category: 0 for category in ESTIMATE_CATEGORIES}
+            }
+        self.total_files = sum(len(files) for files in files_by_stratum.values())
+
+    @property
+    def processed(self):
+        return sum(stratum['processed'] for stratum in self.strata.values())
+
+    def iter_sample(self):
+        """
+        Yields (stratum, file_path), always from the stratum with the smallest sampled
+        share, larger strata first.
+        """
+        heap = [(0.0, -len(data['files']), stratum) for stratum, data in self.strata.items() if data['files']]
+        heapq.heapify(heap)
+        while heap:
+            _, negative_size, stratum = heapq.heappop(heap)
+            data = self.strata[stratum]
+            file_path = data['files'][data['sampled']]
+            data['sampled'] += 1
+            if data['sampled'] < len(data['files']):
+                heapq.heappush(heap, (data['sampled'] / len(data['files']), negative_size, stratum))
+            yield stratum, file_path
+
+    def observe(self, stratum, result):
+        categories = get_estimate_category(result)
+        if not categories:
+            return  # Unreadable files do not count towards the estimate
+        data = self.strata[stratum]
+        data['processed'] += 1
+        for category in categories:
+            data['counts'][category] += 1
+
+    def estimate(self):
+        """
+        Returns {category: (proportion, low, high)} weighted by stratum size, with the
+        finite population correction of each stratum.
+        """
+        sampled = {stratum: data for stratum, data in self.strata.items() if data['processed']}
+        sampled_files = sum(len(data['files']) for data in sampled.values())
+        processed = sum(data['processed'] for data in sampled.values())
+        estimates = {}
+        for category in ESTIMATE_CATEGORIES:
+            proportion = 0.0
+            variance = 0.0
+            complete = True
+            for data in sampled.values():
+                weight = len(data['files']) / sampled_files
+                stratum_proportion = data['counts'][category] / data['processed']
+                correction = 1 - data['processed'] / len(data['files'])
+                complete = complete and correction <= 0
+                proportion += weight * stratum_proportion
+                variance += weight * weight * correction * stratum_proportion * (1 - stratum_proportion) / data['processed']
+            if not sampled:
+                estimates[category] = (0.0, 0.0, 1.0)
+            elif complete and sampled_files == self.total_files:
+                estimates[category] = (proportion, proportion, proportion)
+            else:
+                # Effective sample size of the stratified estimate, for the Wilson interval
+                effective_n = proportion * (1 - proportion) / variance if variance > 0 else processed
+                estimates[category] = (proportion, *wilson_interval(proportion, effective_n))
+        return estimates
+
+
+# Function to read how long the user has been away from the keyboard and mouse
+def get_user_idle_seconds():
+    """
+    Returns the seconds since the last keyboard or mouse input, or None if it cannot
+    be read on this system.
+    """
+    try:
+        if sys.platform == 'win32':
+            class LASTINPUTINFO(ctypes.Structure):
+                _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+
+            info = LASTINPUTINFO()
+            info.cbSize = ctypes.sizeof(info)
+            if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+                return None
+            return (ctypes.windll.kernel32.GetTickCount() - info.dwTime) / 1000.0
+        if sys.platform == 'darwin':
+            output = subprocess.run(
+                ['ioreg', '-c', 'IOHIDSystem'], capture_output=True, text=True, timeout=5
+            ).stdout
+            match = re.search(r'"HIDIdleTime" = (\d+)', output)
+            return int(match.group(1)) / 1e9 if match else None
+        if shutil.which('xprintidle'):  # X11
+            output = subprocess.run(['xprintidle'], capture_output=True, text=True, timeout=5).stdout
+            return int(output.strip()) / 1000.0
+    except Exception:
+        pass
+    return None
+
+
+# Function to format the remaining time of a run
+def format_eta(eta_seconds):
+    """
+    Returns the ETA as h:mm:ss or mm:ss, or --:-- when it is not known yet (negative).
+    """
+    if eta_seconds < 0:
+        return "--:--"
+    minutes, seconds = divmod(int(eta_seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+# Function to lower the CPU and I/O priority of the app
+def apply_background_priority(log):
+    """
+    Limit inference threads and lower the CPU and I/O priority of the process.
+    The isolated decoder process started afterwards inherits the priority.
+    Returns the previous settings, to pass to restore_process_priority when the run ends.
+    """
+    import torch  # Only background mode needs it at this level
+    previous = {'torch_threads': torch.get_num_threads(), 'cv2_threads': cv2.getNumThreads()}
+    torch.set_num_threads(BACKGROUND_TORCH_THREADS)
+    cv2.setNumThreads(1)
+
+    if psutil is None:
+        if hasattr(os, 'nice'):
+            # os.nice adds to the current value, so only make up the difference to the target
+            previous['nice'] = os.nice(0)
+            if previous['nice'] < BACKGROUND_NICE:
+                os.nice(BACKGROUND_NICE - previous['nice'])
+            log("Background mode: lowered CPU priority (install psutil to also lower I/O priority)")
+        return previous
+
+    process = psutil.Process()
+    try:
+        previous['nice'] = process.nice()
+        if sys.platform == 'win32':
+            previous['ionice'] = process.ionice()
+            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+            process.ionice(psutil.IOPRIO_VERYLOW)
+        else:
+            process.nice(max(previous['nice'], BACKGROUND_NICE))
+            if hasattr(psutil, 'IOPRIO_CLASS_IDLE'):  # Linux only
+                previous['ionice'] = process.ionice()
+                process.ionice(psutil.IOPRIO_CLASS_IDLE)
+        log(f"Background mode: lowered CPU and I/O priority, {BACKGROUND_TORCH_THREADS} inference threads")
+    except (psutil.Error, OSError) as e:
+        log(f"Background mode: could not lower priority: {str(e)}")
+    return previous
+
+
+# Function to undo apply_background_priority
+def restore_process_priority(previous, log):
+    """
+    Restore the inference threads and the CPU and I/O priority saved by
+    apply_background_priority, so later runs of the session are not throttled.
+    """
+    import torch
+    torch.set_num_threads(previous['torch_threads'])
+    cv2.setNumThreads(previous['cv2_threads'])
+    if 'nice' not in previous:
+        return
+
+    try:
+        if psutil is None:
+            os.nice(previous['nice'] - os.nice(0))
+        else:
+            process = psutil.Process()
+            process.nice(previous['nice'])
+            if 'ionice' in previous:
+                if sys.platform == 'win32':
+                    process.ionice(previous['ionice'])
+                else:
+                    process.ionice(previous['ionice'].ioclass, previous['ionice'].value)
+        log("Background mode: restored CPU and I/O priority")
+    except Exception as e:
+        # Raising the priority back can need administrator rights (Linux, macOS)
+        log(f"Background mode: could not restore priority: {str(e)}")
+
+
+# Function to read the deployment date of a file from its folder names
+def get_deployment_date(file_path, input_folder):
+    """
+    Returns the date of the '<date>' folder (ddmmyyyy or yyyymmdd) a file is stored
+    under, falling back to the file's modification time.
+    """
+    relative_dirs = os.path.relpath(os.path.dirname(file_path), input_folder).split(os.sep)
+    for folder_name in relative_dirs:
+        if re.fullmatch(r'\d{8}', folder_name):
+            for date_format in ('%d%m%Y', '%Y%m%d'):
+                try:
+                    return datetime.strptime(folder_name, date_format).timestamp()
+                except ValueError:
+                    pass
+    try:
+        return os.path.getmtime(file_path)
+    except OSError:
+        return 0.0
+
+
+# Function to order the files of a run
+def schedule_files(image_files, video_files, file_costs, policy, input_folder):
+    """
+    Returns the (file_type, file_path) work items of a run in the order given by the
+    scheduling policy:
+    'images_first'   all images, then all videos, in folder order
+    'shortest_first' cheapest files first, for quick feedback
+    'newest_first'   newest deployment folder first
+    'interleave'     images spread between videos in proportion to their cost
+    """
+    images = [('image', f) for f in image_files]
+    videos = [('video', f) for f in video_files]
+
+    if policy == 'shortest_first':
+        return sorted(images + videos, key=lambda item: file_costs.get(item[1], 1.0))
+    if policy == 'newest_first':
+        return sorted(
+            images + videos,
+            key=lambda item: (-get_deployment_date(item[1], input_folder), item[1])
+        )
+    if policy == 'interleave':
+        # Always take from the list that is furthest behind in its share of the work
+        image_total = sum(file_costs.get(f, 1.0) for _, f in images) or 1.0
+        video_total = sum(file_costs.get(f, 1.0) for _, f in videos) or 1.0
+        items = []
+        image_done = video_done = 0.0
+        image_index = video_index = 0
+        while image_index < len(images) or video_index < len(videos):
+            take_image = video_index >= len(videos) or (
+                image_index < len(images) and image_done / image_total <= video_done / video_total
+            )
+            if take_image:
+                item = images[image_index]
+                image_index += 1
+                image_done += file_costs.get(item[1], 1.0)
+            else:
+                item = videos[video_index]
+                video_index += 1
+                video_done += file_costs.get(item[1], 1.0)
+            items.append(item)
+        return items
+    return images + videos
+
+
+# Function to compute the expected completion curve of a schedule
+def get_completion_curve(work_items, file_costs):
+    """
+    Returns, for every work item, the share of the total work done once it is finished.
+    """
+    total_cost = sum(file_costs.get(f, 1.0) for _, f in work_items) or 1.0
+    curve = []
+    done = 0.0
+    for _, file_path in work_items:
+        done += file_costs.get(file_path, 1.0)
+        curve.append(done / total_cost)
+    return curve
+
+
+# Function to get the folder where the app keeps its state between runs
+def get_user_config_dir():
+    if sys.platform == 'win32':
+        base_dir = os.environ.get('APPDATA', os.path.expanduser('~'))
+    elif sys.platform == 'darwin':
+        base_dir = os.path.expanduser('~/Library/Application Support')
+    else:
+        base_dir = os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config'))
+    config_dir = os.path.join(base_dir, APP_CONFIG_DIR_NAME)
+    os.makedirs(config_dir, exist_ok=True)
+    return config_dir
+
+
+class JobQueue:
+    """
+    Persistent list of folders to process, each with a snapshot of the settings it
+    was queued with. Job status is one of 'queued', 'paused', 'running', 'done' or
+    'failed'. Shared between the GUI and the processing thread.
+    """
+
+    def __init__(self, queue_path):
+        self.queue_path = queue_path
+        self.jobs = []
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.queue_path, 'r', encoding='utf-8') as f:
+                self.jobs = json.load(f).get('jobs', [])
+        except (OSError, ValueError):
+            self.jobs = []
+        # Jobs still marked running were interrupted when the app closed
+        for job in self.jobs:
+            if job['status'] == 'running':
+                job['status'] = 'queued'
+
+    def save(self):
+        with self.lock:
+            data = {'jobs': self.jobs}
+        temp_path = self.queue_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, self.queue_path)
+
+    def add(self, input_folder, settings):
+        job = {
+            'id': uuid.uuid4().hex[:8],
+            'input_folder': input_folder,
+            'settings': dict(settings),
+            'status': 'queued',
+        }
+        with self.lock:
+            self.jobs.append(job)
+        self.save()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return next((job for job in self.jobs if job['id'] == job_id), None)
+
+    def remove(self, job_id):
+        with self.lock:
+            self.jobs = [job for job in self.jobs if job['id'] != job_id or job['status'] == 'running']
+        self.save()
+
+    def move(self, job_id, offset):
+        with self.lock:
+            index = next((i for i, job in enumerate(self.jobs) if job['id'] == job_id), None)
+            if index is None:
+                return
+            new_index = min(max(index + offset, 0), len(self.jobs) - 1)
+            self.jobs.insert(new_index, self.jobs.pop(index))
+        self.save()
+
+    def set_status(self, job_id, status):
+        with self.lock:
+            for job in self.jobs:
+                if job['id'] == job_id:
+                    job['status'] = status
+        self.save()
+
+    def next_job(self):
+        """
+        Returns the first queued job, or None when nothing is left to run.
+        """
+        with self.lock:
+            return next((job for job in self.jobs if job['status'] == 'queued'), None)
+
+
+class FolderEventHandler(FileSystemEventHandler):
+    """
+    Forwards the paths of created, modified and moved files to a FolderWatcher.
+    """
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.note(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.note(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.note(event.dest_path)
+
+
+class FolderWatcher:
+    """
+    Reports new files under a folder once their size and modification time have
+    stopped changing for settle_seconds, so files still being copied from an SD card
+    are not picked up. Uses the watchdog package (inotify on Linux) when it is
+    installed and falls back to polling the folder otherwise.
+    """
+
+    def __init__(self, folder, extensions, ignored_dirs=(), settle_seconds=WATCH_SETTLE_SECONDS):
+        self.folder = folder
+        self.extensions = extensions
+        self.ignored_dirs = set(ignored_dirs)
+        self.settle_seconds = settle_seconds
+        self.pending = {}  # path -> (size, mtime, time that state was first seen)
+        self.seen = set()
+        self.lock = threading.Lock()
+        self.observer = None
+        self.mode = "polling"
+
+    def start(self):
+        """
+        Start watching. Call it before listing the files to process first, and pass
+        those to mark_seen, so files copied in meanwhile are reported as new.
+        """
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(FolderEventHandler(self), self.folder, recursive=True)
+            self.observer.start()
+            self.mode = "file system events"
+
+    def mark_seen(self, file_paths):
+        """
+        Mark files handled elsewhere (the initial pass) as known, not new.
+        """
+        with self.lock:
+            self.seen.update(file_paths)
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def list_files(self):
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if d not in self.ignored_dirs]
+            for f in files:
+                if os.path.splitext(f)[1].lower() in self.extensions:
+                    yield os.path.join(root, f)
+
+    def note(self, file_path):
+        """
+        Mark a file as possibly new. Called from the watchdog observer thread.
+        """
+        relative_dirs = os.path.relpath(os.path.dirname(file_path), self.folder).split(os.sep)
+        if self.ignored_dirs.intersection(relative_dirs):
+            return
+        if os.path.splitext(file_path)[1].lower() not in self.extensions:
+            return
+        with self.lock:
+            self.pending.setdefault(file_path, None)
+
+    def poll(self):
+        """
+        Returns the new files whose size has settled since the last call.
+        """
+        if self.observer is None:
+            for file_path in self.list_files():
+                if file_path not in self.seen:
+                    self.note(file_path)
+
+        ready = []
+        now = time.time()
+        with self.lock:
+            for file_path, state in list(self.pending.items()):
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    del self.pending[file_path]  # Deleted or moved away
+                    continue
+                if state is None or state[:2] != (stat.st_size, stat.st_mtime):
+                    self.pending[file_path] = (stat.st_size, stat.st_mtime, now)
+                elif now - state[2] >= self.settle_seconds:
+                    del self.pending[file_path]
+                    self.seen.add(file_path)
+                    ready.append(file_path)
+        return sorted(ready)
+
+
+# Function to load the ledger of processed files
+def load_processed_ledger(ledger_path, log):
+    """
+    Returns the {relative_path: {'size', 'mtime'}} ledger of files already
+    processed in watch mode.
+    """
+    if not os.path.exists(ledger_path):
+        return {}
+    try:
+        with open(ledger_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        log(f"Could not read processed files ledger {ledger_path}: {str(e)}")
+        return {}
+
+
+# Function to save the ledger of processed files
+def save_processed_ledger(ledger_path, ledger, log):
+    try:
+        with open(ledger_path, 'w', encoding='utf-8') as f:
+            json.dump(ledger, f)
+    except Exception as e:
+        log(f"Could not write processed files ledger {ledger_path}: {str(e)}")
+
+
+class ProcessingThread(QThread):
+    log_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(int, int, float)  # Emits (completed_cost, total_cost, eta_seconds)
+    finished = pyqtSignal()
+
+    def __init__(
+        self, input_folder, every_n_frames, confidence_threshold,
+        create_detection_data, delete_no_detection,
+        processing_duration_seconds, save_all_checkbox, rename_files_checkbox,
+        hito_prefix, animal_prefix, cascade_enabled=False, uncertainty_band=0.1,
+        decoder_backend='opencv', sample_every_seconds=0, keyframes_only=False,
+        isolate_decoding=False, decode_timeout_seconds=300, top_k_frames=1,
+        track_detections=False, export_segments=False, segment_padding_seconds=2.0,
+        replace_with_segments=False, watch_mode=False, schedule_policy='images_first',
+        background_mode=False, static_suppression=False, group_sequences=False, dedup_enabled=False,
+        thumbnail_triage=False, triage_audit=False, frame_gate=False, night_threshold=0.0, ir_threshold=0.0,
+        prefilter_enabled=False, prefilter_threshold=PREFILTER_THRESHOLD, species_classification=False,
+        comparison_models=(), estimate_mode=False
+    ):
+        super().__init__()
+        self.input_folder = input_folder
+        self.every_n_frames = every_n_frames
+        self.confidence_threshold = confidence_threshold
+        self.create_detection_data = create_detection_data
+        self.delete_no_detection = delete_no_detection
+        self.processing_duration_seconds = processing_duration_seconds
+        self.save_all_checkbox = save_all_checkbox
+        self.rename_files_checkbox = rename_files_checkbox
+        self.hito_prefix = hito_prefix
+        self.animal_prefix = animal_prefix
+        self.cascade_enabled = cascade_enabled
+        self.uncertainty_band = uncertainty_band
+        self.decoder_backend = decoder_backend
+        self.sample_every_seconds = sample_every_seconds
+        self.keyframes_only = keyframes_only
+        self.isolate_decoding = isolate_decoding
+        self.decode_timeout_seconds = decode_timeout_seconds
+        self.top_k_frames = top_k_frames
+        self.track_detections = track_detections
+        self.export_segments = export_segments
+        self.segment_padding_seconds = segment_padding_seconds
+        self.replace_with_segments = replace_with_segments
+        self.watch_mode = watch_mode
+        self.schedule_policy = schedule_policy
+        self.background_mode = background_mode
+        self.static_suppression = static_suppression
+        self.static_index = None  # Per-camera detection history, loaded when static suppression is on
+        self.group_sequences = group_sequences
+        self.dedup_enabled = dedup_enabled
+        self.thumbnail_triage = thumbnail_triage
+        self.triage_audit = triage_audit  # Still infer rejected images, to measure the triage recall
+        self.triage_stats = {'checked': 0, 'blank': 0, 'corrupt': 0, 'audit_missed': 0}
+        self.triage_verdicts = {}  # Verdict of each image rejected by the triage
+        self.frame_gate = frame_gate
+        self.night_threshold = night_threshold  # 0 uses the confidence threshold
+        self.ir_threshold = ir_threshold
+        self.prefilter_enabled = prefilter_enabled
+        self.prefilter_threshold = prefilter_threshold
+        self.species_classification = species_classification
+        self.species_classifier = None
+        self.comparison_models = list(comparison_models)  # Model files run alongside the main detector
+        self.estimate_mode = estimate_mode  # Sample files to estimate the deployment, without changing them
+        self.image_sequences = {}  # Sequence (burst) of each still image, when grouping sequences
+        self.sequence_stats = {'sequences': 0, 'images': 0, 'inferred': 0}
+        self.background_busy_seconds = 0.0  # Time spent processing files in background mode
+        self.background_paused_seconds = 0.0  # Time spent pausing between files
+        self.background_process = psutil.Process() if background_mode and psutil is not None else None
+        self.processed_ledger = None  # Files already processed, kept in watch mode
+        self.frame_decoder = None
+        self.folder_watcher = None  # Started before the initial scan in watch mode
+        self.file_snapshots = {}  # path -> (size, mtime, time of the scan) of the files of the initial scan
+        self.stop_requested = False
+        self.quarantined_files = []  # (path, reason) of videos that could not be decoded
+        self.results = []  # Result record of every processed file
+        self.region_masks = {}  # Region mask (or None) of each folder
+        self.total_files = 0  # Initialize total files count
+        self.processed_count = 0  # Track processed files
+        self.video_metadata = {}  # Container metadata of each video from the pre-scan
+        self.file_costs = {}  # Estimated cost of each file, in detector calls
+        self.total_cost = 0.0
+        self.completed_cost = 0.0
+        self.start_time = None
+        self.last_progress_log = (0, 0.0)  # (processed_count, time) of the last progress log line
+
+
+    def log(self, message):
+        self.log_signal.emit(message)
+
+    def update_progress(self, file_path=None):
+        """
+        Add the cost of the finished file and emit the progress signal with the
+        cost-weighted progress and the time-based ETA.
+        """
+        if file_path is not None:
+            self.completed_cost += self.file_costs.get(file_path, 1.0)
+
+        eta_seconds = -1.0
+        if self.start_time is not None and self.completed_cost > 0:
+            elapsed = time.time() - self.start_time
+            eta_seconds = elapsed * (self.total_cost - self.completed_cost) / self.completed_cost
+
+        logged_count, logged_time = self.last_progress_log
+        if file_path is not None and (
+            self.processed_count - logged_count >= PROGRESS_LOG_EVERY_FILES
+            or time.time() - logged_time >= PROGRESS_LOG_EVERY_SECONDS
+            or self.processed_count >= self.total_files
+        ):
+            self.log(f"Processed {self.processed_count}/{self.total_files} files, ETA {format_eta(eta_seconds)}")
+            self.last_progress_log = (self.processed_count, time.time())
+        self.progress_signal.emit(int(self.completed_cost * 100), int(self.total_cost * 100), eta_seconds)
+
+    def estimate_costs(self, image_files, video_files):
+        """
+        Pre-scan the videos and estimate the cost of every file with the current
+        sampling settings. With isolated decoding the videos are probed in decoder
+        processes, and those that fail are quarantined. Returns the videos left to process.
+        """
+        cache_path = os.path.join(self.input_folder, METADATA_CACHE_FILE_NAME)
+        max_workers = BACKGROUND_PRESCAN_WORKERS if self.background_mode else 8
+        probe = probe_video_metadata
+        probers = None
+        if self.isolate_decoding:
+            # One decoder process per pre-scan thread, so a file that hangs its probe cannot stall the run
+            probers = queue.Queue()
+            for _ in range(max_workers):
+                probers.put(IsolatedDecoder(self.decode_timeout_seconds))
+
+            def probe(video_path):
+                prober = probers.get()
+                try:
+                    return prober.probe(video_path, self.log)
+                finally:
+                    probers.put(prober)
+        try:
+            self.video_metadata, failures = prescan_videos(
+                video_files, cache_path, self.log, max_workers=max_workers, probe=probe
+            )
+        finally:
+            while probers is not None and not probers.empty():
+                probers.get().close()
+        for video_file, reason in failures.items():
+            self.log(f"Could not read the metadata of {video_file}: {reason}")
+            self.quarantine_file(video_file, reason)
+        video_files = [video_file for video_file in video_files if video_file not in failures]
+        self.total_files -= len(failures)
+
+        self.file_costs = {image_file: 1.0 for image_file in image_files}
+        for video_file in video_files:
+            self.file_costs[video_file] = estimate_video_cost(
+                self.video_metadata.get(video_file),
+                self.every_n_frames,
+                self.processing_duration_seconds,
+                decoder_backend=self.decoder_backend,
+                sample_every_seconds=self.sample_every_seconds,
+                keyframes_only=self.keyframes_only
+            )
+        self.total_cost = sum(self.file_costs.values())
+        self.completed_cost = 0.0
+        self.log(f"Estimated work: {self.total_cost:.0f} detector calls")
+        return video_files
+
+    def probe_video(self, video_file):
+        """
+        Returns the metadata of one video, read in the isolated decoder when enabled.
+        Raises DecodeFailure if the probe hangs or crashes the decoder.
+        """
+        if self.frame_decoder is not None:
+            return self.frame_decoder.probe(video_file, self.log)
+        return probe_video_metadata(video_file)
+
+    def schedule_work(self, image_files, video_files, output_base):
+        """
+        Order the files with the scheduling policy and report the chosen order and
+        its expected completion curve.
+        """
+        work_items = schedule_files(
+            image_files, video_files, self.file_costs, self.schedule_policy, self.input_folder
+        )
+        curve = get_completion_curve(work_items, self.file_costs)
+
+        self.log(f"Processing order: {self.schedule_policy}")
+        for i, (file_type, file_path) in enumerate(work_items[:10]):
+            self.log(f"  {i + 1}. {file_path} ({file_type}, {self.file_costs.get(file_path, 1.0):.1f} detector calls)")
+        if len(work_items) > 10:
+            self.log(f"  ... and {len(work_items) - 10} more")
+        for share in (0.25, 0.5, 0.75):
+            files_needed = next((i + 1 for i, done in enumerate(curve) if done >= share), len(curve))
+            self.log(f"Expected {share:.0%} of the work done after {files_needed} of {len(work_items)} files")
+
+        if output_base is not None:
+            schedule_path = os.path.join(output_base, 'schedule.json')
+            try:
+                with open(schedule_path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'policy': self.schedule_policy,
+                        'items': [
+                            {
+                                'file': file_path,
+                                'type': file_type,
+                                'cost': self.file_costs.get(file_path, 1.0),
+                                'expected_completion': done,
+                            }
+                            for (file_type, file_path), done in zip(work_items, curve)
+                        ],
+                    }, f, indent=2)
+                self.log(f"Saved processing order to {schedule_path}")
+            except Exception as e:
+                self.log(f"Could not write {schedule_path}: {str(e)}")
+        return work_items
+
+    def quarantine_file(self, file_path, reason):
+        """
+        Move a file that could not be processed into the quarantine folder, keeping
+        its path relative to the input folder.
+        """
+        relative_path = os.path.relpath(file_path, self.input_folder)
+        quarantine_path = os.path.join(self.input_folder, QUARANTINE_DIR_NAME, relative_path)
+        try:
+            os.makedirs(os.path.dirname(quarantine_path), exist_ok=True)
+            shutil.move(file_path, quarantine_path)
+            self.log(f"Quarantined {file_path} -> {quarantine_path} ({reason})")
+        except Exception as e:
+            self.log(f"Failed to quarantine {file_path}: {str(e)}")
+        self.quarantined_files.append((file_path, reason))
+
+    def log_run_summary(self, detector):
+        """
+        Log the per-run counters collected while processing.
+        """
+        stats = detector.stats
+        if detector.cascade_enabled:
+            self.log(
+                f"Resolution cascade: {stats['escalated']} of {stats['frames']} frames "
+                f"escalated to full resolution"
+            )
+        if detector.frame_gate and stats['frames']:
+            self.log(f"Frame gate: skipped {stats['blank_frames']} of {stats['frames']} frames as blank")
+            for condition, condition_stats in sorted(stats['conditions'].items()):
+                inferred = condition_stats['frames'] - condition_stats['blank']
+                positive_share = 100 * condition_stats['positive'] / inferred if inferred else 0.0
+                self.log(
+                    f"  {condition}: {condition_stats['frames']} frames, {condition_stats['blank']} blank, "
+                    f"{condition_stats['positive']} with detections ({positive_share:.0f}% of inferred frames), "
+                    f"threshold {detector.condition_thresholds.get(condition) or self.confidence_threshold:.2f}"
+                )
+        if detector.prefilter is not None and stats['frames']:
+            rejected = stats['prefilter_rejected']
+            avoided = rejected - stats['prefilter_audited']
+            self.log(
+                f"Empty frame pre-filter: rejected {rejected} of {stats['frames']} frames, "
+                f"avoided {avoided} detector calls ({100 * avoided / stats['frames']:.1f}%)"
+            )
+            if stats['prefilter_audited']:
+                # The audited rejected frames estimate how many rejected frames had detections
+                missed = rejected * stats['prefilter_missed'] / stats['prefilter_audited']
+                found = stats['prefilter_passed_positive']
+                recall = found / (found + missed) if found + missed else 1.0
+                self.log(
+                    f"  audit: {stats['prefilter_missed']} of {stats['prefilter_audited']} inferred rejected "
+                    f"frames had detections, estimated pre-filter recall {100 * recall:.1f}%"
+                )
+        for name in detector.comparison_models:
+            compared = [result for result in self.results if name in result.get('models', {})]
+            if not compared:
+                continue
+            positive = sum(1 for result in compared if result['models'][name]['detection_frames'])
+            primary_positive = sum(1 for result in compared if result['categories'])
+            agreeing = sum(
+                1 for result in compared
+                if bool(result['models'][name]['detection_frames']) == bool(result['categories'])
+            )
+            self.log(
+                f"Comparison model {name}: detections in {positive} of {len(compared)} files "
+                f"(main detector {primary_positive}), same outcome for {100 * agreeing / len(compared):.1f}%"
+            )
+        if self.species_classifier is not None and self.species_classifier.stats['files']:
+            species_stats = self.species_classifier.stats
+            counts = ", ".join(f"{name} {count}" for name, count in sorted(species_stats['species'].items()))
+            self.log(
+                f"Species classifier: {species_stats['files']} files, {species_stats['crops']} crops "
+                f"in {species_stats['batches']} batches ({counts})"
+            )
+        if detector.detection_cache is not None and stats['frames']:
+            self.log(
+                f"Deduplication: {stats['dedup_hits']} of {stats['frames']} inputs reused earlier detections "
+                f"({100 * stats['dedup_hits'] / stats['frames']:.0f}% hit rate)"
+            )
+        if self.triage_stats['checked']:
+            rejected = self.triage_stats['blank'] + self.triage_stats['corrupt']
+            self.log(
+                f"Thumbnail triage: rejected {rejected} of {self.triage_stats['checked']} images "
+                f"({self.triage_stats['blank']} blank, {self.triage_stats['corrupt']} corrupt)"
+            )
+            if self.triage_audit:
+                positives = sum(1 for r in self.results if r['status'] in ('detected', 'sequence_detected'))
+                missed = self.triage_stats['audit_missed']
+                recall_text = f"{100 * (positives - missed) / positives:.1f}%" if positives else "n/a"
+                self.log(
+                    f"Triage audit: {missed} rejected images had detections, "
+                    f"recall against the full run {recall_text}"
+                )
+        if self.sequence_stats['sequences']:
+            self.log(
+                f"Image sequences: inferred {self.sequence_stats['inferred']} of "
+                f"{self.sequence_stats['images']} images in {self.sequence_stats['sequences']} sequences"
+            )
+        if stats['inferred_pixels'] < stats['pixels']:
+            self.log(
+                f"Region masks: {100 * stats['inferred_pixels'] / stats['pixels']:.0f}% "
+                f"of the frame pixels were sent to the detector"
+            )
+        if self.background_mode:
+            total_seconds = self.background_busy_seconds + self.background_paused_seconds
+            if total_seconds > 0:
+                self.log(
+                    f"Background mode: {self.processed_count} files in {total_seconds:.0f} s "
+                    f"({60 * self.processed_count / total_seconds:.1f} files/min, "
+                    f"{60 * self.completed_cost / total_seconds:.1f} detector calls/min), "
+                    f"{100 * self.background_paused_seconds / total_seconds:.0f}% of the time paused"
+                )
+        if self.quarantined_files:
+            self.log(f"{len(self.quarantined_files)} files could not be decoded and were quarantined:")
+            for file_path, reason in self.quarantined_files:
+                self.log(f"  {file_path}: {reason}")
+
+    def request_stop(self):
+        """
+        Ask the thread to stop after the file it is currently processing.
+        """
+        self.stop_requested = True
+        self.log("Stopping after the current file...")
+
+    def run(self):
+        """
+        Entry point for the thread. Calls the main processing function.
+        """
+        self.log("Thread is running...")
+        self.process_data()
+        self.finished.emit()
+
+    def get_output_base(self):
+        if self.create_detection_data:
+            output_base = os.path.join(self.input_folder, "detection_data")
+            os.makedirs(output_base, exist_ok=True)
+            self.log(f"Output will be saved to {output_base}")
+        else:
+            output_base = None  # Or set to some default
+        return output_base
+
+    def load_frame_detector(self, model=None):
+        """
+        Load the detector model, or return None if it cannot be loaded. An already
+        loaded model can be passed in to reuse it.
+        """
+        self.log("Loading AI detector model...")
+        try:
+            if model is None:
+                model = load_detector('md_v5b.0.0.pt')  # Adjust path as needed
+            prefilter = self.load_prefilter()
+            comparison_models = {}
+            for model_file in self.comparison_models:
+                self.log(f"Loading comparison model {model_file}...")
+                comparison_models[os.path.splitext(os.path.basename(model_file))[0]] = load_detector(model_file)
+            if self.species_classification and self.species_classifier is None:
+                self.species_classifier = self.load_species_classifier()
+            detector = FrameDetector(
+                model,
+                confidence_threshold=self.confidence_threshold,
+                cascade_enabled=self.cascade_enabled,
+                uncertainty_band=self.uncertainty_band,
+                dedup_enabled=self.dedup_enabled,
+                frame_gate=self.frame_gate,
+                condition_thresholds={'night': self.night_threshold, 'ir': self.ir_threshold},
+                prefilter=prefilter,
+                comparison_models=comparison_models
+            )
+            self.log("Detector loaded successfully.")
+        except Exception as e:
+            self.log(f"Failed to load detector: {str(e)}")
+            return None
+
+        self.log("AI detector model loaded successfully")
+        return detector
+
+    def load_prefilter(self):
+        """
+        Load the empty frame pre-filter when enabled, or return None to send every frame
+        to MegaDetector.
+        """
+        if not self.prefilter_enabled:
+            return None
+        if import_keras() is None:
+            self.log("Empty frame pre-filter disabled: TensorFlow is not installed")
+            return None
+        if not os.path.exists(PREFILTER_MODEL_FILE):
+            self.log(f"Empty frame pre-filter disabled: {PREFILTER_MODEL_FILE} not found")
+            return None
+        try:
+            prefilter = EmptyFramePrefilter(PREFILTER_MODEL_FILE, self.prefilter_threshold)
+        except Exception as e:
+            self.log(f"Could not load the empty frame pre-filter: {str(e)}")
+            return None
+        self.log(f"Empty frame pre-filter loaded (threshold {self.prefilter_threshold:.2f})")
+        return prefilter
+
+    def load_species_classifier(self):
+        """
+        Load the species classifier, or return None if it cannot be loaded.
+        """
+        if import_keras() is None:
+            self.log("Species classification disabled: TensorFlow is not installed")
+            return None
+        if not os.path.exists(SPECIES_MODEL_FILE):
+            self.log(f"Species classification disabled: {SPECIES_MODEL_FILE} not found")
+            return None
+        try:
+            species_classifier = SpeciesClassifier(self.log, rename_files=self.rename_files_checkbox)
+        except Exception as e:
+            self.log(f"Could not load the species classifier: {str(e)}")
+            return None
+        self.log(f"Species classifier loaded ({', '.join(species_classifier.class_names)})")
+        return species_classifier
 
-    # List to store frames with detections when save_all_detections is True
-    frames_with_detections = []
+    def get_file_type(self, file_path):
+        """
+        Returns 'image' or 'video' for files that should be processed, None otherwise.
+        Files already tagged with one of the prefixes and detection clips are skipped.
+        """
+        file_name = os.path.basename(file_path)
+        prefixes = [self.hito_prefix, self.animal_prefix]  # Use user-defined prefixes
+        if any(file_name.startswith(prefix) for prefix in prefixes):
+            return None
+        ext = os.path.splitext(file_name)[1].lower()
+        if ext in IMAGE_EXTENSIONS:
+            return 'image'
+        if ext in VIDEO_EXTENSIONS and not is_segment_clip(file_path):
+            return 'video'
+        return None
+
+    def find_input_files(self):
+        """
+        Returns the lists of images and videos to process in the input folder.
+        """
+        image_files = []
+        video_files = []
+
+        for root, dirs, files in os.walk(self.input_folder):
+            dirs[:] = [d for d in dirs if d not in (QUARANTINE_DIR_NAME, "detection_data")]
+            for f in files:
+                file_path = os.path.join(root, f)
+                if self.processed_ledger is not None and self.is_in_ledger(file_path):
+                    continue
+                file_type = self.get_file_type(file_path)
+                if file_type == 'image':
+                    image_files.append(file_path)
+                elif file_type == 'video':
+                    video_files.append(file_path)
+
+        return image_files, video_files
+
+    def is_in_ledger(self, file_path):
+        entry = self.processed_ledger.get(os.path.relpath(file_path, self.input_folder))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
 
-    # Flag to indicate if any detections were found
-    detections_found = False
+    def add_to_ledger(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return
+        self.processed_ledger[os.path.relpath(file_path, self.input_folder)] = {
+            'size': stat.st_size, 'mtime': stat.st_mtime
+        }
 
-    try:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
+    def get_region_mask(self, file_path):
+        """
+        Returns the region mask of the nearest roi_mask.json between the file's folder
+        and the input folder (normally in the deployment folder), or None.
+        """
+        directory = os.path.dirname(os.path.abspath(file_path))
+        input_folder = os.path.abspath(self.input_folder)
+        searched = []
+        region_mask = None
+        while True:
+            if directory in self.region_masks:
+                region_mask = self.region_masks[directory]
                 break
-
-            frame_count += 1
-            if frame_count > max_frames:
-                log(f"Reached max duration ({max_duration_seconds} seconds) for {video_path}")
+            searched.append(directory)
+            mask_path = os.path.join(directory, ROI_MASK_FILE_NAME)
+            if os.path.exists(mask_path):
+                try:
+                    region_mask = RegionMask.load(mask_path)
+                    self.log(f"Using region mask {mask_path}")
+                except Exception as e:
+                    self.log(f"Could not read region mask {mask_path}: {str(e)}")
                 break
+            parent = os.path.dirname(directory)
+            if directory == input_folder or parent == directory:
+                break
+            directory = parent
+        for folder in searched:
+            self.region_masks[folder] = region_mask
+        return region_mask
+
+    def prepare_file_state(self, image_files):
+        """
+        Load the static detection index and group the images into sequences, when
+        enabled. Shared by local runs and distributed workers.
+        """
+        if self.static_suppression:
+            self.static_index = StaticDetectionIndex(os.path.join(self.input_folder, STATIC_DETECTIONS_FILE_NAME))
+            self.static_index.load(self.log)
+
+        self.image_sequences = {}
+        if self.group_sequences:
+            sequences = group_image_sequences(image_files)
+            for sequence in sequences:
+                for image_file in sequence:
+                    self.image_sequences[image_file] = sequence
+            self.log(f"Grouped {len(image_files)} images into {len(sequences)} sequences")
+
+    def get_static_history(self, file_path):
+        if self.static_index is None:
+            return None
+        return self.static_index.camera(get_camera_key(file_path, self.input_folder))
+
+    def save_static_report(self, output_base):
+        """
+        Log the static boxes that suppressed detections in this run, and save them
+        to the output folder.
+        """
+        report = self.static_index.report()
+        self.log(f"Static detection suppression: {len(report)} static boxes suppressed detections")
+        for entry in report:
+            bbox_text = ', '.join(f"{v:.2f}" for v in entry['bbox'])
+            self.log(
+                f"  {entry['camera']}: box [{bbox_text}] suppressed {entry['suppressed']} times, "
+                f"{entry['reason']}"
+            )
+        if output_base is not None:
+            report_path = os.path.join(output_base, 'static_detections_report.json')
+            try:
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2)
+            except Exception as e:
+                self.log(f"Could not write {report_path}: {str(e)}")
 
-            if frame_count % every_n_frames == 0:
-                frame_filename = os.path.join(temp_dir, f'frame_{frame_count}.jpg')
-                cv2.imwrite(frame_filename, frame)
-                frame_files.append(frame_filename)
-                frame_indices.append(frame_count)
+    def triage_image(self, image_file):
+        """
+        Returns 'blank' or 'corrupt' when the thumbnail triage rejects the image,
+        None otherwise.
+        """
+        if not self.thumbnail_triage:
+            return None
+        verdict = triage_image_file(image_file)
+        self.triage_stats['checked'] += 1
+        if verdict is not None:
+            self.triage_stats[verdict] += 1
+            self.triage_verdicts[image_file] = verdict
+            self.log(f"Triage: {image_file} looks {verdict}{' (auditing)' if self.triage_audit else ''}")
+        return verdict
+
+    def reject_image(self, image_file, verdict, output_base):
+        """
+        Returns the result record of an image rejected by the triage. Blank images are
+        handled like images without detections; corrupt ones are left alone.
+        """
+        result = new_result_record(image_file, 'image')
+        result['triage'] = verdict
+        if verdict == 'corrupt':
+            return result
+        return finish_image_file(
+            image_file, result, None, 1, [], None, self.confidence_threshold, output_base, self.log,
+            rename_images=self.rename_files_checkbox, delete_no_detections=self.delete_no_detection
+        )
 
-        cap.release()
+    def audit_triage(self, result):
+        """
+        Count images the triage rejected but the detector found something in.
+        """
+        verdict = self.triage_verdicts.get(result['file'])
+        if verdict is not None:
+            result['triage'] = verdict
+            if result['status'] in ('detected', 'sequence_detected'):
+                self.triage_stats['audit_missed'] += 1
+                self.log(f"Triage audit: {result['file']} was rejected as {verdict} but has detections")
+
+    def process_sequence(self, sequence, detector, output_base):
+        self.log(f"Processing image sequence: {sequence[0]} ({len(sequence)} images)")
+        if self.processed_ledger is not None:
+            for image_file in sequence:
+                self.add_to_ledger(image_file)
+
+        survivors = []
+        for image_file in sequence:
+            verdict = self.triage_image(image_file)
+            if verdict is not None and not self.triage_audit:
+                self.results.append(self.reject_image(image_file, verdict, output_base))
+                self.processed_count += 1
+                self.update_progress(image_file)
+            else:
+                survivors.append(image_file)
+        if not survivors:
+            return
+        sequence = survivors
 
-        if not frame_files:
-            log(f"No frames extracted from {video_path}")
+        results = process_image_sequence(
+            image_files=sequence,
+            detector=detector,
+            confidence_threshold=self.confidence_threshold,
+            output_base=output_base,
+            log=self.log,
+            rename_images=self.rename_files_checkbox,
+            delete_no_detections=self.delete_no_detection,
+            hito_prefix=self.hito_prefix,
+            animal_prefix=self.animal_prefix,
+            region_mask=self.get_region_mask(sequence[0]),
+            static_history=self.get_static_history(sequence[0]),
+            camera_key=get_camera_key(sequence[0], self.input_folder),
+            species_classifier=self.species_classifier
+        )
+        for result in results:
+            self.audit_triage(result)
+        self.results.extend(results)
+        self.sequence_stats['sequences'] += 1
+        self.sequence_stats['images'] += len(sequence)
+        self.sequence_stats['inferred'] += sum(1 for result in results if result.get('inferred'))
+        for image_file in sequence:
+            self.processed_count += 1
+            self.update_progress(image_file)
+
+    def process_image(self, image_file, detector, output_base):
+        self.log(f"Processing image: {image_file}")
+        if self.processed_ledger is not None:
+            self.add_to_ledger(image_file)
+
+        verdict = self.triage_image(image_file)
+        if verdict is not None and not self.triage_audit:
+            self.results.append(self.reject_image(image_file, verdict, output_base))
+            self.processed_count += 1
+            self.update_progress(image_file)
             return
 
-        # Process frames using the detector
-        results = process_images(
-            im_files=frame_files,
+        result = process_image_file(
+            image_file=image_file,
             detector=detector,
-            confidence_threshold=0.0,
-            use_image_queue=False,
-            quiet=True
+            confidence_threshold=self.confidence_threshold,
+            output_base=output_base,
+            log=self.log,
+            rename_images=self.rename_files_checkbox,
+            delete_no_detections=self.delete_no_detection,
+            hito_prefix=self.hito_prefix,
+            animal_prefix=self.animal_prefix,
+            region_mask=self.get_region_mask(image_file),
+            static_history=self.get_static_history(image_file),
+            camera_key=get_camera_key(image_file, self.input_folder),
+            species_classifier=self.species_classifier
+        )
+        self.audit_triage(result)
+        self.results.append(result)
+        self.processed_count += 1
+        self.update_progress(image_file)
+
+    def process_video(self, video_file, detector, output_base):
+        self.log(f"Processing video: {video_file}")
+        if self.processed_ledger is not None:
+            self.add_to_ledger(video_file)
+        try:
+            result = process_video_file(
+                video_file=video_file,
+                detector=detector,
+                confidence_threshold=self.confidence_threshold,
+                output_base=output_base,
+                log=self.log,
+                every_n_frames=self.every_n_frames,
+                max_duration_seconds=self.processing_duration_seconds,
+                save_all_detections=self.save_all_checkbox,
+                rename_videos=self.rename_files_checkbox,
+                delete_no_detections=self.delete_no_detection,
+                hito_prefix=self.hito_prefix,
+                animal_prefix=self.animal_prefix,
+                decoder_backend=self.decoder_backend,
+                sample_every_seconds=self.sample_every_seconds,
+                keyframes_only=self.keyframes_only,
+                frame_decoder=self.frame_decoder,
+                top_k_frames=self.top_k_frames,
+                track_detections=self.track_detections,
+                export_segments=self.export_segments,
+                segment_padding_seconds=self.segment_padding_seconds,
+                replace_with_segments=self.replace_with_segments,
+                region_mask=self.get_region_mask(video_file),
+                static_history=self.get_static_history(video_file),
+                camera_key=get_camera_key(video_file, self.input_folder),
+                species_classifier=self.species_classifier,
+                video_duration=(self.video_metadata.get(video_file) or {}).get('duration')
+            )
+        except DecodeFailure as e:
+            self.log(f"Could not decode {video_file}: {str(e)}")
+            self.quarantine_file(video_file, str(e))
+            result = new_result_record(video_file, 'video')
+            result['status'] = 'quarantined'
+        self.results.append(result)
+        self.processed_count += 1
+        self.update_progress(video_file)
+
+    def run_estimate(self, image_files, video_files, detector, output_base):
+        """
+        Process a stratified random sample of the files with the cheapest settings,
+        reporting the estimated share of files with animals, people or nothing as it
+        goes, until every file is processed or a stop is requested. No file is renamed
+        or deleted and no detection data is saved.
+        Only the model of detector is used: the cascade, deduplication, frame gate,
+        pre-filter and comparison models are left out, and videos are sampled once
+        every ESTIMATE_SAMPLE_EVERY_SECONDS whatever the decoder backend.
+        Returns the detector used for the estimate.
+        """
+        estimate_detector = FrameDetector(detector.detector, confidence_threshold=self.confidence_threshold)
+        files_by_stratum = {}
+        for file_path in image_files + video_files:
+            stratum = os.path.relpath(os.path.dirname(file_path), self.input_folder)
+            files_by_stratum.setdefault(stratum, []).append(file_path)
+        estimate = DeploymentEstimate(files_by_stratum)
+        image_set = set(image_files)
+        self.log(
+            f"Estimate mode: sampling {estimate.total_files} files across {len(files_by_stratum)} folders, "
+            f"stop at any time to keep the current estimate"
         )
 
-        for i, result in enumerate(results):
-            detections = result.get('detections', [])
-            valid_detections = [d for d in detections if d['conf'] > confidence_threshold]
+        self.total_cost = float(estimate.total_files)
+        self.start_time = time.time()
+        self.update_progress()
+        self.frame_decoder = IsolatedDecoder(self.decode_timeout_seconds) if self.isolate_decoding else None
+        try:
+            self.sample_estimate(estimate, image_set, estimate_detector)
+        finally:
+            if self.frame_decoder is not None:
+                self.frame_decoder.close()
 
-            if valid_detections:
-                detections_found = True  # At least one detection over the threshold found
-                frame_path = frame_files[i]
-                frame = cv2.imread(frame_path)
-                prefix = ""
-                # Update detection types for renaming
-                for detection in valid_detections:
-                    if detection['category'] == '1':
-                        prefix = animal_prefix
-                    else:
-                        prefix = hito_prefix
+        self.log_estimate(estimate)
+        if output_base is not None:
+            estimate_path = os.path.join(output_base, ESTIMATE_FILE_NAME)
+            try:
+                with open(estimate_path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'processed_files': estimate.processed,
+                        'total_files': estimate.total_files,
+                        'estimates': {
+                            category: {'proportion': proportion, 'low': low, 'high': high}
+                            for category, (proportion, low, high) in estimate.estimate().items()
+                        },
+                    }, f, indent=2)
+                self.log(f"Saved estimate to {estimate_path}")
+            except Exception as e:
+                self.log(f"Could not write {estimate_path}: {str(e)}")
+        return estimate_detector
 
-                if save_all_detections and output_base is not None:
-                    # Collect frames with detections
-                    frames_with_detections.append((frame_path, valid_detections))
-                else:
-                    # Update max confidence and best detection
-                    for detection in valid_detections:
-                        if detection['conf'] > max_confidence:
-                            max_confidence = detection['conf']
-                            best_detection = detection
-                            best_frame = frame.copy()
-
-        if not detections_found:
-            log(f"No valid detections in {video_path}")
-            if delete_no_detections:
+    def sample_estimate(self, estimate, image_set, detector):
+        """
+        Process the files of the estimate sample in order, updating the estimate and
+        the progress after each one, until the sample is exhausted or a stop is requested.
+        """
+        for stratum, file_path in estimate.iter_sample():
+            if self.stop_requested:
+                break
+            if file_path in image_set:
+                result = process_image_file(
+                    image_file=file_path,
+                    detector=detector,
+                    confidence_threshold=self.confidence_threshold,
+                    output_base=None,
+                    log=self.log,
+                    region_mask=self.get_region_mask(file_path),
+                    camera_key=get_camera_key(file_path, self.input_folder)
+                )
+            else:
                 try:
-                    os.remove(video_path)
-                    log(f"Deleted video: {video_path}")
-                except Exception as e:
-                    log(f"Failed to delete {video_path}: {str(e)}")
-            return  # Do not proceed further
+                    # The PyAV backend samples by time, the others by frame count
+                    metadata = self.probe_video(file_path)
+                    if metadata is not None and metadata['fps'] > 0:
+                        every_n_frames = max(1, round(metadata['fps'] * ESTIMATE_SAMPLE_EVERY_SECONDS))
+                    else:
+                        every_n_frames = self.every_n_frames
+                    result = process_video_file(
+                        video_file=file_path,
+                        detector=detector,
+                        confidence_threshold=self.confidence_threshold,
+                        output_base=None,
+                        log=self.log,
+                        every_n_frames=every_n_frames,
+                        max_duration_seconds=self.processing_duration_seconds,
+                        decoder_backend=self.decoder_backend,
+                        sample_every_seconds=ESTIMATE_SAMPLE_EVERY_SECONDS,
+                        frame_decoder=self.frame_decoder,
+                        region_mask=self.get_region_mask(file_path),
+                        camera_key=get_camera_key(file_path, self.input_folder)
+                    )
+                except DecodeFailure as e:
+                    self.log(f"Could not decode {file_path}: {str(e)}")
+                    result = new_result_record(file_path, 'video')
+            estimate.observe(stratum, result)
+            self.results.append(result)
+            self.processed_count += 1
+            self.update_progress(file_path)
+            if self.processed_count % ESTIMATE_REPORT_EVERY_FILES == 0:
+                self.log_estimate(estimate)
+
+    def log_estimate(self, estimate):
+        estimates = estimate.estimate()
+        shares = ", ".join(
+            f"{category} {100 * proportion:.0f}% ({100 * low:.0f}-{100 * high:.0f}%)"
+            for category, (proportion, low, high) in estimates.items()
+        )
+        elapsed = time.time() - self.start_time
+        self.log(
+            f"Estimate after {estimate.processed} of {estimate.total_files} files ({elapsed / 60:.1f} min): {shares}"
+        )
 
-        # Rename video file if enabled
-        if rename_videos:
-            video_dir = os.path.dirname(video_path)
-            new_video_name = prefix + video_file_name
-            new_video_path = os.path.join(video_dir, new_video_name)
+    def check_settled(self, file_path):
+        """
+        Returns False for a file of the initial scan that is still being copied: its
+        size or modification time changed since the scan. A file modified less than
+        WATCH_SETTLE_SECONDS before the scan is waited for until that time has passed.
+        Files found by the watcher have already settled.
+        """
+        snapshot = self.file_snapshots.pop(file_path, None)
+        if snapshot is None:
+            return True
+        size, mtime, scan_time = snapshot
+        while True:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return False
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                return False
+            remaining = min(mtime, scan_time) + WATCH_SETTLE_SECONDS - time.time()
+            if remaining <= 0 or self.stop_requested:
+                return True
+            time.sleep(min(remaining, WATCH_POLL_SECONDS))
+            scan_time = min(scan_time, time.time() - WATCH_SETTLE_SECONDS)  # Unchanged so far
+
+    def defer_unsettled(self, file_paths):
+        """
+        Leave files still being copied to the folder watcher, or skip them outside
+        watch mode.
+        """
+        for file_path in file_paths:
+            if self.folder_watcher is not None:
+                self.folder_watcher.note(file_path)
+                self.log(f"{file_path} is still being copied, it will be processed once complete")
+            else:
+                self.log(f"Skipped {file_path}: it is still being copied, run again once the copy has finished")
 
-            if os.path.exists(new_video_path):
-                log(f"Cannot rename {video_path}: File {new_video_name} already exists")
+    def process_work_items(self, work_items, detector, output_base):
+        """
+        Process the (file_type, file_path) work items in order, until a stop is requested.
+        Files still being copied are deferred.
+        """
+        for file_type, file_path in work_items:
+            if self.stop_requested:
+                break
+            if file_type == 'image' and file_path in self.image_sequences:
+                if file_path != self.image_sequences[file_path][0]:
+                    continue  # Processed with the first image of its sequence
+                item_files = self.image_sequences[file_path]
             else:
-                os.rename(video_path, new_video_path)
-                log(f"Renamed video: {video_path} -> {new_video_path}")
-                video_file_name = new_video_name  # Update for consistency
-                video_path = new_video_path       # Update video_path as well
+                item_files = [file_path]
+            if not all([self.check_settled(item_file) for item_file in item_files]):
+                self.defer_unsettled(item_files)
+                continue
+            file_start = time.time()
+            if len(item_files) > 1 or file_path in self.image_sequences:
+                self.process_sequence(item_files, detector, output_base)
+            elif file_type == 'image':
+                self.process_image(file_path, detector, output_base)
+            else:
+                self.process_video(file_path, detector, output_base)
+            if self.background_mode:
+                busy_seconds = time.time() - file_start
+                self.background_busy_seconds += busy_seconds
+                self.background_pause(busy_seconds)
+        if self.species_classifier is not None:
+            self.species_classifier.flush()
+
+    def background_pause(self, busy_seconds):
+        """
+        Pause after a file in background mode, for longer while the user is active,
+        other programs are busy or the laptop is on battery.
+        """
+        factor = 0.0
+        reasons = []
+        idle_seconds = get_user_idle_seconds()
+        if idle_seconds is not None and idle_seconds < USER_IDLE_SECONDS:
+            factor += BACKGROUND_USER_ACTIVE_FACTOR
+            reasons.append("user active")
+        if self.background_process is not None:
+            # CPU use of other programs: total use minus this process, both since the last call
+            own_percent = self.background_process.cpu_percent(interval=None) / (psutil.cpu_count() or 1)
+            other_percent = psutil.cpu_percent(interval=None) - own_percent
+            if other_percent > BACKGROUND_MAX_OTHER_CPU_PERCENT:
+                factor += BACKGROUND_BUSY_SYSTEM_FACTOR
+                reasons.append(f"system busy ({other_percent:.0f}% CPU)")
+            battery = psutil.sensors_battery() if hasattr(psutil, 'sensors_battery') else None
+            if battery is not None and not battery.power_plugged:
+                factor += BACKGROUND_ON_BATTERY_FACTOR
+                reasons.append(f"on battery ({battery.percent:.0f}%)")
+
+        pause_seconds = min(busy_seconds * factor, BACKGROUND_MAX_PAUSE_SECONDS)
+        if pause_seconds <= 0:
+            return
+        self.log(f"Background mode: pausing {pause_seconds:.1f} s ({', '.join(reasons)})")
+        pause_end = time.time() + pause_seconds
+        while not self.stop_requested and time.time() < pause_end:
+            time.sleep(min(0.5, pause_end - time.time()))
+        self.background_paused_seconds += pause_seconds
 
-        # Save detections only if output_base is not None
-        if output_base is not None:
-            output_folder_name = f"{os.path.splitext(video_file_name)[0]}"
-            output_dir = os.path.join(output_base, output_folder_name)
-            os.makedirs(output_dir, exist_ok=True)
+    def save_results(self, results_path):
+        try:
+            with open(results_path, 'w', encoding='utf-8') as f:
+                json.dump({'input_folder': self.input_folder, 'results': self.results}, f, indent=2)
+            self.log(f"Saved results of {len(self.results)} files to {results_path}")
+        except Exception as e:
+            self.log(f"Could not write {results_path}: {str(e)}")
 
-            if save_all_detections and frames_with_detections:
-                for idx, (frame_path, detections) in enumerate(frames_with_detections):
-                    frame = cv2.imread(frame_path)
-                    frame_with_detections = frame.copy()
-                    output_image_path = os.path.join(output_dir, f"frame_{idx}_with_detections.jpg")
-                    draw_detections_on_image(frame_with_detections, detections, confidence_threshold, output_image_path)
-                    log(f"Saved frame with detections to {output_image_path}")
-
-                    # Save cropped images for each detection
-                    for j, detection in enumerate(detections):
-                        cropped_image = crop_image_with_bbox_image(frame, detection['bbox'])
-                        cropped_image_path = os.path.join(output_dir, f"frame_{idx}_cropped_{j}.jpg")
-                        cv2.imwrite(cropped_image_path, cropped_image)
-                        log(f"Saved cropped image to {cropped_image_path}")
-
-                log(f"Saved all detections for video {video_file_name} to {output_dir}")
-            elif best_detection is not None and best_frame is not None:
-                # Save best frame and cropped image
-                output_image_path = os.path.join(output_dir, 'best_frame_with_detections.jpg')
-                draw_detections_on_image(best_frame.copy(), [best_detection], confidence_threshold, output_image_path)
-
-                cropped_image = crop_image_with_bbox_image(best_frame, best_detection['bbox'])
-                cropped_image_path = os.path.join(output_dir, 'cropped_image.jpg')
-                cv2.imwrite(cropped_image_path, cropped_image)
+    def watch_folder(self, detector, output_base):
+        """
+        Keep the detector loaded and process new files as they finish copying into
+        the input folder, until a stop is requested. The watcher was started before
+        the initial scan, so files copied in during the initial pass come first.
+        """
+        ledger_path = os.path.join(self.input_folder, PROCESSED_LEDGER_FILE_NAME)
+        watcher = self.folder_watcher
+        self.log(f"Watching {self.input_folder} for new files ({watcher.mode})...")
+        while not self.stop_requested:
+            for file_path in watcher.poll():
+                if self.stop_requested:
+                    break
+                file_type = self.get_file_type(file_path)
+                if file_type is None or self.is_in_ledger(file_path):
+                    continue
+
+                self.total_files += 1
+                if file_type == 'image':
+                    self.file_costs[file_path] = 1.0
+                    self.total_cost += 1.0
+                    self.process_image(file_path, detector, output_base)
+                else:
+                    try:
+                        self.video_metadata[file_path] = self.probe_video(file_path)
+                    except DecodeFailure as e:
+                        self.log(f"Could not read the metadata of {file_path}: {str(e)}")
+                        self.quarantine_file(file_path, str(e))
+                        continue
+                    self.file_costs[file_path] = estimate_video_cost(
+                        self.video_metadata[file_path],
+                        self.every_n_frames,
+                        self.processing_duration_seconds,
+                        decoder_backend=self.decoder_backend,
+                        sample_every_seconds=self.sample_every_seconds,
+                        keyframes_only=self.keyframes_only
+                    )
+                    self.total_cost += self.file_costs[file_path]
+                    self.process_video(file_path, detector, output_base)
+                if self.species_classifier is not None:
+                    self.species_classifier.flush()  # New files are classified without waiting for a batch
+                save_processed_ledger(ledger_path, self.processed_ledger, self.log)
+            time.sleep(WATCH_POLL_SECONDS)
+
+    def process_data(self, model=None):
+        """
+        Main processing function. Processes images and videos, while tracking progress.
+        Returns True if the run completed without errors.
+        """
+        previous_priority = None
+        try:
+            self.log("Starting processing...")
+            output_base = self.get_output_base()
+
+            if self.background_mode:
+                previous_priority = apply_background_priority(self.log)
+
+            detector = self.load_frame_detector(model)
+            if detector is None:
+                return False
+
+            if self.watch_mode:
+                ledger_path = os.path.join(self.input_folder, PROCESSED_LEDGER_FILE_NAME)
+                self.processed_ledger = load_processed_ledger(ledger_path, self.log)
+                # Started before the scan, so files copied in during the initial pass are not missed
+                self.folder_watcher = FolderWatcher(
+                    self.input_folder,
+                    IMAGE_EXTENSIONS + VIDEO_EXTENSIONS,
+                    ignored_dirs=[QUARANTINE_DIR_NAME, "detection_data"]
+                )
+                self.folder_watcher.start()
 
-                log(f"Saved best frame with detection to {output_image_path}")
-                log(f"Saved cropped image to {cropped_image_path}")
-            else:
-                log("No frames to save.")
-        else:
-            log("Detection data saving is disabled.")
+            self.log("Counting files in input folder...")
+            image_files, video_files = self.find_input_files()
+            scan_time = time.time()
+            for file_path in image_files + video_files:
+                try:
+                    stat = os.stat(file_path)
+                    self.file_snapshots[file_path] = (stat.st_size, stat.st_mtime, scan_time)
+                except OSError:
+                    pass
+            if self.folder_watcher is not None:
+                self.folder_watcher.mark_seen(image_files + video_files)
+
+            self.total_files = len(image_files) + len(video_files)
+            self.log(f"Found {len(image_files)} images and {len(video_files)} videos")
+            self.prepare_file_state(image_files)
 
-        log("Video processing complete")
+            if self.estimate_mode:
+                try:
+                    detector = self.run_estimate(image_files, video_files, detector, output_base)
+                finally:
+                    if output_base is not None:
+                        self.save_results(os.path.join(output_base, RESULTS_FILE_NAME))
+                self.log_run_summary(detector)
+                self.log("Estimate completed.")
+                return True
+
+            self.frame_decoder = IsolatedDecoder(self.decode_timeout_seconds) if self.isolate_decoding else None
+            try:
+                video_files = self.estimate_costs(image_files, video_files)
+                self.start_time = time.time()
+                self.update_progress()
 
-    finally:
-        # Ensure the temporary directory is deleted
-        shutil.rmtree(temp_dir)
+                work_items = self.schedule_work(image_files, video_files, output_base)
+                self.process_work_items(work_items, detector, output_base)
+
+                if self.watch_mode:
+                    save_processed_ledger(ledger_path, self.processed_ledger, self.log)
+                    self.watch_folder(detector, output_base)
+            finally:
+                if self.frame_decoder is not None:
+                    self.frame_decoder.close()
+                if self.species_classifier is not None:
+                    self.species_classifier.flush()
+                if output_base is not None:
+                    self.save_results(os.path.join(output_base, RESULTS_FILE_NAME))
+                if self.static_index is not None:
+                    self.static_index.save(self.log)
+                    self.save_static_report(output_base)
+
+            self.log_run_summary(detector)
+            self.log("Processing completed successfully.")
+            return True
+        except Exception as e:
+            self.log(f"Error during processing: {str(e)}")
+            return False
+        finally:
+            if self.folder_watcher is not None:
+                self.folder_watcher.stop()
+                self.folder_watcher = None
+            if previous_priority is not None:
+                restore_process_priority(previous_priority, self.log)
+            self.finished.emit()
 
 
-class ProcessingThread(QThread):
+class JobQueueThread(QThread):
+    """
+    Runs the queued jobs back to back, keeping one detector model loaded for all of them.
+    """
     log_signal = pyqtSignal(str)
-    progress_signal = pyqtSignal(int, int)  # Emits (processed_count, total_count)
+    progress_signal = pyqtSignal(int, int, float)
+    job_signal = pyqtSignal()  # Emitted when the status of a job changes
     finished = pyqtSignal()
 
-    def __init__(
-        self, input_folder, every_n_frames, confidence_threshold,
-        create_detection_data, delete_no_detection,
-        processing_duration_seconds, save_all_checkbox, rename_files_checkbox,
-        hito_prefix, animal_prefix
-    ):
+    def __init__(self, job_queue):
         super().__init__()
-        self.input_folder = input_folder
-        self.every_n_frames = every_n_frames
-        self.confidence_threshold = confidence_threshold
-        self.create_detection_data = create_detection_data
-        self.delete_no_detection = delete_no_detection
-        self.processing_duration_seconds = processing_duration_seconds
-        self.save_all_checkbox = save_all_checkbox
-        self.rename_files_checkbox = rename_files_checkbox
-        self.hito_prefix = hito_prefix
-        self.animal_prefix = animal_prefix
-        self.total_files = 0  # Initialize total files count
-        self.processed_count = 0  # Track processed files
-
+        self.job_queue = job_queue
+        self.current_job = None
+        self.current_thread = None
+        self.pause_requested = False
+        self.stop_requested = False
 
     def log(self, message):
         self.log_signal.emit(message)
 
-    def update_progress(self):
-        """
-        Emit the progress signal with the current state.
-        """
-        self.progress_signal.emit(self.processed_count, self.total_files)
+    def request_stop(self):
+        self.stop_requested = True
+        if self.current_thread is not None:
+            self.current_thread.request_stop()
 
-    def run(self):
+    def pause_job(self, job_id):
         """
-        Entry point for the thread. Calls the main processing function.
+        Pause the job if it is the one running; it is queued again when resumed.
         """
-        self.log("Thread is running...")
-        self.process_data()
-        self.finished.emit()
+        if self.current_job is not None and self.current_job['id'] == job_id:
+            self.pause_requested = True
+            self.current_thread.request_stop()
 
-    def process_data(self):
-        """
-        Main processing function. Processes images and videos, while tracking progress.
-        """
+    def run(self):
+        self.log("Loading AI detector model for the job queue...")
         try:
-            self.log("Starting processing...")
-            if self.create_detection_data:
-                output_base = os.path.join(self.input_folder, "detection_data")
-                os.makedirs(output_base, exist_ok=True)
-                self.log(f"Output will be saved to {output_base}")
+            model = load_detector('md_v5b.0.0.pt')  # Adjust path as needed
+        except Exception as e:
+            self.log(f"Failed to load detector: {str(e)}")
+            self.finished.emit()
+            return
+
+        while not self.stop_requested:
+            job = self.job_queue.next_job()
+            if job is None:
+                break
+            self.log(f"Starting job {job['id']}: {job['input_folder']}")
+            self.job_queue.set_status(job['id'], 'running')
+            self.job_signal.emit()
+
+            # Watch mode never finishes, so it is not used for queued jobs
+            settings = dict(job['settings'], watch_mode=False)
+            self.current_job = job
+            self.current_thread = ProcessingThread(input_folder=job['input_folder'], **settings)
+            self.current_thread.log_signal.connect(self.log_signal)
+            self.current_thread.progress_signal.connect(self.progress_signal)
+            completed = self.current_thread.process_data(model)
+
+            if self.pause_requested:
+                status = 'paused'
+            elif self.current_thread.stop_requested:
+                status = 'queued'
             else:
-                output_base = None  # Or set to some default
+                status = 'done' if completed else 'failed'
+            self.job_queue.set_status(job['id'], status)
+            self.log(f"Job {job['id']} {status}")
+            self.job_signal.emit()
+            self.current_job = None
+            self.current_thread = None
+            self.pause_requested = False
+
+        self.log("Job queue finished.")
+        self.finished.emit()
 
-            self.log("Loading AI detector model...")
-            try:
-                detector = load_detector('md_v5b.0.0.pt')  # Adjust path as needed
-                self.log("Detector loaded successfully.")
-            except Exception as e:
-                self.log(f"Failed to load detector: {str(e)}")
-                return
 
-            self.log("AI detector model loaded successfully")
+# Function to split an input folder into the work units of a distributed run
+def run_distributed_coordinator(input_folder, queue_dir, settings, files_per_unit=WORK_UNIT_FILES, log=print):
+    work_queue = WorkQueue(queue_dir)
+    if os.path.exists(work_queue.job_path):
+        log(f"{queue_dir} already holds a job")
+        return 1
+
+    processor = ProcessingThread(input_folder=input_folder, **settings)
+    image_files, video_files = processor.find_input_files()
+
+    # Groups that must be processed by one worker to give the same results as a local run:
+    # the files of one camera with static suppression (its history depends on all of them),
+    # otherwise the images of one sequence
+    if processor.static_suppression:
+        camera_files = {}
+        for file_path in image_files + video_files:
+            camera_files.setdefault(get_camera_key(file_path, input_folder), []).append(file_path)
+        groups = list(camera_files.values())
+    elif processor.group_sequences:
+        groups = group_image_sequences(image_files) + [[video_file] for video_file in video_files]
+    else:
+        groups = [[file_path] for file_path in image_files + video_files]
 
-            self.log("Counting files in input folder...")
-            image_extensions = ['.jpg', '.jpeg', '.png']
-            video_extensions = ['.mp4', '.avi', '.mov', '.mkv']
-            prefixes = [self.hito_prefix, self.animal_prefix]  # Use user-defined prefixes
-
-            image_files = []
-            video_files = []
-
-            for root, dirs, files in os.walk(self.input_folder):
-                for f in files:
-                    ext = os.path.splitext(f)[1].lower()
-                    if ext in image_extensions:
-                        if not any(f.startswith(prefix) for prefix in prefixes):
-                            image_files.append(os.path.join(root, f))
-                    elif ext in video_extensions:
-                        if not any(f.startswith(prefix) for prefix in prefixes):
-                            video_files.append(os.path.join(root, f))
+    relative_groups = [[os.path.relpath(f, input_folder) for f in group] for group in groups]
+    unit_ids = work_queue.create(input_folder, settings, relative_groups, files_per_unit)
+    log(
+        f"Split {sum(len(group) for group in groups)} files into {len(unit_ids)} work units in {queue_dir}"
+    )
+    return 0
 
-            self.total_files = len(image_files) + len(video_files)
-            self.log(f"Found {len(image_files)} images and {len(video_files)} videos")
 
-            # Process images
-            self.log("Processing images...")
-            for image_file in image_files:
-                self.log(f"Processing image: {image_file}")
-                process_image_file(
-                    image_file=image_file,
-                    detector=detector,
-                    confidence_threshold=self.confidence_threshold,
-                    output_base=output_base,
-                    log=self.log,
-                    rename_images=self.rename_files_checkbox,
-                    delete_no_detections=self.delete_no_detection,
-                    hito_prefix=self.hito_prefix,
-                    animal_prefix=self.animal_prefix
-                )
-                self.processed_count += 1
-                self.update_progress()
+# Function to keep a lease alive while its unit is processed
+def keep_lease_alive(work_queue, lease_path, stop_event):
+    while not stop_event.wait(work_queue.lease_seconds / 3):
+        work_queue.renew(lease_path)
 
-            # Process videos
-            self.log("Processing videos...")
-            for video_file in video_files:
-                self.log(f"Processing video: {video_file}")
-                process_video_file(
-                    video_file=video_file,
-                    detector=detector,
-                    confidence_threshold=self.confidence_threshold,
-                    output_base=output_base,
-                    log=self.log,
-                    every_n_frames=self.every_n_frames,
-                    max_duration_seconds=self.processing_duration_seconds,
-                    save_all_detections=self.save_all_checkbox,
-                    rename_videos=self.rename_files_checkbox,
-                    delete_no_detections=self.delete_no_detection,
-                    hito_prefix=self.hito_prefix,
-                    animal_prefix=self.animal_prefix
-                )
-                self.processed_count += 1
-                self.update_progress()
 
-            self.log("Processing completed successfully.")
-        except Exception as e:
-            self.log(f"Error during processing: {str(e)}")
-        finally:
-            self.finished.emit()
+# Function to process work units from a distributed work queue until none are left
+def run_distributed_worker(queue_dir, worker_id=None, lease_seconds=WORK_LEASE_SECONDS, input_folder=None, log=print):
+    """
+    Claim and process work units until every unit has results, then merge the results.
+    Units leased by other workers are waited for, and claimed again if their lease
+    expires. input_folder overrides the job's folder when the share is mounted elsewhere.
+    """
+    work_queue = WorkQueue(queue_dir, lease_seconds)
+    job = work_queue.load_job()
+    input_folder = input_folder or job['input_folder']
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    # Watch mode never finishes, so it is not used by workers
+    processor = ProcessingThread(input_folder=input_folder, **dict(job['settings'], watch_mode=False))
+    processor.log_signal.connect(log)
+    detector = processor.load_frame_detector()
+    if detector is None:
+        return 1
+
+    # Each worker writes its detection data to its own folder, so workers never write the same files
+    output_base = processor.get_output_base()
+    if output_base is not None:
+        output_base = os.path.join(output_base, re.sub(r'[^\w.-]', '_', worker_id))
+        os.makedirs(output_base, exist_ok=True)
+
+    units_done = 0
+    processor.frame_decoder = IsolatedDecoder(processor.decode_timeout_seconds) if processor.isolate_decoding else None
+    try:
+        while True:
+            claimed = work_queue.claim(worker_id)
+            if claimed is None:
+                pending_units = work_queue.pending_units()
+                if not pending_units:
+                    break
+                log(f"Waiting for {len(pending_units)} units leased by other workers...")
+                time.sleep(WORK_POLL_SECONDS)
+                continue
+
+            unit, lease_path, reclaimed = claimed
+            log(f"Worker {worker_id} {'reclaimed' if reclaimed else 'claimed'} {unit['id']} ({len(unit['files'])} files)")
+
+            # Files renamed or deleted by an earlier, interrupted worker are skipped
+            work_items = []
+            for relative_path in unit['files']:
+                file_path = os.path.join(input_folder, relative_path)
+                file_type = processor.get_file_type(file_path)
+                if file_type is not None and os.path.exists(file_path):
+                    work_items.append((file_type, file_path))
+            processor.results = []
+            processor.total_files = len(work_items)
+            processor.processed_count = 0
+            # Reloaded for every unit, to start from the cameras finished by other workers
+            processor.prepare_file_state([file_path for file_type, file_path in work_items if file_type == 'image'])
+
+            stop_event = threading.Event()
+            heartbeat = threading.Thread(
+                target=keep_lease_alive, args=(work_queue, lease_path, stop_event), daemon=True
+            )
+            heartbeat.start()
+            try:
+                processor.process_work_items(work_items, detector, output_base)
+            finally:
+                stop_event.set()
+                heartbeat.join()
+
+            # Paths are stored relative to the input folder, which differs between machines
+            for result in processor.results:
+                result['file'] = os.path.relpath(result['file'], input_folder)
+                if result['output_file'] is not None:
+                    result['output_file'] = os.path.relpath(result['output_file'], input_folder)
+            if processor.static_index is not None:
+                processor.static_index.save_cameras(
+                    {get_camera_key(file_path, input_folder) for _, file_path in work_items}, log
+                )
+            work_queue.complete(unit['id'], worker_id, processor.results)
+            units_done += 1
+    finally:
+        if processor.frame_decoder is not None:
+            processor.frame_decoder.close()
+
+    if processor.static_index is not None:
+        processor.save_static_report(output_base)
+
+    merged_path = work_queue.merge()
+    log(f"Worker {worker_id} processed {units_done} units, merged results saved to {merged_path}")
+    return 0
+
+
+# Function to run the command line modes
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(description="Wild Catcher distributed processing")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    coordinate_parser = subparsers.add_parser('coordinate', help="Split an input folder into work units")
+    coordinate_parser.add_argument('input_folder')
+    coordinate_parser.add_argument('queue_dir', help="Queue folder on the shared filesystem")
+    coordinate_parser.add_argument('--settings', help="JSON file with processing settings")
+    coordinate_parser.add_argument('--files-per-unit', type=int, default=WORK_UNIT_FILES)
+
+    work_parser = subparsers.add_parser('work', help="Process work units from a queue folder")
+    work_parser.add_argument('queue_dir')
+    work_parser.add_argument('--worker-id')
+    work_parser.add_argument('--lease-seconds', type=int, default=WORK_LEASE_SECONDS)
+    work_parser.add_argument('--input-folder', help="Input folder path on this machine, if mounted elsewhere")
+
+    merge_parser = subparsers.add_parser('merge', help="Merge the results of the finished work units")
+    merge_parser.add_argument('queue_dir')
+
+    args = parser.parse_args(argv)
+    if args.command == 'coordinate':
+        settings = dict(DEFAULT_PROCESSING_SETTINGS)
+        if args.settings:
+            with open(args.settings, 'r', encoding='utf-8') as f:
+                settings.update(json.load(f))
+        return run_distributed_coordinator(args.input_folder, args.queue_dir, settings, args.files_per_unit)
+    if args.command == 'work':
+        return run_distributed_worker(
+            args.queue_dir, worker_id=args.worker_id, lease_seconds=args.lease_seconds,
+            input_folder=args.input_folder
+        )
+    work_queue = WorkQueue(args.queue_dir)
+    print(f"Merged results saved to {work_queue.merge()} ({len(work_queue.pending_units())} units pending)")
+    return 0
 
 
 class VideoDetectionApp(QMainWindow):
@@ -480,6 +4183,10 @@ class VideoDetectionApp(QMainWindow):
         self.is_settings_visible = False
         self.is_language_options_visible = False
 
+        # Folders queued for processing, kept between app restarts
+        self.job_queue = JobQueue(os.path.join(get_user_config_dir(), JOB_QUEUE_FILE_NAME))
+        self.job_queue.load()
+        self.job_status_texts = {}
 
         self.initUI()
 
@@ -584,7 +4291,13 @@ class VideoDetectionApp(QMainWindow):
         self.settings_content_layout.setAlignment(Qt.AlignTop)  # Align to top
 
         self.settings_content_widget.setLayout(self.settings_content_layout)
-        self.settings_panel_layout.addWidget(self.settings_content_widget)
+
+        # Scroll area so the settings list can grow beyond the window height
+        self.settings_scroll_area = QScrollArea()
+        self.settings_scroll_area.setWidgetResizable(True)
+        self.settings_scroll_area.setStyleSheet("border: none;")
+        self.settings_scroll_area.setWidget(self.settings_content_widget)
+        self.settings_panel_layout.addWidget(self.settings_scroll_area)
 
         # Main area
         self.main_area = QWidget()
@@ -640,6 +4353,77 @@ class VideoDetectionApp(QMainWindow):
         self.start_button.clicked.connect(self.start_processing)
         self.main_area_layout.addWidget(self.start_button, alignment=Qt.AlignLeft)
 
+        # Stop button, needed to end watch mode
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setStyleSheet("""
+            QPushButton {
+                font-size: 18px; 
+                padding: 10px 20px;
+                color: #FFFFFF; 
+                background-color: rgba(197, 15, 31, 0.4); 
+                border: 2px solid #C50F1F;
+                border-radius: 10px;
+            }
+            QPushButton:hover {
+                background-color: rgba(197, 15, 31, 1);
+            }
+        """)
+        self.stop_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop_processing)
+        self.main_area_layout.addWidget(self.stop_button, alignment=Qt.AlignLeft)
+
+        # Job queue
+        self.job_queue_label = QLabel("Job Queue:")
+        self.job_queue_label.setStyleSheet("font-size: 18px; color: #FFFFFF;")
+        self.main_area_layout.addWidget(self.job_queue_label)
+
+        self.job_list_widget = QListWidget()
+        self.job_list_widget.setStyleSheet("""
+            QListWidget {
+                background-color: #1E1E1E;
+                color: #FFFFFF;
+                border: 1px solid #3C3C3C;
+                border-radius: 5px;
+                font-size: 14px;
+            }
+        """)
+        self.job_list_widget.setFixedHeight(150)
+        self.main_area_layout.addWidget(self.job_list_widget)
+
+        job_buttons_layout = QHBoxLayout()
+        self.add_job_button = QPushButton("Add to Queue")
+        self.move_job_up_button = QPushButton("Up")
+        self.move_job_down_button = QPushButton("Down")
+        self.pause_job_button = QPushButton("Pause/Resume")
+        self.remove_job_button = QPushButton("Remove")
+        self.run_queue_button = QPushButton("Run Queue")
+        for button in [
+            self.add_job_button, self.move_job_up_button, self.move_job_down_button,
+            self.pause_job_button, self.remove_job_button, self.run_queue_button
+        ]:
+            button.setStyleSheet("""
+                QPushButton {
+                    font-size: 14px;
+                    color: #FFFFFF;
+                    background-color: #2E2E2E;
+                    border: none;
+                    padding: 8px;
+                    border-radius: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #437820;
+                }
+            """)
+            job_buttons_layout.addWidget(button)
+        self.add_job_button.clicked.connect(self.add_job)
+        self.move_job_up_button.clicked.connect(lambda: self.move_selected_job(-1))
+        self.move_job_down_button.clicked.connect(lambda: self.move_selected_job(1))
+        self.pause_job_button.clicked.connect(self.toggle_pause_selected_job)
+        self.remove_job_button.clicked.connect(self.remove_selected_job)
+        self.run_queue_button.clicked.connect(self.run_job_queue)
+        self.main_area_layout.addLayout(job_buttons_layout)
+
         # # Open external app button
         # self.open_external_app_button = QPushButton("Open Video Player App")
         # self.open_external_app_button.setStyleSheet("""
@@ -663,7 +4447,7 @@ class VideoDetectionApp(QMainWindow):
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setValue(0)
-        self.progress_bar.setFormat("%v/%m")
+        self.progress_bar.setFormat("%p%")
         self.progress_bar.setStyleSheet("""
             QProgressBar {
                 background-color: #3C3C3C;
@@ -800,6 +4584,117 @@ class VideoDetectionApp(QMainWindow):
         self.rename_files_checkbox = QCheckBox("Rename Files with Tags")
         self.rename_files_checkbox.setChecked(False)
 
+        self.watch_mode_checkbox = QCheckBox("Keep Watching the Folder for New Files")
+        self.watch_mode_checkbox.setChecked(False)
+
+        self.background_mode_checkbox = QCheckBox("Run in Background (Low Priority)")
+        self.background_mode_checkbox.setChecked(False)
+
+        self.static_suppression_checkbox = QCheckBox("Suppress Recurring Static Detections")
+        self.static_suppression_checkbox.setChecked(False)
+
+        self.group_sequences_checkbox = QCheckBox("Group Still Images into Bursts")
+        self.group_sequences_checkbox.setChecked(False)
+
+        self.dedup_checkbox = QCheckBox("Reuse Detections for Near-Identical Frames")
+        self.dedup_checkbox.setChecked(False)
+
+        self.thumbnail_triage_checkbox = QCheckBox("Skip Blank Images Using EXIF Thumbnails")
+        self.thumbnail_triage_checkbox.setChecked(False)
+
+        self.triage_audit_checkbox = QCheckBox("Audit Thumbnail Skipping (Infer Everything)")
+        self.triage_audit_checkbox.setChecked(False)
+
+        self.frame_gate_checkbox = QCheckBox("Skip Blank Frames and Tag Day/Night/IR")
+        self.frame_gate_checkbox.setChecked(False)
+
+        self.night_threshold_label = QLabel("Night Confidence Threshold (0 = Same):")
+        self.night_threshold_spinbox = QDoubleSpinBox()
+        self.night_threshold_spinbox.setRange(0.0, 1.0)
+        self.night_threshold_spinbox.setSingleStep(0.01)
+        self.night_threshold_spinbox.setValue(0.0)
+
+        self.ir_threshold_label = QLabel("IR Confidence Threshold (0 = Same):")
+        self.ir_threshold_spinbox = QDoubleSpinBox()
+        self.ir_threshold_spinbox.setRange(0.0, 1.0)
+        self.ir_threshold_spinbox.setSingleStep(0.01)
+        self.ir_threshold_spinbox.setValue(0.0)
+
+        self.prefilter_checkbox = QCheckBox("Pre-filter Empty Frames (Small CNN)")
+        self.prefilter_checkbox.setChecked(False)
+
+        self.prefilter_threshold_label = QLabel("Pre-filter Threshold:")
+        self.prefilter_threshold_spinbox = QDoubleSpinBox()
+        self.prefilter_threshold_spinbox.setRange(0.0, 1.0)
+        self.prefilter_threshold_spinbox.setSingleStep(0.01)
+        self.prefilter_threshold_spinbox.setValue(PREFILTER_THRESHOLD)
+
+        self.species_checkbox = QCheckBox("Classify Species of Animal Detections")
+        self.species_checkbox.setChecked(False)
+
+        self.comparison_models_label = QLabel("Comparison Models (comma-separated):")
+        self.comparison_models_line_edit = QLineEdit()
+        self.comparison_models_line_edit.setPlaceholderText("md_v5a.0.0.pt")
+
+        self.estimate_mode_checkbox = QCheckBox("Estimate Only (Sample Files, No Changes)")
+        self.estimate_mode_checkbox.setChecked(False)
+
+        self.schedule_policy_label = QLabel("Processing Order:")
+        self.schedule_policy_combobox = QComboBox()
+        for policy in SCHEDULE_POLICIES:
+            self.schedule_policy_combobox.addItem(policy, policy)
+
+        self.top_k_frames_label = QLabel("Best Frames to Save per Video:")
+        self.top_k_frames_spinbox = QSpinBox()
+        self.top_k_frames_spinbox.setRange(1, 20)
+        self.top_k_frames_spinbox.setValue(1)
+
+        self.track_detections_checkbox = QCheckBox("One Crop per Tracked Animal")
+        self.track_detections_checkbox.setChecked(False)
+
+        self.export_segments_checkbox = QCheckBox("Export Detection Clips")
+        self.export_segments_checkbox.setChecked(False)
+
+        self.segment_padding_label = QLabel("Clip Padding (seconds):")
+        self.segment_padding_spinbox = QDoubleSpinBox()
+        self.segment_padding_spinbox.setRange(0.0, 60.0)
+        self.segment_padding_spinbox.setSingleStep(0.5)
+        self.segment_padding_spinbox.setValue(2.0)
+
+        self.replace_with_segments_checkbox = QCheckBox("Replace Videos with Their Clips")
+        self.replace_with_segments_checkbox.setChecked(False)
+
+        self.cascade_checkbox = QCheckBox("Two-Pass Resolution Cascade")
+        self.cascade_checkbox.setChecked(False)
+
+        self.uncertainty_band_label = QLabel("Uncertainty Band (± threshold):")
+        self.uncertainty_band_spinbox = QDoubleSpinBox()
+        self.uncertainty_band_spinbox.setRange(0.0, 0.5)
+        self.uncertainty_band_spinbox.setSingleStep(0.01)
+        self.uncertainty_band_spinbox.setValue(0.1)
+
+        self.decoder_backend_label = QLabel("Video Decoder:")
+        self.decoder_backend_combobox = QComboBox()
+        self.decoder_backend_combobox.addItem("OpenCV", 'opencv')
+        self.decoder_backend_combobox.addItem("PyAV (FFmpeg)", 'pyav')
+
+        self.sample_every_seconds_label = QLabel("Sample Every (seconds, 0 = use frame interval):")
+        self.sample_every_seconds_spinbox = QDoubleSpinBox()
+        self.sample_every_seconds_spinbox.setRange(0.0, 60.0)
+        self.sample_every_seconds_spinbox.setSingleStep(0.5)
+        self.sample_every_seconds_spinbox.setValue(0.0)
+
+        self.keyframes_only_checkbox = QCheckBox("Keyframes Only")
+        self.keyframes_only_checkbox.setChecked(False)
+
+        self.isolate_decoding_checkbox = QCheckBox("Decode Videos in a Separate Process")
+        self.isolate_decoding_checkbox.setChecked(False)
+
+        self.decode_timeout_label = QLabel("Decoding Time Limit per Video (seconds):")
+        self.decode_timeout_spinbox = QSpinBox()
+        self.decode_timeout_spinbox.setRange(10, 3600)
+        self.decode_timeout_spinbox.setValue(300)
+
         self.hito_prefix_label = QLabel("Human/Vehicle Tag:")
         self.hito_prefix_line_edit = QLineEdit()
         self.hito_prefix_line_edit.setText("persona_")
@@ -834,6 +4729,34 @@ class VideoDetectionApp(QMainWindow):
             self.processing_duration_label, self.processing_duration_spinbox,
             self.create_detection_data_checkbox, self.delete_no_detection_checkbox,
             self.save_all_checkbox, self.rename_files_checkbox,
+            self.watch_mode_checkbox,
+            self.background_mode_checkbox,
+            self.static_suppression_checkbox,
+            self.group_sequences_checkbox,
+            self.dedup_checkbox,
+            self.thumbnail_triage_checkbox,
+            self.triage_audit_checkbox,
+            self.frame_gate_checkbox,
+            self.night_threshold_label, self.night_threshold_spinbox,
+            self.ir_threshold_label, self.ir_threshold_spinbox,
+            self.prefilter_checkbox,
+            self.prefilter_threshold_label, self.prefilter_threshold_spinbox,
+            self.species_checkbox,
+            self.comparison_models_label, self.comparison_models_line_edit,
+            self.estimate_mode_checkbox,
+            self.schedule_policy_label, self.schedule_policy_combobox,
+            self.top_k_frames_label, self.top_k_frames_spinbox,
+            self.track_detections_checkbox,
+            self.export_segments_checkbox,
+            self.segment_padding_label, self.segment_padding_spinbox,
+            self.replace_with_segments_checkbox,
+            self.cascade_checkbox,
+            self.uncertainty_band_label, self.uncertainty_band_spinbox,
+            self.decoder_backend_label, self.decoder_backend_combobox,
+            self.sample_every_seconds_label, self.sample_every_seconds_spinbox,
+            self.keyframes_only_checkbox,
+            self.isolate_decoding_checkbox,
+            self.decode_timeout_label, self.decode_timeout_spinbox,
             self.hito_prefix_label, self.hito_prefix_line_edit,
             self.animal_prefix_label, self.animal_prefix_line_edit,
             self.remove_prefixes_button
@@ -896,6 +4819,15 @@ class VideoDetectionApp(QMainWindow):
                 'input_dir_label': "処理対象フォルダー:",
                 'browse_button': "参照",
                 'start_button': "処理開始",
+                'stop_button': "停止",
+                'job_queue_label': "ジョブキュー:",
+                'add_job_button': "キューに追加",
+                'move_job_up_button': "上へ",
+                'move_job_down_button': "下へ",
+                'pause_job_button': "一時停止/再開",
+                'remove_job_button': "削除",
+                'run_queue_button': "キューを実行",
+                'job_status_texts': {'queued': "待機中", 'paused': "一時停止", 'running': "実行中", 'done': "完了", 'failed': "失敗"},
                 'open_external_app_button': "動画再生APPを開く",
                 'show_logs_label_show': "<a href='#'>ログを表示</a>",
                 'show_logs_label_hide': "<a href='#'>ログを隠す</a>",
@@ -906,6 +4838,35 @@ class VideoDetectionApp(QMainWindow):
                 'delete_no_detection_checkbox': "認識情報がない動画を削除する",
                 'save_all_checkbox': "すべてのフレームを保存",
                 'rename_files_checkbox': "タグで動画・画像のファイル名を変更",
+                'watch_mode_checkbox': "フォルダーを監視して新しいファイルを処理し続ける",
+                'background_mode_checkbox': "バックグラウンドで実行(低優先度)",
+                'static_suppression_checkbox': "繰り返し現れる静止物の検出を抑制",
+                'group_sequences_checkbox': "連写画像をまとめて処理",
+                'dedup_checkbox': "ほぼ同一のフレームは検出結果を再利用",
+                'thumbnail_triage_checkbox': "EXIFサムネイルで空白画像をスキップ",
+                'triage_audit_checkbox': "サムネイル判定を検証(すべて推論)",
+                'frame_gate_checkbox': "空白フレームをスキップし昼/夜/赤外線を判定",
+                'night_threshold_label': "夜間の信頼度閾値(0=共通):",
+                'ir_threshold_label': "赤外線の信頼度閾値(0=共通):",
+                'prefilter_checkbox': "小型CNNで空のフレームを事前除外",
+                'prefilter_threshold_label': "事前フィルタの閾値:",
+                'species_checkbox': "検出した動物の種を分類",
+                'comparison_models_label': "比較用モデル(カンマ区切り):",
+                'estimate_mode_checkbox': "推定のみ(ファイルを抽出、変更なし)",
+                'schedule_policy_label': "処理順序:",
+                'schedule_policy_items': ["画像を先に", "短いものから", "新しい設置から", "画像と動画を交互に"],
+                'top_k_frames_label': "動画ごとに保存するベストフレーム数:",
+                'track_detections_checkbox': "追跡した動物ごとに切り抜きを1枚保存",
+                'export_segments_checkbox': "検出部分をクリップとして書き出す",
+                'segment_padding_label': "クリップの前後余白（秒）:",
+                'replace_with_segments_checkbox': "元の動画をクリップで置き換える",
+                'cascade_checkbox': "2段階の解像度で処理する（境界のコマのみ高解像度）",
+                'uncertainty_band_label': "不確実帯の幅（しきい値 ±）:",
+                'decoder_backend_label': "動画デコーダー:",
+                'sample_every_seconds_label': "サンプリング間隔（秒、0 = コマ間隔を使用）:",
+                'keyframes_only_checkbox': "キーフレームのみ処理",
+                'isolate_decoding_checkbox': "動画を別プロセスでデコードする",
+                'decode_timeout_label': "動画1本あたりのデコード制限時間（秒）:",
                 'hito_prefix_label': "人・車のタグ:",
                 'animal_prefix_label': "動物のタグ:",
                 'remove_prefixes_button': "すべてのファイル名からタグを消す",
@@ -915,6 +4876,15 @@ class VideoDetectionApp(QMainWindow):
                 'input_dir_label': "Carpeta de entrada:",
                 'browse_button': "Examinar",
                 'start_button': "Iniciar",
+                'stop_button': "Detener",
+                'job_queue_label': "Cola de trabajos:",
+                'add_job_button': "Añadir a la cola",
+                'move_job_up_button': "Subir",
+                'move_job_down_button': "Bajar",
+                'pause_job_button': "Pausar/Reanudar",
+                'remove_job_button': "Quitar",
+                'run_queue_button': "Ejecutar cola",
+                'job_status_texts': {'queued': "en cola", 'paused': "en pausa", 'running': "en curso", 'done': "terminado", 'failed': "fallido"},
                 'open_external_app_button': "Abrir reproductor de videos",
                 'show_logs_label_show': "<a href='#'>Mostrar registros</a>",
                 'show_logs_label_hide': "<a href='#'>Ocultar registros</a>",
@@ -925,6 +4895,35 @@ class VideoDetectionApp(QMainWindow):
                 'delete_no_detection_checkbox': "Eliminar videos sin detecciones",
                 'save_all_checkbox': "Guardar todos los frames",
                 'rename_files_checkbox': "Renombrar archivos con etiquetas",
+                'watch_mode_checkbox': "Vigilar la carpeta en busca de archivos nuevos",
+                'background_mode_checkbox': "Ejecutar en segundo plano (baja prioridad)",
+                'static_suppression_checkbox': "Suprimir detecciones estáticas recurrentes",
+                'group_sequences_checkbox': "Agrupar imágenes en ráfagas",
+                'dedup_checkbox': "Reutilizar detecciones en fotogramas casi idénticos",
+                'thumbnail_triage_checkbox': "Omitir imágenes vacías usando miniaturas EXIF",
+                'triage_audit_checkbox': "Auditar la omisión por miniaturas (inferir todo)",
+                'frame_gate_checkbox': "Omitir fotogramas vacíos y etiquetar día/noche/IR",
+                'night_threshold_label': "Umbral de confianza nocturno (0 = igual):",
+                'ir_threshold_label': "Umbral de confianza IR (0 = igual):",
+                'prefilter_checkbox': "Prefiltrar fotogramas vacíos (CNN pequeña)",
+                'prefilter_threshold_label': "Umbral del prefiltro:",
+                'species_checkbox': "Clasificar la especie de los animales detectados",
+                'comparison_models_label': "Modelos de comparación (separados por comas):",
+                'estimate_mode_checkbox': "Solo estimar (muestra de archivos, sin cambios)",
+                'schedule_policy_label': "Orden de procesamiento:",
+                'schedule_policy_items': ["Imágenes primero", "Más cortos primero", "Despliegue más reciente primero", "Intercalar imágenes y videos"],
+                'top_k_frames_label': "Mejores frames a guardar por video:",
+                'track_detections_checkbox': "Un recorte por animal seguido",
+                'export_segments_checkbox': "Exportar clips de las detecciones",
+                'segment_padding_label': "Margen del clip (segundos):",
+                'replace_with_segments_checkbox': "Reemplazar videos por sus clips",
+                'cascade_checkbox': "Cascada de resolución en dos pasadas",
+                'uncertainty_band_label': "Banda de incertidumbre (± umbral):",
+                'decoder_backend_label': "Decodificador de video:",
+                'sample_every_seconds_label': "Muestrear cada (segundos, 0 = usar intervalo de frames):",
+                'keyframes_only_checkbox': "Solo fotogramas clave",
+                'isolate_decoding_checkbox': "Decodificar videos en un proceso separado",
+                'decode_timeout_label': "Tiempo límite de decodificación por video (segundos):",
                 'hito_prefix_label': "Etiqueta para humanos/vehículos:",
                 'animal_prefix_label': "Etiqueta para animales:",
                 'remove_prefixes_button': "Eliminar etiquetas de nombres de archivos",
@@ -934,6 +4933,15 @@ class VideoDetectionApp(QMainWindow):
                 'input_dir_label': "输入文件夹:",
                 'browse_button': "浏览",
                 'start_button': "开始处理",
+                'stop_button': "停止",
+                'job_queue_label': "任务队列:",
+                'add_job_button': "加入队列",
+                'move_job_up_button': "上移",
+                'move_job_down_button': "下移",
+                'pause_job_button': "暂停/继续",
+                'remove_job_button': "移除",
+                'run_queue_button': "运行队列",
+                'job_status_texts': {'queued': "排队中", 'paused': "已暂停", 'running': "运行中", 'done': "已完成", 'failed': "失败"},
                 'open_external_app_button': "打开视频播放器",
                 'show_logs_label_show': "<a href='#'>显示日志</a>",
                 'show_logs_label_hide': "<a href='#'>隐藏日志</a>",
@@ -944,6 +4952,35 @@ class VideoDetectionApp(QMainWindow):
                 'delete_no_detection_checkbox': "删除没有检测的文件",
                 'save_all_checkbox': "保存所有帧",
                 'rename_files_checkbox': "用标签重命名文件",
+                'watch_mode_checkbox': "持续监视文件夹中的新文件",
+                'background_mode_checkbox': "后台运行(低优先级)",
+                'static_suppression_checkbox': "抑制重复出现的静态检测",
+                'group_sequences_checkbox': "将连拍图像分组处理",
+                'dedup_checkbox': "近乎相同的帧复用检测结果",
+                'thumbnail_triage_checkbox': "使用EXIF缩略图跳过空白图像",
+                'triage_audit_checkbox': "审核缩略图跳过(全部推理)",
+                'frame_gate_checkbox': "跳过空白帧并标记白天/夜间/红外",
+                'night_threshold_label': "夜间置信度阈值(0=相同):",
+                'ir_threshold_label': "红外置信度阈值(0=相同):",
+                'prefilter_checkbox': "使用小型CNN预先过滤空帧",
+                'prefilter_threshold_label': "预过滤阈值:",
+                'species_checkbox': "对检测到的动物进行物种分类",
+                'comparison_models_label': "对比模型(逗号分隔):",
+                'estimate_mode_checkbox': "仅估算(抽样文件,不做更改)",
+                'schedule_policy_label': "处理顺序:",
+                'schedule_policy_items': ["先处理图像", "最短优先", "最新部署优先", "图像与视频交替"],
+                'top_k_frames_label': "每个视频保存的最佳帧数:",
+                'track_detections_checkbox': "每个跟踪的动物保存一张裁剪图",
+                'export_segments_checkbox': "导出检测片段",
+                'segment_padding_label': "片段前后余量 (秒):",
+                'replace_with_segments_checkbox': "用片段替换原视频",
+                'cascade_checkbox': "两阶段分辨率级联",
+                'uncertainty_band_label': "不确定区间 (阈值 ±):",
+                'decoder_backend_label': "视频解码器:",
+                'sample_every_seconds_label': "采样间隔 (秒, 0 = 使用帧间隔):",
+                'keyframes_only_checkbox': "仅关键帧",
+                'isolate_decoding_checkbox': "在独立进程中解码视频",
+                'decode_timeout_label': "每个视频的解码时限 (秒):",
                 'hito_prefix_label': "人/车辆标签:",
                 'animal_prefix_label': "动物标签:",
                 'remove_prefixes_button': "从文件名中删除标签",
@@ -953,6 +4990,15 @@ class VideoDetectionApp(QMainWindow):
                 'input_dir_label': "Input Folder:",
                 'browse_button': "Browse",
                 'start_button': "Start",
+                'stop_button': "Stop",
+                'job_queue_label': "Job Queue:",
+                'add_job_button': "Add to Queue",
+                'move_job_up_button': "Up",
+                'move_job_down_button': "Down",
+                'pause_job_button': "Pause/Resume",
+                'remove_job_button': "Remove",
+                'run_queue_button': "Run Queue",
+                'job_status_texts': {'queued': "queued", 'paused': "paused", 'running': "running", 'done': "done", 'failed': "failed"},
                 'open_external_app_button': "Open Video Player App",
                 'show_logs_label_show': "<a href='#'>Show Logs</a>",
                 'show_logs_label_hide': "<a href='#'>Hide Logs</a>",
@@ -963,6 +5009,35 @@ class VideoDetectionApp(QMainWindow):
                 'delete_no_detection_checkbox': "Delete Videos Without Detections",
                 'save_all_checkbox': "Save All Frames",
                 'rename_files_checkbox': "Rename Files with Tags",
+                'watch_mode_checkbox': "Keep Watching the Folder for New Files",
+                'background_mode_checkbox': "Run in Background (Low Priority)",
+                'static_suppression_checkbox': "Suppress Recurring Static Detections",
+                'group_sequences_checkbox': "Group Still Images into Bursts",
+                'dedup_checkbox': "Reuse Detections for Near-Identical Frames",
+                'thumbnail_triage_checkbox': "Skip Blank Images Using EXIF Thumbnails",
+                'triage_audit_checkbox': "Audit Thumbnail Skipping (Infer Everything)",
+                'frame_gate_checkbox': "Skip Blank Frames and Tag Day/Night/IR",
+                'night_threshold_label': "Night Confidence Threshold (0 = Same):",
+                'ir_threshold_label': "IR Confidence Threshold (0 = Same):",
+                'prefilter_checkbox': "Pre-filter Empty Frames (Small CNN)",
+                'prefilter_threshold_label': "Pre-filter Threshold:",
+                'species_checkbox': "Classify Species of Animal Detections",
+                'comparison_models_label': "Comparison Models (comma-separated):",
+                'estimate_mode_checkbox': "Estimate Only (Sample Files, No Changes)",
+                'schedule_policy_label': "Processing Order:",
+                'schedule_policy_items': ["Images First", "Shortest First", "Newest Deployment First", "Interleave Images and Videos"],
+                'top_k_frames_label': "Best Frames to Save per Video:",
+                'track_detections_checkbox': "One Crop per Tracked Animal",
+                'export_segments_checkbox': "Export Detection Clips",
+                'segment_padding_label': "Clip Padding (seconds):",
+                'replace_with_segments_checkbox': "Replace Videos with Their Clips",
+                'cascade_checkbox': "Two-Pass Resolution Cascade",
+                'uncertainty_band_label': "Uncertainty Band (± threshold):",
+                'decoder_backend_label': "Video Decoder:",
+                'sample_every_seconds_label': "Sample Every (seconds, 0 = use frame interval):",
+                'keyframes_only_checkbox': "Keyframes Only",
+                'isolate_decoding_checkbox': "Decode Videos in a Separate Process",
+                'decode_timeout_label': "Decoding Time Limit per Video (seconds):",
                 'hito_prefix_label': "Human/Vehicle Tag:",
                 'animal_prefix_label': "Animal Tag:",
                 'remove_prefixes_button': "Remove Tags from All File Names",
@@ -972,6 +5047,15 @@ class VideoDetectionApp(QMainWindow):
                 'input_dir_label': "입력 폴더:",
                 'browse_button': "찾아보기",
                 'start_button': "처리 시작",
+                'stop_button': "중지",
+                'job_queue_label': "작업 대기열:",
+                'add_job_button': "대기열에 추가",
+                'move_job_up_button': "위로",
+                'move_job_down_button': "아래로",
+                'pause_job_button': "일시정지/재개",
+                'remove_job_button': "제거",
+                'run_queue_button': "대기열 실행",
+                'job_status_texts': {'queued': "대기 중", 'paused': "일시정지", 'running': "실행 중", 'done': "완료", 'failed': "실패"},
                 'open_external_app_button': "비디오 플레이어 앱 열기",
                 'show_logs_label_show': "<a href='#'>로그 보기</a>",
                 'show_logs_label_hide': "<a href='#'>로그 숨기기</a>",
@@ -982,6 +5066,35 @@ class VideoDetectionApp(QMainWindow):
                 'delete_no_detection_checkbox': "감지되지 않은 비디오 삭제",
                 'save_all_checkbox': "모든 프레임 저장",
                 'rename_files_checkbox': "태그로 파일 이름 바꾸기",
+                'watch_mode_checkbox': "폴더를 계속 감시하여 새 파일 처리",
+                'background_mode_checkbox': "백그라운드 실행(낮은 우선순위)",
+                'static_suppression_checkbox': "반복되는 정적 검출 억제",
+                'group_sequences_checkbox': "연사 이미지 묶어서 처리",
+                'dedup_checkbox': "거의 동일한 프레임은 검출 결과 재사용",
+                'thumbnail_triage_checkbox': "EXIF 썸네일로 빈 이미지 건너뛰기",
+                'triage_audit_checkbox': "썸네일 건너뛰기 검증(모두 추론)",
+                'frame_gate_checkbox': "빈 프레임 건너뛰기 및 주간/야간/적외선 표시",
+                'night_threshold_label': "야간 신뢰도 임계값(0 = 동일):",
+                'ir_threshold_label': "적외선 신뢰도 임계값(0 = 동일):",
+                'prefilter_checkbox': "소형 CNN으로 빈 프레임 사전 필터링",
+                'prefilter_threshold_label': "사전 필터 임계값:",
+                'species_checkbox': "감지된 동물의 종 분류",
+                'comparison_models_label': "비교 모델(쉼표로 구분):",
+                'estimate_mode_checkbox': "추정만 수행(파일 표본 추출, 변경 없음)",
+                'schedule_policy_label': "처리 순서:",
+                'schedule_policy_items': ["이미지 먼저", "짧은 것부터", "최신 설치부터", "이미지와 비디오 교차"],
+                'top_k_frames_label': "비디오당 저장할 최적 프레임 수:",
+                'track_detections_checkbox': "추적된 동물당 잘라낸 이미지 1장",
+                'export_segments_checkbox': "감지 구간 클립 내보내기",
+                'segment_padding_label': "클립 여유 시간 (초):",
+                'replace_with_segments_checkbox': "비디오를 클립으로 대체",
+                'cascade_checkbox': "2단계 해상도 캐스케이드",
+                'uncertainty_band_label': "불확실 구간 (임계값 ±):",
+                'decoder_backend_label': "비디오 디코더:",
+                'sample_every_seconds_label': "샘플링 간격 (초, 0 = 프레임 간격 사용):",
+                'keyframes_only_checkbox': "키프레임만",
+                'isolate_decoding_checkbox': "별도 프로세스에서 비디오 디코딩",
+                'decode_timeout_label': "비디오당 디코딩 제한 시간 (초):",
                 'hito_prefix_label': "사람/차량 태그:",
                 'animal_prefix_label': "동물 태그:",
                 'remove_prefixes_button': "모든 파일 이름에서 태그 제거",
@@ -996,6 +5109,16 @@ class VideoDetectionApp(QMainWindow):
         self.input_dir_label.setText(trans['input_dir_label'])
         self.browse_button.setText(trans['browse_button'])
         self.start_button.setText(trans['start_button'])
+        self.stop_button.setText(trans['stop_button'])
+        self.job_queue_label.setText(trans['job_queue_label'])
+        self.add_job_button.setText(trans['add_job_button'])
+        self.move_job_up_button.setText(trans['move_job_up_button'])
+        self.move_job_down_button.setText(trans['move_job_down_button'])
+        self.pause_job_button.setText(trans['pause_job_button'])
+        self.remove_job_button.setText(trans['remove_job_button'])
+        self.run_queue_button.setText(trans['run_queue_button'])
+        self.job_status_texts = trans['job_status_texts']
+        self.refresh_job_list()
         # self.open_external_app_button.setText(trans['open_external_app_button'])
         if self.log_text_edit.isVisible():
             self.show_logs_label.setText(trans['show_logs_label_hide'])
@@ -1014,6 +5137,36 @@ class VideoDetectionApp(QMainWindow):
                 self.delete_no_detection_checkbox.setText(trans['delete_no_detection_checkbox'])
                 self.save_all_checkbox.setText(trans['save_all_checkbox'])
                 self.rename_files_checkbox.setText(trans['rename_files_checkbox'])
+                self.watch_mode_checkbox.setText(trans['watch_mode_checkbox'])
+                self.background_mode_checkbox.setText(trans['background_mode_checkbox'])
+                self.static_suppression_checkbox.setText(trans['static_suppression_checkbox'])
+                self.group_sequences_checkbox.setText(trans['group_sequences_checkbox'])
+                self.dedup_checkbox.setText(trans['dedup_checkbox'])
+                self.thumbnail_triage_checkbox.setText(trans['thumbnail_triage_checkbox'])
+                self.triage_audit_checkbox.setText(trans['triage_audit_checkbox'])
+                self.frame_gate_checkbox.setText(trans['frame_gate_checkbox'])
+                self.night_threshold_label.setText(trans['night_threshold_label'])
+                self.ir_threshold_label.setText(trans['ir_threshold_label'])
+                self.prefilter_checkbox.setText(trans['prefilter_checkbox'])
+                self.prefilter_threshold_label.setText(trans['prefilter_threshold_label'])
+                self.species_checkbox.setText(trans['species_checkbox'])
+                self.comparison_models_label.setText(trans['comparison_models_label'])
+                self.estimate_mode_checkbox.setText(trans['estimate_mode_checkbox'])
+                self.schedule_policy_label.setText(trans['schedule_policy_label'])
+                for index, item_text in enumerate(trans['schedule_policy_items']):
+                    self.schedule_policy_combobox.setItemText(index, item_text)
+                self.top_k_frames_label.setText(trans['top_k_frames_label'])
+                self.track_detections_checkbox.setText(trans['track_detections_checkbox'])
+                self.export_segments_checkbox.setText(trans['export_segments_checkbox'])
+                self.segment_padding_label.setText(trans['segment_padding_label'])
+                self.replace_with_segments_checkbox.setText(trans['replace_with_segments_checkbox'])
+                self.cascade_checkbox.setText(trans['cascade_checkbox'])
+                self.uncertainty_band_label.setText(trans['uncertainty_band_label'])
+                self.decoder_backend_label.setText(trans['decoder_backend_label'])
+                self.sample_every_seconds_label.setText(trans['sample_every_seconds_label'])
+                self.keyframes_only_checkbox.setText(trans['keyframes_only_checkbox'])
+                self.isolate_decoding_checkbox.setText(trans['isolate_decoding_checkbox'])
+                self.decode_timeout_label.setText(trans['decode_timeout_label'])
                 self.hito_prefix_label.setText(trans['hito_prefix_label'])
                 self.animal_prefix_label.setText(trans['animal_prefix_label'])
                 self.remove_prefixes_button.setText(trans['remove_prefixes_button'])
@@ -1030,6 +5183,53 @@ class VideoDetectionApp(QMainWindow):
         if dir_name:
             self.input_dir_line_edit.setText(dir_name)
 
+    def collect_settings(self):
+        """
+        Returns the current settings as ProcessingThread keyword arguments.
+        """
+        return {
+            'every_n_frames': self.frame_interval_spinbox.value(),
+            'confidence_threshold': self.confidence_threshold_spinbox.value(),
+            'create_detection_data': self.create_detection_data_checkbox.isChecked(),
+            'delete_no_detection': self.delete_no_detection_checkbox.isChecked(),
+            'processing_duration_seconds': self.processing_duration_spinbox.value(),
+            'save_all_checkbox': self.save_all_checkbox.isChecked(),
+            'rename_files_checkbox': self.rename_files_checkbox.isChecked(),
+            'hito_prefix': self.hito_prefix_line_edit.text(),  # User-defined prefixes
+            'animal_prefix': self.animal_prefix_line_edit.text(),
+            'cascade_enabled': self.cascade_checkbox.isChecked(),
+            'uncertainty_band': self.uncertainty_band_spinbox.value(),
+            'decoder_backend': self.decoder_backend_combobox.currentData(),
+            'sample_every_seconds': self.sample_every_seconds_spinbox.value(),
+            'keyframes_only': self.keyframes_only_checkbox.isChecked(),
+            'isolate_decoding': self.isolate_decoding_checkbox.isChecked(),
+            'decode_timeout_seconds': self.decode_timeout_spinbox.value(),
+            'top_k_frames': self.top_k_frames_spinbox.value(),
+            'track_detections': self.track_detections_checkbox.isChecked(),
+            'export_segments': self.export_segments_checkbox.isChecked(),
+            'segment_padding_seconds': self.segment_padding_spinbox.value(),
+            'replace_with_segments': self.replace_with_segments_checkbox.isChecked(),
+            'watch_mode': self.watch_mode_checkbox.isChecked(),
+            'schedule_policy': self.schedule_policy_combobox.currentData(),
+            'background_mode': self.background_mode_checkbox.isChecked(),
+            'static_suppression': self.static_suppression_checkbox.isChecked(),
+            'group_sequences': self.group_sequences_checkbox.isChecked(),
+            'dedup_enabled': self.dedup_checkbox.isChecked(),
+            'thumbnail_triage': self.thumbnail_triage_checkbox.isChecked(),
+            'triage_audit': self.triage_audit_checkbox.isChecked(),
+            'frame_gate': self.frame_gate_checkbox.isChecked(),
+            'night_threshold': self.night_threshold_spinbox.value(),
+            'ir_threshold': self.ir_threshold_spinbox.value(),
+            'prefilter_enabled': self.prefilter_checkbox.isChecked(),
+            'prefilter_threshold': self.prefilter_threshold_spinbox.value(),
+            'species_classification': self.species_checkbox.isChecked(),
+            'estimate_mode': self.estimate_mode_checkbox.isChecked(),
+            'comparison_models': [
+                model_file.strip() for model_file in self.comparison_models_line_edit.text().split(',')
+                if model_file.strip()
+            ],
+        }
+
     def start_processing(self):
         # Get parameters from UI
         input_folder = self.input_dir_line_edit.text()
@@ -1042,35 +5242,13 @@ class VideoDetectionApp(QMainWindow):
 
         self.log("Starting processing thread...")
 
-        # Use settings variables
-        every_n_frames = self.frame_interval_spinbox.value()
-        confidence_threshold = self.confidence_threshold_spinbox.value()
-        create_detection_data = self.create_detection_data_checkbox.isChecked()
-        delete_no_detection = self.delete_no_detection_checkbox.isChecked()
-        processing_duration_seconds = self.processing_duration_spinbox.value()
-        save_all_checkbox = self.save_all_checkbox.isChecked()
-        rename_files_checkbox = self.rename_files_checkbox.isChecked()
-
-        # Get user-defined prefixes
-        hito_prefix = self.hito_prefix_line_edit.text()
-        animal_prefix = self.animal_prefix_line_edit.text()
-
         # Disable the start button to prevent multiple clicks
         self.start_button.setEnabled(False)
+        self.run_queue_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
         self.progress_bar.setValue(0)
 
-        self.processing_thread = ProcessingThread(
-            input_folder=input_folder,
-            every_n_frames=every_n_frames,
-            confidence_threshold=confidence_threshold,
-            create_detection_data=create_detection_data,
-            delete_no_detection=delete_no_detection,
-            processing_duration_seconds=processing_duration_seconds,
-            save_all_checkbox=save_all_checkbox,
-            rename_files_checkbox=rename_files_checkbox,
-            hito_prefix=hito_prefix,
-            animal_prefix=animal_prefix
-        )
+        self.processing_thread = ProcessingThread(input_folder=input_folder, **self.collect_settings())
 
         # Connect signals
         self.processing_thread.log_signal.connect(self.log)
@@ -1081,18 +5259,92 @@ class VideoDetectionApp(QMainWindow):
         self.processing_thread.start()
         self.log("Processing thread started.")
 
+    def refresh_job_list(self):
+        selected_job_id = self.get_selected_job_id()
+        self.job_list_widget.clear()
+        for job in self.job_queue.jobs:
+            status_text = self.job_status_texts.get(job['status'], job['status'])
+            item = QListWidgetItem(f"{job['input_folder']}  [{status_text}]")
+            item.setData(Qt.UserRole, job['id'])
+            self.job_list_widget.addItem(item)
+            if job['id'] == selected_job_id:
+                self.job_list_widget.setCurrentItem(item)
+
+    def get_selected_job_id(self):
+        item = self.job_list_widget.currentItem()
+        return item.data(Qt.UserRole) if item is not None else None
+
+    def add_job(self):
+        input_folder = self.input_dir_line_edit.text()
+        if not input_folder or not os.path.isdir(input_folder):
+            self.log("Please select a folder to add to the queue")
+            return
+        job = self.job_queue.add(input_folder, self.collect_settings())
+        self.log(f"Added job {job['id']}: {input_folder}")
+        self.refresh_job_list()
+
+    def move_selected_job(self, offset):
+        job_id = self.get_selected_job_id()
+        if job_id is not None:
+            self.job_queue.move(job_id, offset)
+            self.refresh_job_list()
+
+    def toggle_pause_selected_job(self):
+        job_id = self.get_selected_job_id()
+        job = self.job_queue.get(job_id) if job_id is not None else None
+        if job is None:
+            return
+        if job['status'] == 'running':
+            self.processing_thread.pause_job(job_id)
+        elif job['status'] == 'paused':
+            self.job_queue.set_status(job_id, 'queued')
+        elif job['status'] in ('queued', 'failed'):
+            self.job_queue.set_status(job_id, 'paused')
+        self.refresh_job_list()
+
+    def remove_selected_job(self):
+        job_id = self.get_selected_job_id()
+        if job_id is not None:
+            self.job_queue.remove(job_id)
+            self.refresh_job_list()
+
+    def run_job_queue(self):
+        if self.job_queue.next_job() is None:
+            self.log("No queued jobs to run")
+            return
+
+        self.start_button.setEnabled(False)
+        self.run_queue_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.progress_bar.setValue(0)
+
+        self.processing_thread = JobQueueThread(self.job_queue)
+        self.processing_thread.log_signal.connect(self.log)
+        self.processing_thread.progress_signal.connect(self.update_progress)
+        self.processing_thread.job_signal.connect(self.refresh_job_list)
+        self.processing_thread.finished.connect(self.processing_finished)
+        self.processing_thread.start()
+
     def log(self, message):
         self.log_text_edit.append(message)
 
-    def update_progress(self, processed, total):
-        self.progress_bar.setMaximum(total)
-        self.progress_bar.setValue(processed)
-        self.progress_bar.setFormat(f"{processed}/{total}")
-        self.log(f"Progress: {processed}/{total}")
+    def update_progress(self, completed_cost, total_cost, eta_seconds):
+        self.progress_bar.setMaximum(max(total_cost, 1))
+        self.progress_bar.setValue(completed_cost)
+        percent = 100 * completed_cost // max(total_cost, 1)
+        self.progress_bar.setFormat(f"{percent}%  ETA {format_eta(eta_seconds)}")
 
     def processing_finished(self):
         self.log("Processing complete")
         self.start_button.setEnabled(True)
+        self.run_queue_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.refresh_job_list()
+
+    def stop_processing(self):
+        if hasattr(self, 'processing_thread') and self.processing_thread.isRunning():
+            self.processing_thread.request_stop()
+        self.stop_button.setEnabled(False)
 
     def open_external_application(self):
         """
@@ -1193,6 +5445,16 @@ class VideoDetectionApp(QMainWindow):
             self.log(f"Renamed: {original} -> {new}")
 
 if __name__ == '__main__':
+    # The frozen (PyInstaller) build runs the isolated decoder through its own executable
+    if DECODE_WORKER_ARGUMENT in sys.argv:
+        from decode_worker import main as run_decode_worker
+        run_decode_worker()
+        sys.exit(0)
+
+    # Headless distributed processing, the GUI starts when no command is given
+    if len(sys.argv) > 1 and sys.argv[1] in ('coordinate', 'work', 'merge'):
+        sys.exit(run_command_line(sys.argv[1:]))
+
     app = QApplication(sys.argv)
 
     # Apply custom font if desired
@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The detector module imports PyQt5 and MegaDetector at the top
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+detector = pytest.importorskip('detector_animales_diego')
+
+
+def detection(bbox, conf=0.9, category='1'):
+    return {'category': category, 'conf': conf, 'bbox': list(bbox)}
+
+
+def textured_image(seed, width=160, height=120):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def test_dhash_matches_near_duplicates_of_the_same_camera():
+    image = textured_image(0)
+    image_hash = detector.compute_dhash(image)
+    assert image_hash.size == detector.DEDUP_HASH_SIZE * detector.DEDUP_HASH_SIZE // 8
+
+    cache = detector.DetectionCache()
+    detections = [detection([0.1, 0.1, 0.2, 0.2])]
+    cache.add('cam1', image_hash, detections)
+
+    slightly_brighter = cv2.add(image, 2)
+    assert cache.lookup('cam1', detector.compute_dhash(slightly_brighter)) is detections
+    assert cache.lookup('cam2', image_hash) is None
+    assert cache.lookup('cam1', detector.compute_dhash(textured_image(1))) is None
+
+
+def test_detection_cache_keeps_only_the_latest_entries():
+    cache = detector.DetectionCache(max_entries=2)
+    hashes = [detector.compute_dhash(textured_image(seed)) for seed in range(3)]
+    for index, image_hash in enumerate(hashes):
+        cache.add('cam1', image_hash, [index])
+    assert cache.lookup('cam1', hashes[0]) is None
+    assert cache.lookup('cam1', hashes[2]) == [2]
+
+
+def test_wilson_interval_bounds():
+    assert detector.wilson_interval(0.5, 0) == (0.0, 1.0)
+    low, high = detector.wilson_interval(0.0, 20)
+    assert low == 0.0 and 0.0 < high < 0.2
+    narrow = detector.wilson_interval(0.3, 1000)
+    wide = detector.wilson_interval(0.3, 10)
+    assert wide[0] < narrow[0] < 0.3 < narrow[1] < wide[1]
+
+
+def test_deployment_estimate_samples_strata_in_proportion():
+    files_by_stratum = {'a': [f"a/{i}.jpg" for i in range(30)], 'b': [f"b/{i}.jpg" for i in range(10)]}
+    estimate = detector.DeploymentEstimate(files_by_stratum)
+    sample = list(estimate.iter_sample())
+    assert sorted(file_path for _, file_path in sample) == sorted(files_by_stratum['a'] + files_by_stratum['b'])
+
+    first_eight = [stratum for stratum, _ in sample[:8]]
+    assert first_eight.count('a') == 6 and first_eight.count('b') == 2
+
+
+def test_deployment_estimate_is_exact_once_every_file_is_processed():
+    files_by_stratum = {'a': ['a/1.jpg', 'a/2.jpg'], 'b': ['b/1.jpg', 'b/2.jpg']}
+    estimate = detector.DeploymentEstimate(files_by_stratum)
+    assert estimate.estimate()['animal'] == (0.0, 0.0, 1.0)
+
+    for stratum, file_path in estimate.iter_sample():
+        status = 'detected' if file_path == 'a/1.jpg' else 'no_detections'
+        categories = {'1': 0.9} if status == 'detected' else {}
+        estimate.observe(stratum, {'status': status, 'categories': categories})
+    estimate.observe('b', {'status': 'unreadable', 'categories': {}})
+
+    assert estimate.processed == 4
+    assert estimate.estimate()['animal'] == (0.25, 0.25, 0.25)
+    assert estimate.estimate()['empty'] == (0.75, 0.75, 0.75)
+
+
+def test_schedule_files_policies():
+    image_files = ['in/01012024/a.jpg', 'in/01012024/b.jpg', 'in/01012024/c.jpg']
+    video_files = ['in/02012024/v.avi']
+    file_costs = {'in/01012024/a.jpg': 3.0, 'in/01012024/b.jpg': 1.0, 'in/01012024/c.jpg': 2.0, 'in/02012024/v.avi': 6.0}
+
+    assert detector.schedule_files(image_files, video_files, file_costs, 'images_first', 'in')[-1] == ('video', 'in/02012024/v.avi')
+    assert [f for _, f in detector.schedule_files(image_files, video_files, file_costs, 'shortest_first', 'in')] == [
+        'in/01012024/b.jpg', 'in/01012024/c.jpg', 'in/01012024/a.jpg', 'in/02012024/v.avi'
+    ]
+    assert detector.schedule_files(image_files, video_files, file_costs, 'newest_first', 'in')[0] == ('video', 'in/02012024/v.avi')
+
+    interleaved = detector.schedule_files(image_files, video_files, file_costs, 'interleave', 'in')
+    assert sorted(interleaved) == sorted(detector.schedule_files(image_files, video_files, file_costs, 'images_first', 'in'))
+    assert interleaved[0][0] == 'image' and interleaved[1][0] == 'video'
+
+
+def test_box_tracker_follows_a_moving_animal():
+    frame = np.zeros((100, 100, 3), dtype=np.uint8)
+    tracker = detector.BoxTracker()
+    tracker.update(frame, 1, 0.0, [detection([0.10, 0.10, 0.2, 0.2], conf=0.5)])
+    tracker.update(frame, 2, 0.5, [detection([0.15, 0.10, 0.2, 0.2], conf=0.8), detection([0.7, 0.7, 0.1, 0.1], category='2')])
+    tracker.update(frame, 3, 1.0, [])
+    tracker.update(frame, 4, 1.5, [detection([0.20, 0.12, 0.2, 0.2], conf=0.6)])
+
+    assert len(tracker.tracks) == 2
+    animal = tracker.tracks[0]
+    assert (animal['first_frame'], animal['last_frame'], animal['detections']) == (1, 4, 3)
+    assert animal['max_conf'] == 0.8 and animal['best_frame'] == 2
+    assert animal['crop'].shape == (20, 20, 3)
+    assert tracker.tracks[1]['category'] == '2'
+
+
+def test_box_tracker_starts_a_new_track_after_a_long_gap():
+    frame = np.zeros((100, 100, 3), dtype=np.uint8)
+    tracker = detector.BoxTracker(max_gap_frames=2)
+    tracker.update(frame, 1, 0.0, [detection([0.1, 0.1, 0.2, 0.2])])
+    for frame_number in range(2, 5):
+        tracker.update(frame, frame_number, frame_number / 2, [])
+    tracker.update(frame, 5, 2.5, [detection([0.1, 0.1, 0.2, 0.2])])
+    assert len(tracker.tracks) == 2
+
+
+def test_top_k_selector_keeps_the_best_frames_apart_in_time():
+    frame = np.zeros((100, 100, 3), dtype=np.uint8)
+    bbox = [0.2, 0.2, 0.3, 0.3]
+    selector = detector.TopKFrameSelector(2, min_gap_seconds=1.0)
+    selector.offer(frame, 0.0, [detection(bbox, conf=0.5)])
+    selector.offer(frame, 0.5, [detection(bbox, conf=0.9), detection(bbox, conf=0.3)])
+    selector.offer(frame, 0.8, [detection(bbox, conf=0.4)])
+    selector.offer(frame, 5.0, [detection(bbox, conf=0.6)])
+    selector.offer(frame, 10.0, [detection(bbox, conf=0.7)])
+    selector.offer(frame, 20.0, [detection(bbox, conf=0.2)])
+
+    best = selector.best()
+    assert [candidate['timestamp'] for candidate in best] == [0.5, 10.0]
+    assert best[0]['detection']['conf'] == 0.9
+
+
+def test_build_detection_segments_merges_overlapping_ranges():
+    assert detector.build_detection_segments([], 2) == []
+    assert detector.build_detection_segments([10.0, 1.0, 4.0, 30.0], 2) == [(0.0, 6.0), (8.0, 12.0), (28.0, 32.0)]
+
+
+def test_only_clips_listed_in_the_manifest_are_segment_clips(tmp_path):
+    clip_path = tmp_path / 'video_segment_1.mp4'
+    user_path = tmp_path / 'holiday_segment_2.mp4'
+    clip_path.write_bytes(b'')
+    user_path.write_bytes(b'')
+    assert not detector.is_segment_clip(str(clip_path))
+
+    detector.add_to_segment_manifest(str(tmp_path), [str(clip_path)])
+    detector.add_to_segment_manifest(str(tmp_path), [str(clip_path)])
+    assert json.loads((tmp_path / detector.SEGMENT_MANIFEST_FILE_NAME).read_text())['clips'] == ['video_segment_1.mp4']
+    assert detector.is_segment_clip(str(clip_path))
+    assert not detector.is_segment_clip(str(user_path))
+    assert not detector.is_segment_clip(str(tmp_path / 'video.mp4'))
+
+
+def test_group_image_sequences_splits_bursts():
+    capture_times = {
+        'cam1/a.jpg': 0.0, 'cam1/b.jpg': 2.0, 'cam1/c.jpg': 4.0,  # One burst
+        'cam1/d.jpg': 100.0,                                       # Too late for it
+        'cam2/e.jpg': 1.0,                                         # Other folder
+        'cam1/f.jpg': None, 'cam1/g.jpg': None,                    # No EXIF time
+    }
+    sequences = detector.group_image_sequences(list(capture_times), max_gap_seconds=5, get_time=capture_times.get)
+    assert sorted(sequences) == sorted([
+        ['cam1/a.jpg', 'cam1/b.jpg', 'cam1/c.jpg'], ['cam1/d.jpg'], ['cam2/e.jpg'], ['cam1/f.jpg'], ['cam1/g.jpg']
+    ])
+
+
+def test_group_image_sequences_caps_size_and_span():
+    capture_times = {f"cam/{i:02d}.jpg": float(i) for i in range(10)}
+    sequences = detector.group_image_sequences(
+        list(capture_times), max_gap_seconds=5, max_images=4, max_span_seconds=60, get_time=capture_times.get
+    )
+    assert [len(sequence) for sequence in sequences] == [4, 4, 2]
+
+    capture_times = {f"cam/{i:02d}.jpg": 3.0 * i for i in range(10)}
+    sequences = detector.group_image_sequences(
+        list(capture_times), max_gap_seconds=5, max_images=20, max_span_seconds=10, get_time=capture_times.get
+    )
+    assert [len(sequence) for sequence in sequences] == [4, 4, 2]
+
+
+def test_box_seen_in_many_still_images_becomes_static():
+    history = detector.CameraDetectionHistory()
+    cord = detection([0.40, 0.50, 0.05, 0.30], conf=0.6)
+    for _ in range(detector.STATIC_MIN_FILES - 1):
+        history.observe([[cord]])
+    assert history.filter([cord]) == ([cord], [])
+
+    history.observe([[cord]])
+    animal = detection([0.1, 0.1, 0.2, 0.2])
+    assert history.filter([cord, animal]) == ([animal], [cord])
+    assert history.static_boxes()[0]['suppressed'] == 1
+
+
+def test_box_that_moves_within_videos_is_not_static():
+    history = detector.CameraDetectionHistory()
+    den = [0.40, 0.50, 0.10, 0.10]
+    for _ in range(2 * detector.STATIC_MIN_FILES):
+        # Present in only some of the sampled frames of each video
+        history.observe([[detection(den)], [], [], [detection(den)], []])
+    assert history.boxes[0]['moving_files'] == history.boxes[0]['files']
+    assert history.static_boxes() == []
+
+    still = detector.CameraDetectionHistory()
+    for _ in range(detector.STATIC_MIN_FILES):
+        still.observe([[detection(den)]] * 5)
+    assert len(still.static_boxes()) == 1
+
+
+def test_static_detection_index_round_trip(tmp_path):
+    index_path = str(tmp_path / detector.STATIC_DETECTIONS_FILE_NAME)
+    messages = []
+    index = detector.StaticDetectionIndex(index_path)
+    cord = detection([0.40, 0.50, 0.05, 0.30])
+    for _ in range(detector.STATIC_MIN_FILES):
+        index.camera('cam1').observe([[cord]])
+    index.camera('cam1').filter([cord])
+    index.save(messages.append)
+
+    loaded = detector.StaticDetectionIndex(index_path)
+    loaded.load(messages.append)
+    assert messages == []
+    assert loaded.camera('cam1').files == detector.STATIC_MIN_FILES
+    report = loaded.report()
+    assert [(entry['camera'], entry['suppressed']) for entry in report] == [('cam1', 1)]
+    assert 'without motion' in report[0]['reason']
+
+
+def test_triage_image_file(tmp_path):
+    jpeg_data = cv2.imencode('.jpg', textured_image(0))[1].tobytes()
+
+    image_path = tmp_path / 'ok.jpg'
+    image_path.write_bytes(jpeg_data)
+    assert detector.triage_image_file(str(image_path)) is None
+
+    # Maker data appended after the end of image marker, longer than the tail that is checked first
+    trailer_path = tmp_path / 'trailer.jpg'
+    trailer_path.write_bytes(jpeg_data + b'\x00' * 4096)
+    assert detector.triage_image_file(str(trailer_path)) is None
+
+    truncated_path = tmp_path / 'truncated.jpg'
+    truncated_path.write_bytes(jpeg_data[:len(jpeg_data) // 2])
+    assert detector.triage_image_file(str(truncated_path)) == 'corrupt'
+
+    other_path = tmp_path / 'image.png'
+    other_path.write_bytes(b'')
+    assert detector.triage_image_file(str(other_path)) is None
+
+
+def test_find_jpeg_image_end_skips_thumbnail_markers():
+    jpeg_data = cv2.imencode('.jpg', textured_image(0))[1].tobytes()
+    # An APP1 segment holding an end of image marker, as an EXIF thumbnail would
+    app1_payload = b'Exif\x00\x00\xff\xd8\xff\xd9'
+    with_segment = jpeg_data[:2] + b'\xff\xe1' + (len(app1_payload) + 2).to_bytes(2, 'big') + app1_payload + jpeg_data[2:]
+    assert detector.find_jpeg_image_end(with_segment) == len(with_segment) - 2
+    assert detector.find_jpeg_image_end(with_segment[:-2]) is None
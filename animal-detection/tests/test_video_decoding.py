@@ -0,0 +1,106 @@
+import os
+import sys
+import struct
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_decoding import iter_mjpeg_avi_frames, iter_sampled_frames, read_mjpeg_avi_index  # noqa: E402
+
+
+def riff_chunk(chunk_id, payload):
+    return chunk_id + struct.pack('<I', len(payload)) + payload + b'\x00' * (len(payload) & 1)
+
+
+def riff_list(list_type, payload):
+    return riff_chunk(b'LIST', list_type + payload)
+
+
+def write_mjpeg_avi(path, frames, scale=1, rate=10, absolute_offsets=False, compression=b'MJPG'):
+    # Minimal AVI: hdrl with one video stream, movi with one '00dc' chunk per JPEG, then idx1
+    height, width = frames[0].shape[:2]
+    stream_header = b'vids' + compression + b'\x00' * 12 + struct.pack('<II', scale, rate) + b'\x00' * 28
+    stream_format = struct.pack('<Iii', 40, width, height) + b'\x00' * 4 + compression + b'\x00' * 20
+    header_list = riff_list(b'hdrl', riff_list(b'strl', riff_chunk(b'strh', stream_header) + riff_chunk(b'strf', stream_format)))
+
+    movi_payload = b''
+    offsets = []
+    for frame in frames:
+        jpeg_data = cv2.imencode('.jpg', frame)[1].tobytes()
+        offsets.append((4 + len(movi_payload), len(jpeg_data)))  # Relative to the 'movi' fourcc
+        movi_payload += riff_chunk(b'00dc', jpeg_data)
+
+    movi_offset = 12 + len(header_list) + 8  # Position of the 'movi' fourcc in the file
+    index = b''.join(
+        struct.pack('<4sIII', b'00dc', 0x10, offset + (movi_offset if absolute_offsets else 0), size)
+        for offset, size in offsets
+    )
+    body = b'AVI ' + header_list + riff_list(b'movi', movi_payload) + riff_chunk(b'idx1', index)
+    path.write_bytes(b'RIFF' + struct.pack('<I', len(body)) + body)
+    return [movi_offset + offset + 8 for offset, _ in offsets]
+
+
+def make_frames(count, width=64, height=48):
+    # Frames of different brightness so decoded frames can be told apart
+    return [np.full((height, width, 3), 30 + 40 * i, dtype=np.uint8) for i in range(count)]
+
+
+def test_index_with_relative_offsets(tmp_path):
+    video_path = tmp_path / 'relative.avi'
+    data_offsets = write_mjpeg_avi(video_path, make_frames(3), scale=1, rate=10)
+
+    avi_index = read_mjpeg_avi_index(str(video_path))
+    assert avi_index['fps'] == 10.0
+    assert (avi_index['width'], avi_index['height']) == (64, 48)
+    assert [offset for offset, _ in avi_index['frames']] == data_offsets
+
+    data = video_path.read_bytes()
+    for offset, size in avi_index['frames']:
+        assert data[offset:offset + 2] == b'\xff\xd8'
+        assert data[offset + size - 2:offset + size] == b'\xff\xd9'
+
+
+def test_index_with_absolute_offsets(tmp_path):
+    relative_path = tmp_path / 'relative.avi'
+    absolute_path = tmp_path / 'absolute.avi'
+    write_mjpeg_avi(relative_path, make_frames(3))
+    write_mjpeg_avi(absolute_path, make_frames(3), absolute_offsets=True)
+
+    assert read_mjpeg_avi_index(str(absolute_path))['frames'] == read_mjpeg_avi_index(str(relative_path))['frames']
+
+
+def test_index_rejects_other_codecs_and_files(tmp_path):
+    video_path = tmp_path / 'xvid.avi'
+    write_mjpeg_avi(video_path, make_frames(2), compression=b'XVID')
+    assert read_mjpeg_avi_index(str(video_path)) is None
+
+    other_path = tmp_path / 'not_an_avi.avi'
+    other_path.write_bytes(b'\x00' * 64)
+    assert read_mjpeg_avi_index(str(other_path)) is None
+
+
+def test_fast_path_decodes_sampled_frames(tmp_path):
+    video_path = tmp_path / 'clip.avi'
+    frames = make_frames(6)
+    write_mjpeg_avi(video_path, frames, scale=1, rate=2)
+    avi_index = read_mjpeg_avi_index(str(video_path))
+
+    sampled = list(iter_mjpeg_avi_frames(str(video_path), avi_index, every_n_frames=2, max_frames=6))
+    assert [(frame_number, timestamp) for frame_number, timestamp, _ in sampled] == [(2, 1.0), (4, 2.0), (6, 3.0)]
+    for frame_number, _, frame in sampled:
+        assert abs(int(frame.mean()) - int(frames[frame_number - 1].mean())) <= 2
+
+
+def test_zero_fps_header_falls_back_to_opencv(tmp_path):
+    video_path = tmp_path / 'no_rate.avi'
+    write_mjpeg_avi(video_path, make_frames(4), scale=1, rate=0)
+
+    avi_index = read_mjpeg_avi_index(str(video_path))
+    assert avi_index['fps'] == 0.0
+
+    messages = []
+    list(iter_sampled_frames(str(video_path), 1, 60, messages.append))
+    assert any('no frame rate' in message for message in messages)
+    assert not any('MJPEG fast path' in message for message in messages)
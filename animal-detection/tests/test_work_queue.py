@@ -0,0 +1,99 @@
+import os
+import sys
+import json
+import time
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from work_queue import WorkQueue  # noqa: E402
+
+
+def run_worker(queue_dir, worker_id):
+    # Same claim/complete loop as run_distributed_worker, with processing replaced by a record per file
+    work_queue = WorkQueue(queue_dir, lease_seconds=30)
+    while True:
+        claimed = work_queue.claim(worker_id)
+        if claimed is None:
+            if not work_queue.pending_units():
+                break
+            time.sleep(0.05)
+            continue
+        unit, lease_path, _ = claimed
+        results = []
+        for relative_path in unit['files']:
+            work_queue.renew(lease_path)
+            results.append({'file': relative_path, 'worker': worker_id})
+        work_queue.complete(unit['id'], worker_id, results)
+    work_queue.merge()
+
+
+def create_job(tmp_path, groups, files_per_unit):
+    input_folder = tmp_path / 'input'
+    input_folder.mkdir()
+    work_queue = WorkQueue(str(tmp_path / 'queue'))
+    unit_ids = work_queue.create(str(input_folder), {'confidence_threshold': 0.4}, groups, files_per_unit)
+    return work_queue, unit_ids
+
+
+def test_local_workers_process_every_file_once(tmp_path):
+    groups = [[f"20240101/cam{camera}/{i:04d}.jpg" for i in range(25)] for camera in range(8)]
+    work_queue, unit_ids = create_job(tmp_path, groups, files_per_unit=10)
+
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=run_worker, args=(work_queue.queue_dir, f"worker-{n}"))
+        for n in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    merged = WorkQueue(work_queue.queue_dir).merge()
+    with open(merged, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    processed = [result['file'] for result in data['results']]
+    assert sorted(processed) == sorted(path for group in groups for path in group)
+    assert data['pending_units'] == []
+    assert len(unit_ids) == 8
+    assert os.listdir(work_queue.leases_dir) == []
+
+
+def test_groups_are_not_split_between_units(tmp_path):
+    groups = [['a/1.jpg', 'a/2.jpg', 'a/3.jpg'], ['b/1.jpg'], ['c/1.jpg', 'c/2.jpg']]
+    work_queue, unit_ids = create_job(tmp_path, groups, files_per_unit=2)
+
+    units = []
+    while True:
+        claimed = work_queue.claim('worker')
+        if claimed is None:
+            break
+        unit, _, _ = claimed
+        units.append(unit['files'])
+        work_queue.complete(unit['id'], 'worker', [])
+    assert units == [['a/1.jpg', 'a/2.jpg', 'a/3.jpg'], ['b/1.jpg', 'c/1.jpg', 'c/2.jpg']]
+    assert len(unit_ids) == 2
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    work_queue, _ = create_job(tmp_path, [['a.jpg'], ['b.jpg']], files_per_unit=1)
+    work_queue.lease_seconds = 1
+
+    unit, lease_path, reclaimed = work_queue.claim('crashed-worker')
+    assert not reclaimed
+    other_unit, _, _ = work_queue.claim('worker')
+    assert other_unit['id'] != unit['id']
+    assert work_queue.claim('worker') is None  # Both units are leased
+
+    old = time.time() - 10
+    os.utime(lease_path, (old, old))
+    unit_again, _, reclaimed = work_queue.claim('worker')
+    assert unit_again['id'] == unit['id']
+    assert reclaimed
+
+    work_queue.complete(unit['id'], 'worker', [{'file': 'a.jpg'}])
+    work_queue.complete(unit['id'], 'crashed-worker', [{'file': 'late.jpg'}])  # First results are kept
+    with open(work_queue.result_path(unit['id']), 'r', encoding='utf-8') as f:
+        assert '"a.jpg"' in f.read()
@@ -0,0 +1,416 @@
+"""
+Video and JPEG decoding used by detector_animales_diego.py. Kept in its own module
+with only cv2, numpy and PyAV as dependencies, so the isolated decoder process
+(decode_worker.py) can import it without loading the GUI, torch, TensorFlow or
+MegaDetector.
+"""
+import os
+import pickle
+import struct
+import cv2
+import numpy as np
+
+try:
+    import av  # Optional, only needed for the PyAV (FFmpeg) decoder backend
+except ImportError:
+    av = None
+
+
+# Long side (in pixels) that MegaDetector resizes its input to before inference
+DETECTOR_INFERENCE_SIZE = 1280
+
+# OpenCV decode flags for each JPEG DCT scale factor
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Frame rate assumed for videos whose headers do not report one
+FALLBACK_FPS = 30.0
+
+# AVI stream compression codes that store every frame as a standalone JPEG
+MJPEG_FOURCCS = {b'MJPG', b'JPEG', b'AVRN', b'DMB1'}
+
+
+# Function to choose the JPEG DCT scale factor for an image
+def get_reduced_decode_factor(width, height, inference_size=DETECTOR_INFERENCE_SIZE):
+    """
+    Returns the largest scale factor (1, 2, 4 or 8) that keeps the long side of the
+    decoded image at or above the detector's inference size.
+    """
+    long_side = max(width, height)
+    for factor in (8, 4, 2):
+        if long_side // factor >= inference_size:
+            return factor
+    return 1
+
+
+# Function to iterate over the chunks of a RIFF list
+def iter_riff_chunks(data):
+    """
+    Yields (chunk_id, payload) for every chunk in a block of RIFF data.
+    """
+    pos = 0
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack('<I', data[pos + 4:pos + 8])[0]
+        yield chunk_id, data[pos + 8:pos + 8 + chunk_size]
+        pos += 8 + chunk_size + (chunk_size & 1)
+
+
+# Function to read the frame index of a Motion-JPEG AVI file
+def read_mjpeg_avi_index(video_path):
+    """
+    Parses the RIFF headers and the idx1 index of an AVI file. Returns a dict with the
+    fps, frame size and the (offset, size) of the JPEG data of every video frame, or
+    None when the file is not a Motion-JPEG AVI with a usable index.
+    """
+    with open(video_path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'AVI ':
+            return None
+        file_size = os.fstat(f.fileno()).st_size
+
+        info = None
+        movi_offset = None
+        index_data = None
+        pos = 12
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            chunk_header = f.read(12)
+            chunk_id = chunk_header[:4]
+            chunk_size = struct.unpack('<I', chunk_header[4:8])[0]
+            if chunk_id == b'LIST' and chunk_header[8:12] == b'hdrl':
+                info = parse_avi_header_list(f.read(chunk_size - 4))
+            elif chunk_id == b'LIST' and chunk_header[8:12] == b'movi':
+                movi_offset = pos + 8  # idx1 offsets are relative to the 'movi' fourcc
+            elif chunk_id == b'idx1':
+                f.seek(pos + 8)
+                index_data = f.read(chunk_size)
+            pos += 8 + chunk_size + (chunk_size & 1)
+
+        if info is None or index_data is None or movi_offset is None:
+            return None
+        if info['compression'].upper() not in MJPEG_FOURCCS:
+            return None
+
+        stream_tag = f"{info['stream']:02d}".encode()
+        entries = [
+            (offset, size)
+            for chunk_id, _, offset, size in struct.iter_unpack('<4sIII', index_data[:len(index_data) // 16 * 16])
+            if chunk_id[:2] == stream_tag and chunk_id[2:] in (b'dc', b'db')
+        ]
+        if not entries:
+            return None
+
+        # Some writers store absolute file offsets instead of offsets relative to 'movi'
+        first_offset = next((offset for offset, size in entries if size > 0), None)
+        if first_offset is None:
+            return None
+        f.seek(movi_offset + first_offset)
+        base = movi_offset if f.read(2) == stream_tag else 0
+
+    # Zero sized entries repeat the previous frame
+    frames = []
+    last_frame = None
+    for offset, size in entries:
+        if size > 0:
+            last_frame = (base + offset + 8, size)
+        frames.append(last_frame)
+
+    info['frames'] = frames
+    return info
+
+
+# Function to parse the 'hdrl' list of an AVI file
+def parse_avi_header_list(data):
+    """
+    Returns the stream number, compression code, fps and frame size of the first
+    video stream described in an AVI 'hdrl' list, or None if there is none.
+    """
+    stream = 0
+    for chunk_id, payload in iter_riff_chunks(data):
+        if chunk_id != b'LIST' or payload[:4] != b'strl':
+            continue
+        stream_header = None
+        stream_format = None
+        for sub_id, sub_payload in iter_riff_chunks(payload[4:]):
+            if sub_id == b'strh':
+                stream_header = sub_payload
+            elif sub_id == b'strf':
+                stream_format = sub_payload
+        if stream_header is not None and stream_header[:4] == b'vids' and stream_format is not None:
+            scale, rate = struct.unpack('<II', stream_header[20:28])
+            width, height = struct.unpack('<ii', stream_format[4:12])
+            return {
+                'stream': stream,
+                'compression': stream_format[16:20],
+                'fps': rate / scale if scale else 0.0,
+                'width': width,
+                'height': abs(height),
+            }
+        stream += 1
+    return None
+
+
+# Function to read the sampled frames of a Motion-JPEG AVI file
+def iter_mjpeg_avi_frames(video_path, avi_index, every_n_frames, max_frames, reduce_factor=1):
+    """
+    Yields (frame_number, timestamp, frame) by decoding the JPEG data of the sampled
+    frames directly from the container, without a generic video decoder. The index
+    must have a positive fps.
+    """
+    if avi_index['fps'] <= 0:
+        raise ValueError("AVI index has no frame rate")
+    frames = avi_index['frames']
+    last_frame_number = min(len(frames), max_frames)
+    with open(video_path, 'rb') as f:
+        for frame_number in range(every_n_frames, last_frame_number + 1, every_n_frames):
+            location = frames[frame_number - 1]
+            if location is None:
+                continue
+            offset, size = location
+            f.seek(offset)
+            jpeg_data = np.frombuffer(f.read(size), dtype=np.uint8)
+            frame = cv2.imdecode(jpeg_data, REDUCED_DECODE_FLAGS[reduce_factor])
+            if frame is not None:
+                yield frame_number, frame_number / avi_index['fps'], frame
+
+
+# Function to read the sampled frames of any video through OpenCV
+def iter_opencv_frames(video_path, every_n_frames, max_duration_seconds, log):
+    """
+    Yields (frame_number, timestamp, frame) for every n-th frame within the maximum duration.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        log(f"Could not open video {video_path}")
+        return
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not fps or fps <= 0:
+            log(f"Video {video_path} reports no frame rate, assuming {FALLBACK_FPS:g} fps")
+            fps = FALLBACK_FPS
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        max_frames = int(max_duration_seconds * fps)
+
+        log(f"Video FPS: {fps}, Total Frames: {total_frames}, Max Frames to Process: {max_frames}")
+
+        frame_count = 0
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            frame_count += 1
+            if frame_count > max_frames:
+                log(f"Reached max duration ({max_duration_seconds} seconds) for {video_path}")
+                break
+
+            if frame_count % every_n_frames == 0:
+                yield frame_count, frame_count / fps, frame
+    finally:
+        cap.release()
+
+
+# Function to read the sampled frames of a video through PyAV
+def iter_pyav_frames(video_path, every_n_frames, max_duration_seconds, log, sample_every_seconds=0, keyframes_only=False):
+    """
+    Yields (frame_number, timestamp, frame) using FFmpeg through PyAV with threaded
+    decoding. Frames are sampled by their presentation timestamp every
+    sample_every_seconds (or every n-th frame when it is 0), so variable frame rate
+    files are handled correctly. With keyframes_only, non-key frames are skipped by
+    the decoder and never decoded.
+    """
+    try:
+        container = av.open(video_path)
+    except Exception as e:
+        log(f"Could not open video {video_path}: {str(e)}")
+        return
+
+    try:
+        stream = container.streams.video[0]
+        stream.thread_type = 'AUTO'
+        if keyframes_only:
+            stream.codec_context.skip_frame = 'NONKEY'
+
+        if sample_every_seconds > 0:
+            sampling = f"every {sample_every_seconds} seconds"
+        elif keyframes_only:
+            sampling = "every keyframe"
+        else:
+            sampling = f"every {every_n_frames} frames"
+        if keyframes_only and sample_every_seconds > 0:
+            sampling += ", keyframes only"
+        duration = float(container.duration or 0) / av.time_base
+        log(f"Video duration: {duration:.1f} s, Average FPS: {float(stream.average_rate or 0):.2f} (PyAV backend, sampling {sampling})")
+
+        frame_count = 0
+        next_sample_time = 0.0
+        for frame in container.decode(stream):
+            frame_count += 1
+            if frame.time is None:
+                continue
+            if frame.time > max_duration_seconds:
+                log(f"Reached max duration ({max_duration_seconds} seconds) for {video_path}")
+                break
+
+            if sample_every_seconds > 0:
+                if frame.time < next_sample_time:
+                    continue
+                next_sample_time = (int(frame.time / sample_every_seconds) + 1) * sample_every_seconds
+            elif not keyframes_only and frame_count % every_n_frames != 0:
+                continue
+
+            yield frame_count, frame.time, frame.to_ndarray(format='bgr24')
+    finally:
+        container.close()
+
+
+# Function to read the sampled frames of a video
+def iter_sampled_frames(
+    video_path, every_n_frames, max_duration_seconds, log, reduced_decode=True,
+    decoder_backend='opencv', sample_every_seconds=0, keyframes_only=False
+):
+    """
+    Yields (frame_number, timestamp, frame) for the sampled frames of a video. With the
+    'pyav' backend, frames are decoded by FFmpeg and can be sampled by time or by
+    keyframe. Otherwise Motion-JPEG AVI files are read straight from the container
+    index, optionally at reduced scale, and everything else goes through OpenCV.
+    """
+    if decoder_backend == 'pyav':
+        if av is not None:
+            yield from iter_pyav_frames(
+                video_path, every_n_frames, max_duration_seconds, log,
+                sample_every_seconds=sample_every_seconds, keyframes_only=keyframes_only
+            )
+            return
+        log("PyAV is not installed, falling back to the OpenCV decoder")
+
+    avi_index = None
+    if os.path.splitext(video_path)[1].lower() == '.avi':
+        try:
+            avi_index = read_mjpeg_avi_index(video_path)
+        except Exception as e:
+            log(f"Could not read AVI index of {video_path}: {str(e)}")
+
+    if avi_index is not None and avi_index['fps'] <= 0:
+        log(f"AVI header of {video_path} has no frame rate, falling back to the OpenCV decoder")
+        avi_index = None
+    if avi_index is None:
+        yield from iter_opencv_frames(video_path, every_n_frames, max_duration_seconds, log)
+        return
+
+    fps = avi_index['fps']
+    max_frames = int(max_duration_seconds * fps)
+    reduce_factor = 1
+    if reduced_decode:
+        reduce_factor = get_reduced_decode_factor(avi_index['width'], avi_index['height'])
+    log(
+        f"Video FPS: {fps}, Total Frames: {len(avi_index['frames'])}, Max Frames to Process: {max_frames} "
+        f"(MJPEG fast path, 1/{reduce_factor} scale)"
+    )
+    yielded = False
+    for sampled_frame in iter_mjpeg_avi_frames(video_path, avi_index, every_n_frames, max_frames, reduce_factor):
+        yielded = True
+        yield sampled_frame
+    if not yielded:
+        # An index that points nowhere useful must not make the video look empty
+        log(f"MJPEG fast path found no frames in {video_path}, falling back to the OpenCV decoder")
+        yield from iter_opencv_frames(video_path, every_n_frames, max_duration_seconds, log)
+
+
+# Function to read the metadata of a video from its container headers
+def probe_video_metadata(video_path):
+    """
+    Returns a dict with the duration, fps, resolution and codec of a video without
+    decoding any frame, or None if the file cannot be read.
+    """
+    if os.path.splitext(video_path)[1].lower() == '.avi':
+        try:
+            avi_index = read_mjpeg_avi_index(video_path)
+        except Exception:
+            avi_index = None
+        if avi_index is not None and avi_index['fps'] > 0:
+            return {
+                'duration': len(avi_index['frames']) / avi_index['fps'],
+                'fps': avi_index['fps'],
+                'width': avi_index['width'],
+                'height': avi_index['height'],
+                'codec': avi_index['compression'].decode('ascii', 'replace').strip(),
+                'mjpeg': True,
+            }
+
+    if av is not None:
+        try:
+            with av.open(video_path) as container:
+                stream = container.streams.video[0]
+                fps = float(stream.average_rate or 0)
+                if container.duration is not None:
+                    duration = float(container.duration) / av.time_base
+                else:
+                    duration = stream.frames / fps if fps else 0.0
+                return {
+                    'duration': duration,
+                    'fps': fps,
+                    'width': stream.codec_context.width,
+                    'height': stream.codec_context.height,
+                    'codec': stream.codec_context.name,
+                    'mjpeg': False,
+                }
+        except Exception:
+            pass
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            'duration': frame_count / fps if fps else 0.0,
+            'fps': fps,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'codec': "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip(),
+            'mjpeg': False,
+        }
+    finally:
+        cap.release()
+
+
+# Function run inside the isolated decoder process
+def decode_worker_main(job_stream, result_stream):
+    """
+    Runs the pickled (job_id, kind, video_path, kwargs) jobs read from job_stream
+    until it ends: 'decode' jobs send every sampled frame, 'probe' jobs the video
+    metadata. Pickled (job_id, kind, payload) results are written to result_stream.
+    Its time and memory are watched by the parent process (IsolatedDecoder).
+    """
+    def send(message):
+        pickle.dump(message, result_stream, protocol=pickle.HIGHEST_PROTOCOL)
+        result_stream.flush()
+
+    while True:
+        try:
+            job_id, kind, video_path, kwargs = pickle.load(job_stream)
+        except EOFError:
+            break
+        try:
+            if kind == 'probe':
+                send((job_id, 'metadata', probe_video_metadata(video_path)))
+                continue
+            frame_source = iter_sampled_frames(
+                video_path, log=lambda message: send((job_id, 'log', message)), **kwargs
+            )
+            for sampled_frame in frame_source:
+                send((job_id, 'frame', sampled_frame))
+            send((job_id, 'done', None))
+        except MemoryError:
+            send((job_id, 'error', "out of memory"))
+        except Exception as e:
+            send((job_id, 'error', str(e)))
@@ -0,0 +1,214 @@
+"""
+Work queue on a shared filesystem for distributed runs of detector_animales_diego.py.
+Only uses the standard library, so it can be used and tested without the detector.
+"""
+import os
+import json
+import time
+import socket
+from contextlib import contextmanager
+
+
+# Per-file results of a run, written to the output folder
+RESULTS_FILE_NAME = "results.json"
+
+# Files per work unit, lease lifetime and wait between claims of the distributed work queue
+WORK_UNIT_FILES = 50
+WORK_LEASE_SECONDS = 300
+WORK_POLL_SECONDS = 10
+
+
+# Function to write a JSON file so readers never see it half written
+def write_json_atomic(path, data):
+    temp_path = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+
+# Function to hold a lock file while a file shared between workers is updated
+@contextmanager
+def locked_file(path, stale_seconds=60, poll_seconds=0.1):
+    """
+    Holds <path>.lock, created with O_EXCL, for the duration of the with block. A lock
+    older than stale_seconds was left by a crashed worker and is taken over.
+    """
+    lock_path = f"{path}.lock"
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_seconds:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(poll_seconds)
+    os.close(fd)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+class WorkQueue:
+    """
+    Work queue on a shared filesystem, used to split an input folder between worker
+    processes on several machines. The queue folder holds:
+    job.json              input folder and processing settings
+    units/<unit>.json     the files of each work unit
+    leases/<unit>.<n>     lease n of a unit, kept alive by its worker touching it
+    results/<unit>.json   result records of each finished unit
+    A unit is claimed by creating its next lease file with O_EXCL, so only one worker
+    gets it. A lease not touched for lease_seconds has expired, and the unit can then
+    be claimed again under the next lease number.
+    """
+
+    def __init__(self, queue_dir, lease_seconds=WORK_LEASE_SECONDS):
+        self.queue_dir = queue_dir
+        self.lease_seconds = lease_seconds
+        self.job_path = os.path.join(queue_dir, 'job.json')
+        self.units_dir = os.path.join(queue_dir, 'units')
+        self.leases_dir = os.path.join(queue_dir, 'leases')
+        self.results_dir = os.path.join(queue_dir, 'results')
+
+    def create(self, input_folder, settings, relative_groups, files_per_unit=WORK_UNIT_FILES):
+        """
+        Split the files (relative to input_folder) into work units of about
+        files_per_unit files. relative_groups is a list of file lists that are never
+        split between units, such as the images of one sequence. Returns the unit ids.
+        """
+        for folder in (self.units_dir, self.leases_dir, self.results_dir):
+            os.makedirs(folder, exist_ok=True)
+
+        # Machines may mount the share at different paths, so keep the input folder
+        # relative to the queue folder when both are on the same share
+        try:
+            stored_input_folder = os.path.relpath(input_folder, self.queue_dir)
+        except ValueError:
+            stored_input_folder = os.path.abspath(input_folder)
+
+        unit_files = [[]]
+        for group in relative_groups:
+            if len(unit_files[-1]) >= files_per_unit:
+                unit_files.append([])
+            unit_files[-1].extend(group)
+        unit_ids = []
+        for files in unit_files:
+            if not files:
+                continue
+            unit_id = f"unit_{len(unit_ids):05d}"
+            write_json_atomic(os.path.join(self.units_dir, f"{unit_id}.json"), {'id': unit_id, 'files': files})
+            unit_ids.append(unit_id)
+        write_json_atomic(self.job_path, {
+            'input_folder': stored_input_folder,
+            'settings': settings,
+            'units': len(unit_ids),
+        })
+        return unit_ids
+
+    def load_job(self):
+        with open(self.job_path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+        job['input_folder'] = os.path.normpath(os.path.join(self.queue_dir, job['input_folder']))
+        return job
+
+    def unit_ids(self):
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.units_dir) if name.endswith('.json'))
+
+    def result_path(self, unit_id):
+        return os.path.join(self.results_dir, f"{unit_id}.json")
+
+    def lease_path(self, unit_id, lease_number):
+        return os.path.join(self.leases_dir, f"{unit_id}.{lease_number}")
+
+    def lease_expired(self, lease_path):
+        try:
+            return time.time() - os.path.getmtime(lease_path) > self.lease_seconds
+        except OSError:
+            return True
+
+    def pending_units(self):
+        return [unit_id for unit_id in self.unit_ids() if not os.path.exists(self.result_path(unit_id))]
+
+    def claim(self, worker_id):
+        """
+        Claim the first unit that is neither finished nor leased. Returns
+        (unit, lease_path, reclaimed), or None if no unit can be claimed right now.
+        """
+        lease_names = os.listdir(self.leases_dir)
+        for unit_id in self.pending_units():
+            lease_numbers = [
+                int(name.rsplit('.', 1)[1]) for name in lease_names
+                if name.rsplit('.', 1)[0] == unit_id and name.rsplit('.', 1)[1].isdigit()
+            ]
+            last_lease = max(lease_numbers, default=0)
+            if last_lease and not self.lease_expired(self.lease_path(unit_id, last_lease)):
+                continue
+
+            lease_path = self.lease_path(unit_id, last_lease + 1)
+            try:
+                fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue  # Another worker claimed it first
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'worker': worker_id, 'claimed': time.time()}, f)
+
+            # The unit may have been finished between listing the leases and claiming it
+            if os.path.exists(self.result_path(unit_id)):
+                os.remove(lease_path)
+                continue
+
+            with open(os.path.join(self.units_dir, f"{unit_id}.json"), 'r', encoding='utf-8') as f:
+                unit = json.load(f)
+            return unit, lease_path, last_lease > 0
+        return None
+
+    def renew(self, lease_path):
+        try:
+            os.utime(lease_path, None)
+        except OSError:
+            pass
+
+    def complete(self, unit_id, worker_id, results):
+        """
+        Store the results of a unit and drop its leases. If a reclaimed unit is
+        finished twice, the first results are kept.
+        """
+        if not os.path.exists(self.result_path(unit_id)):
+            write_json_atomic(self.result_path(unit_id), {
+                'unit': unit_id, 'worker': worker_id, 'results': results
+            })
+        for name in os.listdir(self.leases_dir):
+            if name.rsplit('.', 1)[0] == unit_id:
+                try:
+                    os.remove(os.path.join(self.leases_dir, name))
+                except OSError:
+                    pass
+
+    def merge(self):
+        """
+        Merge the results of the finished units into results.json in the queue folder.
+        Returns its path.
+        """
+        job = self.load_job()
+        results = []
+        for unit_id in self.unit_ids():
+            try:
+                with open(self.result_path(unit_id), 'r', encoding='utf-8') as f:
+                    results.extend(json.load(f)['results'])
+            except (OSError, ValueError):
+                pass
+        merged_path = os.path.join(self.queue_dir, RESULTS_FILE_NAME)
+        write_json_atomic(merged_path, {
+            'input_folder': job['input_folder'],
+            'pending_units': self.pending_units(),
+            'results': results,
+        })
+        return merged_path